@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多蓝牙适配器的连接分配
+- ConnectionPlacer: 记录各适配器的连接数和各设备在各适配器上的信号强度，新连接分配到信号足够好的适配器中
+  负载最低的一个；适配器连续连接失败、扫描失败或短时间内大量断线时暂停使用，其上的设备重连时分配到其他适配器
+- 多个连接器共用一个 ConnectionPlacer 时，扫描在所有适配器上进行并在连接器之间共享结果，
+  同一设备同时只分配给一个连接器，避免重复连接
+- create_connectors: 按配置文件 server.ble 创建连接器（每个指定设备一个），共用传输和分配器
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+from ble_transport import BleTransport, DiscoveredDevice, create_transport
+
+logger = logging.getLogger(__name__)
+
+
+class PlacementError(Exception):
+    """没有可分配的适配器，或设备已由其他连接器连接"""
+
+
+@dataclass
+class AdapterState:
+    """一个蓝牙适配器的状态"""
+    name: Optional[str]
+    capacity: int
+    devices: set = field(default_factory=set)  # 当前分配到该适配器的设备地址
+    consecutive_failures: int = 0
+    failures: int = 0
+    down_until: float = 0.0
+    drops: Deque[float] = field(default_factory=deque)  # 最近的意外断线时间
+
+    @property
+    def label(self) -> str:
+        return self.name or '默认适配器'
+
+    @property
+    def load(self) -> int:
+        return len(self.devices)
+
+    def available(self, now: float) -> bool:
+        return now >= self.down_until
+
+
+class ConnectionPlacer:
+    """蓝牙适配器连接分配器"""
+
+    def __init__(self, adapters: List[Optional[str]], capacity: int = 5, rssi_margin: float = 10,
+                 failure_threshold: int = 3, cooldown: float = 60, drop_window: float = 2,
+                 scan_cache_ttl: float = 5, rssi_ttl: float = 300):
+        """
+        初始化连接分配器
+
+        Args:
+            adapters: 蓝牙适配器名称列表，[None] 表示只使用系统默认适配器
+            capacity: 每个适配器同时保持的最大连接数
+            rssi_margin: 信号强度比最好的适配器低不超过该值（dB）的适配器都可以分配，其中选择负载最低的
+            failure_threshold: 连续失败（连接或扫描）达到该次数，或 drop_window 内意外断线达到该次数时暂停使用适配器
+            cooldown: 适配器暂停使用的时间（秒），暂停期间只在其他适配器都已满时使用
+            drop_window: 统计意外断线的时间窗口（秒），适配器故障时其上的连接几乎同时断开
+            scan_cache_ttl: 扫描结果在连接器之间共享的有效期（秒）
+            rssi_ttl: 信号强度记录的有效期（秒）
+        """
+        self.adapters: Dict[Optional[str], AdapterState] = {
+            name: AdapterState(name, capacity) for name in dict.fromkeys(adapters or [None])
+        }
+        self.rssi_margin = rssi_margin
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.drop_window = drop_window
+        self.scan_cache_ttl = scan_cache_ttl
+        self.rssi_ttl = rssi_ttl
+        self._assignments: Dict[str, Optional[str]] = {}  # 设备地址 -> 适配器
+        self._rssi: Dict[str, Dict[Optional[str], Tuple[int, float]]] = {}  # 设备地址 -> {适配器: (信号强度, 时间)}
+        self._scan: Optional[asyncio.Future] = None
+        self._scan_result: List[DiscoveredDevice] = []
+        self._scan_time = 0.0
+
+    @classmethod
+    def from_config(cls, config: Optional[dict], transport: BleTransport) -> 'ConnectionPlacer':
+        """
+        根据配置创建连接分配器
+
+        Args:
+            config: 配置文件中 server.ble 部分，adapters 为空时使用传输检测到的所有适配器
+            transport: 蓝牙传输
+        """
+        config = config or {}
+        adapters = config.get('adapters') or transport.list_adapters()
+        return cls(
+            adapters,
+            capacity=config.get('adapter_capacity', 5),
+            rssi_margin=config.get('rssi_margin', 10),
+            failure_threshold=config.get('adapter_failure_threshold', 3),
+            cooldown=config.get('adapter_cooldown', 60)
+        )
+
+    async def discover(self, transport: BleTransport, timeout: float) -> List[DiscoveredDevice]:
+        """
+        在所有可用的适配器上扫描，记录各适配器看到的信号强度
+
+        同时发起的扫描合并为一次，有效期内的重复扫描直接返回上次的结果
+
+        Returns:
+            发现的设备（同一设备取信号最强的一条）
+        """
+        if self._scan is None or self._scan.done():
+            if self._scan_result and time.monotonic() - self._scan_time < self.scan_cache_ttl:
+                return list(self._scan_result)
+            self._scan = asyncio.ensure_future(self._scan_all(transport, timeout))
+        # 某个连接器被取消时不取消其他连接器共享的扫描
+        return list(await asyncio.shield(self._scan))
+
+    async def _scan_all(self, transport: BleTransport, timeout: float) -> List[DiscoveredDevice]:
+        now = time.monotonic()
+        adapters = [state for state in self.adapters.values() if state.available(now)]
+        # 所有适配器都暂停使用时仍然全部扫描，以便尽早发现恢复的适配器
+        adapters = adapters or list(self.adapters.values())
+        results = await asyncio.gather(
+            *(transport.discover(timeout, adapter=state.name) for state in adapters), return_exceptions=True
+        )
+
+        now = time.monotonic()
+        best: Dict[str, DiscoveredDevice] = {}
+        for state, result in zip(adapters, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"蓝牙适配器 {state.label} 扫描失败: {result}")
+                self._record_failure(state)
+                continue
+            for device in result:
+                if device.rssi is not None:
+                    self._rssi.setdefault(device.address, {})[state.name] = (device.rssi, now)
+                current = best.get(device.address)
+                if current is None or (device.rssi or -999) > (current.rssi or -999):
+                    best[device.address] = device
+
+        self._scan_result = list(best.values())
+        self._scan_time = now
+        return self._scan_result
+
+    def acquire(self, address: str) -> Optional[str]:
+        """
+        为设备分配适配器
+
+        Returns:
+            适配器名称（None 为系统默认适配器）
+
+        Raises:
+            PlacementError: 设备已由其他连接器连接，或所有适配器的连接数都已满
+        """
+        if address in self._assignments:
+            raise PlacementError(f"设备 {address} 已在适配器 {self._label(self._assignments[address])} 上连接")
+
+        now = time.monotonic()
+        candidates = [state for state in self.adapters.values() if state.load < state.capacity]
+        if not candidates:
+            raise PlacementError("所有蓝牙适配器的连接数已满")
+        # 暂停使用的适配器只在其他适配器都已满时使用，连接失败的误判不会让所有适配器都不可用
+        candidates = [state for state in candidates if state.available(now)] or candidates
+
+        seen = {adapter: rssi for adapter, (rssi, seen_at) in self._rssi.get(address, {}).items()
+                if now - seen_at < self.rssi_ttl}
+        in_range = [state for state in candidates if state.name in seen]
+        if in_range:
+            # 只在信号足够好的适配器中分配，没看到该设备的适配器可能超出了通信距离
+            strongest = max(seen[state.name] for state in in_range)
+            candidates = [state for state in in_range if seen[state.name] >= strongest - self.rssi_margin]
+
+        state = min(candidates, key=lambda s: (s.load / s.capacity, -seen.get(s.name, -999)))
+        state.devices.add(address)
+        self._assignments[address] = state.name
+        return state.name
+
+    def release(self, address: str, unexpected: bool = False):
+        """
+        释放设备占用的适配器
+
+        Args:
+            address: 设备地址
+            unexpected: 是否为意外断线，短时间内大量意外断线说明适配器故障
+        """
+        if address not in self._assignments:
+            return
+        state = self.adapters.get(self._assignments.pop(address))
+        if state is None:
+            return
+        state.devices.discard(address)
+        if unexpected:
+            now = time.monotonic()
+            state.drops.append(now)
+            while state.drops and now - state.drops[0] > self.drop_window:
+                state.drops.popleft()
+            if len(state.drops) >= self.failure_threshold and state.available(now):
+                state.drops.clear()
+                self._mark_down(state, f"{self.drop_window:g}秒内 {self.failure_threshold} 个连接意外断开")
+
+    def report_success(self, adapter: Optional[str]):
+        """记录适配器连接成功"""
+        state = self.adapters.get(adapter)
+        if state is not None:
+            state.consecutive_failures = 0
+
+    def report_failure(self, address: str):
+        """记录连接失败并释放设备占用的适配器"""
+        if address not in self._assignments:
+            return
+        state = self.adapters.get(self._assignments[address])
+        self.release(address)
+        if state is not None:
+            self._record_failure(state)
+
+    def _record_failure(self, state: AdapterState):
+        state.failures += 1
+        state.consecutive_failures += 1
+        # 恢复后的第一次尝试仍然失败时立即再次暂停
+        if state.consecutive_failures >= self.failure_threshold and state.available(time.monotonic()):
+            self._mark_down(state, f"连续 {state.consecutive_failures} 次失败")
+
+    def _mark_down(self, state: AdapterState, reason: str):
+        # 只有一个适配器时没有其他适配器可以分配，暂停使用只会推迟重连
+        if len(self.adapters) < 2:
+            return
+        state.down_until = time.monotonic() + self.cooldown
+        logger.warning(f"⚠️ 蓝牙适配器 {state.label} {reason}，暂停使用 {self.cooldown:.0f} 秒，新连接分配到其他适配器")
+
+    def _label(self, adapter: Optional[str]) -> str:
+        return self.adapters[adapter].label if adapter in self.adapters else str(adapter)
+
+    def adapter_of(self, address: str) -> Optional[str]:
+        """设备当前分配的适配器"""
+        return self._assignments.get(address)
+
+    def stats(self) -> dict:
+        """各适配器的连接数、容量和状态"""
+        now = time.monotonic()
+        return {
+            state.label: {
+                'connections': state.load,
+                'capacity': state.capacity,
+                'available': state.available(now),
+                'failures': state.failures,
+            }
+            for state in self.adapters.values()
+        }
+
+
+def create_connectors(config: Optional[dict] = None, auto_reconnect: bool = True,
+                      transport: Optional[BleTransport] = None) -> list:
+    """
+    按配置创建温度计连接器
+
+    devices 为空时创建一个连接器，优先连接配置中的 device_name，未发现时连接第一个发现的温度计；
+    devices 不为空时为每个设备（名称或地址）创建一个只连接该设备的连接器。所有连接器共用一个
+    传输和连接分配器，连接分散到各个适配器上
+
+    Args:
+        config: 配置文件中 server.ble 部分
+        auto_reconnect: 是否自动重连
+        transport: 蓝牙传输，默认按配置创建
+    """
+    from temperature_sensor_connector import TemperatureSensorConnector
+
+    config = config or {}
+    transport = transport or create_transport(config)
+    placer = ConnectionPlacer.from_config(config, transport)
+    devices = list(dict.fromkeys(config.get('devices') or []))
+
+    if not devices:
+        return [TemperatureSensorConnector(auto_reconnect=auto_reconnect, transport=transport, placer=placer)]
+    return [
+        TemperatureSensorConnector(auto_reconnect=auto_reconnect, transport=transport, placer=placer,
+                                   preferred_name=device, match_preferred_only=True)
+        for device in devices
+    ]
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+温湿度告警引擎
+在数据回调中对每条读数增量评估告警规则，每条规则每次评估均为O(1)（摊还）
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from temperature_sensor_connector import TemperatureData
+
+logger = logging.getLogger(__name__)
+
+# 可用于告警的指标及其显示名称
+METRIC_NAMES = {
+    'temperature': '温度',
+    'humidity': '湿度',
+    'battery': '电池电量',
+    'voltage': '电压',
+}
+
+
+class AlertRule(ABC):
+    """告警规则基类，状态按设备地址分别维护；子类需实现 _check 并设置 rule_type"""
+
+    def __init__(self, name: str, metric: str, device_address: Optional[str] = None):
+        """
+        初始化告警规则
+
+        Args:
+            name: 规则名称
+            metric: 指标名称 (temperature/humidity/battery/voltage)
+            device_address: 仅对指定设备生效，为空则对所有设备生效
+        """
+        if metric not in METRIC_NAMES:
+            raise ValueError(f"不支持的告警指标: {metric}")
+        self.name = name
+        self.metric = metric
+        self.device_address = device_address
+        self._firing: Dict[Optional[str], bool] = {}
+
+    def evaluate(self, data: TemperatureData) -> Optional[dict]:
+        """
+        评估一条读数
+
+        Returns:
+            状态发生变化（触发或恢复）时返回告警事件，否则返回None
+        """
+        if self.device_address and data.device_address != self.device_address:
+            return None
+        value = getattr(data, self.metric)
+        if value is None:
+            return None
+
+        timestamp = data.timestamp or datetime.now()
+        message = self._check(data.device_address, value, timestamp.timestamp())
+        firing = message is not None
+        if firing == self._firing.get(data.device_address, False):
+            return None
+
+        self._firing[data.device_address] = firing
+        return {
+            'rule': self.name,
+            'type': self.rule_type,
+            'state': 'firing' if firing else 'resolved',
+            'metric': self.metric,
+            'value': value,
+            'message': message if firing else f"{self.name}: 已恢复正常",
+            'device_name': data.device_name,
+            'device_address': data.device_address,
+            'timestamp': timestamp.isoformat(),
+        }
+
+    @abstractmethod
+    def _check(self, device: Optional[str], value: float, now: float) -> Optional[str]:
+        """检查条件，满足告警条件时返回告警消息"""
+
+
+class ThresholdRule(AlertRule):
+    """阈值规则：指标持续高于/低于阈值超过指定时长"""
+
+    rule_type = 'threshold'
+
+    def __init__(self, name: str, metric: str, above: Optional[float] = None,
+                 below: Optional[float] = None, duration: float = 0, **kwargs):
+        super().__init__(name, metric, **kwargs)
+        if above is None and below is None:
+            raise ValueError(f"阈值规则 {name} 需要设置 above 或 below")
+        self.above = above
+        self.below = below
+        self.duration = duration
+        self._breach_start: Dict[Optional[str], float] = {}
+
+    def _check(self, device, value, now):
+        breached = (self.above is not None and value > self.above) or \
+                   (self.below is not None and value < self.below)
+        if not breached:
+            self._breach_start.pop(device, None)
+            return None
+
+        start = self._breach_start.setdefault(device, now)
+        if now - start < self.duration:
+            return None
+
+        bound = f"高于{self.above}" if self.above is not None and value > self.above else f"低于{self.below}"
+        return f"{self.name}: {METRIC_NAMES[self.metric]}{bound}已持续{int(now - start)}秒 (当前 {value})"
+
+
+class RateOfChangeRule(AlertRule):
+    """变化率规则：时间窗口内指标上升或下降超过指定幅度"""
+
+    rule_type = 'rate_of_change'
+
+    def __init__(self, name: str, metric: str, window: float = 600,
+                 max_rise: Optional[float] = None, max_drop: Optional[float] = None, **kwargs):
+        super().__init__(name, metric, **kwargs)
+        if max_rise is None and max_drop is None:
+            raise ValueError(f"变化率规则 {name} 需要设置 max_rise 或 max_drop")
+        self.window = window
+        self.max_rise = max_rise
+        self.max_drop = max_drop
+        self._history: Dict[Optional[str], deque] = {}
+
+    def _check(self, device, value, now):
+        history = self._history.setdefault(device, deque())
+        history.append((now, value))
+        # 每条读数最多入队、出队各一次，摊还O(1)
+        while len(history) > 1 and now - history[1][0] >= self.window:
+            history.popleft()
+
+        oldest_time, oldest_value = history[0]
+        if now - oldest_time < self.window:
+            return None
+
+        change = value - oldest_value
+        if self.max_rise is not None and change > self.max_rise:
+            return f"{self.name}: {METRIC_NAMES[self.metric]}在{int(now - oldest_time)}秒内上升{change:.2f}"
+        if self.max_drop is not None and -change > self.max_drop:
+            return f"{self.name}: {METRIC_NAMES[self.metric]}在{int(now - oldest_time)}秒内下降{-change:.2f}"
+        return None
+
+
+class StuckSensorRule(AlertRule):
+    """传感器卡死规则：指标在指定时长内没有任何变化"""
+
+    rule_type = 'stuck_sensor'
+
+    def __init__(self, name: str, metric: str, duration: float = 1800,
+                 tolerance: float = 0.0, **kwargs):
+        super().__init__(name, metric, **kwargs)
+        self.duration = duration
+        self.tolerance = tolerance
+        self._last_change: Dict[Optional[str], tuple] = {}
+
+    def _check(self, device, value, now):
+        last = self._last_change.get(device)
+        if last is None or abs(value - last[1]) > self.tolerance:
+            self._last_change[device] = (now, value)
+            return None
+
+        if now - last[0] < self.duration:
+            return None
+        return f"{self.name}: {METRIC_NAMES[self.metric]}已{int(now - last[0])}秒无变化 (当前 {value})"
+
+
+RULE_TYPES = {
+    ThresholdRule.rule_type: ThresholdRule,
+    RateOfChangeRule.rule_type: RateOfChangeRule,
+    StuckSensorRule.rule_type: StuckSensorRule,
+}
+
+
+def _run_blocking(fn: Callable, *args):
+    """
+    在后台执行阻塞IO，不阻塞调用方
+
+    在事件循环线程中调用时（连接器的数据回调）交给事件循环的默认线程池，否则在后台线程中执行
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        threading.Thread(target=fn, args=args, daemon=True).start()
+        return
+    loop.run_in_executor(None, fn, *args)
+
+
+class CallbackAlertSink:
+    """回调告警输出，用于Socket.IO推送等进程内通知"""
+
+    def __init__(self, callback: Callable[[dict], None]):
+        self.callback = callback
+
+    def send(self, alert: dict):
+        self.callback(alert)
+
+
+class FileAlertSink:
+    """文件告警输出，每条告警写入一行JSON（在后台线程池中写入，避免阻塞数据采集）"""
+
+    def __init__(self, path: str = "alerts.log"):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, alert: dict):
+        _run_blocking(self._write, json.dumps(alert, ensure_ascii=False))
+
+    def _write(self, line: str):
+        try:
+            with self._lock:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+        except Exception as e:
+            logger.error(f"告警写入文件失败: {e}")
+
+
+class WebhookAlertSink:
+    """Webhook告警输出，在后台线程池中POST JSON，避免阻塞数据采集"""
+
+    def __init__(self, url: str, timeout: float = 5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert: dict):
+        _run_blocking(self._post, alert)
+
+    def _post(self, alert: dict):
+        try:
+            request = urllib.request.Request(
+                self.url,
+                data=json.dumps(alert, ensure_ascii=False).encode('utf-8'),
+                headers={'Content-Type': 'application/json'},
+                method='POST'
+            )
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+        except Exception as e:
+            logger.error(f"Webhook告警发送失败: {e}")
+
+
+SINK_TYPES = {
+    'file': FileAlertSink,
+    'webhook': WebhookAlertSink,
+}
+
+
+class AlertEngine:
+    """告警引擎"""
+
+    def __init__(self, rules: Optional[List[AlertRule]] = None, sinks: Optional[list] = None):
+        """
+        初始化告警引擎
+
+        Args:
+            rules: 告警规则列表
+            sinks: 告警输出列表，每个输出需实现 send(alert)
+        """
+        self.rules = rules or []
+        self.sinks = sinks or []
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> 'AlertEngine':
+        """
+        从配置创建告警引擎
+
+        Args:
+            config: 配置文件中 server.alerts 部分，enabled 不为 true 时不创建任何规则和输出
+        """
+        config = config or {}
+        if not config.get('enabled', False):
+            return cls([], [])
+        rules = []
+        for rule_config in config.get('rules', []):
+            options = dict(rule_config)
+            rule_type = options.pop('type')
+            if rule_type not in RULE_TYPES:
+                raise ValueError(f"未知的告警规则类型: {rule_type}")
+            rules.append(RULE_TYPES[rule_type](**options))
+
+        sinks = []
+        for sink_config in config.get('sinks', []):
+            options = dict(sink_config)
+            sink_type = options.pop('type')
+            if sink_type not in SINK_TYPES:
+                raise ValueError(f"未知的告警输出类型: {sink_type}")
+            sinks.append(SINK_TYPES[sink_type](**options))
+
+        return cls(rules, sinks)
+
+    def add_sink(self, sink):
+        """添加告警输出"""
+        self.sinks.append(sink)
+
+    def process(self, data: TemperatureData) -> List[dict]:
+        """
+        评估一条读数并分发产生的告警
+
+        Returns:
+            本次产生的告警事件列表
+        """
+        alerts = []
+        for rule in self.rules:
+            try:
+                alert = rule.evaluate(data)
+            except Exception as e:
+                logger.error(f"告警规则 {rule.name} 评估失败: {e}")
+                continue
+            if alert:
+                alerts.append(alert)
+
+        for alert in alerts:
+            if alert['state'] == 'firing':
+                logger.warning(f"🚨 {alert['message']}")
+            else:
+                logger.info(f"✅ {alert['message']}")
+            for sink in self.sinks:
+                try:
+                    sink.send(alert)
+                except Exception as e:
+                    logger.error(f"告警输出失败: {e}")
+
+        return alerts
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+蓝牙连接抖动测试
+使用模拟蓝牙后端运行多个连接器（每个连接器负责一个模拟温度计），注入连接失败、随机断线和畸形数据包，
+统计连接/断线/重连次数、同一设备的重复连接、收到的有效读数，并定期采样事件循环中的任务数，
+用于复现重连风暴和任务泄漏。相同的 --seed 产生相同的故障序列。
+
+--adapters 大于1时模拟多个蓝牙适配器（每个适配器最多 --adapter-capacity 个连接），连接器共用一个
+ConnectionPlacer 分配适配器；--fail-adapter-at 在指定时间让第一个适配器故障，观察其上的设备迁移到其他适配器。
+
+用法（在项目根目录运行）:
+    python benchmarks/ble_churn.py [--sensors 50] [--duration 60] [--connect-failure-rate 0.3] [--mean-connected-time 10]
+    python benchmarks/ble_churn.py --sensors 20 --adapters 4 --adapter-capacity 5 --fail-adapter-at 20
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到Python路径，并切换到根目录以读取 static/config.json
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from adapter_placement import ConnectionPlacer  # noqa: E402
+from ble_transport import FaultProfile, SimulatedTransport  # noqa: E402
+from temperature_sensor_connector import TemperatureSensorConnector  # noqa: E402
+
+
+async def run(args) -> dict:
+    faults = FaultProfile(
+        discovery_latency=args.discovery_latency,
+        discovery_miss_rate=args.discovery_miss_rate,
+        connect_latency=args.connect_latency,
+        connect_failure_rate=args.connect_failure_rate,
+        mean_connected_time=args.mean_connected_time,
+        notify_interval=args.notify_interval,
+        malformed_rate=args.malformed_rate,
+    )
+    adapters = [f'hci{index}' for index in range(args.adapters)]
+    transport = SimulatedTransport(sensor_count=args.sensors, faults=faults, seed=args.seed,
+                                   adapters=adapters, adapter_capacity=args.adapter_capacity)
+    placer = None
+    if args.adapters > 1:
+        placer = ConnectionPlacer(adapters, capacity=args.adapter_capacity or args.sensors,
+                                  cooldown=args.adapter_cooldown)
+
+    readings = 0
+
+    def on_data(data):
+        nonlocal readings
+        readings += 1
+
+    connectors = []
+    for sensor in transport.sensors.values():
+        connector = TemperatureSensorConnector(auto_reconnect=True, transport=transport, preferred_name=sensor.name,
+                                               placer=placer, match_preferred_only=placer is not None)
+        # 缩短扫描与重连间隔，使短时间内发生足够多的重连
+        connector.scan_timeout = args.discovery_latency * 2
+        connector.reconnect_delay = args.reconnect_delay
+        connector.retry_delay = args.reconnect_delay * 2
+        connector.check_interval = args.reconnect_delay
+        connector.set_data_callback(on_data)
+        connectors.append(connector)
+
+    scan_tasks = [asyncio.ensure_future(connector.start_continuous_scanning()) for connector in connectors]
+
+    task_samples = []
+    connected_samples = []
+    failed_adapter = None
+    start = time.monotonic()
+    while time.monotonic() - start < args.duration:
+        await asyncio.sleep(1)
+        elapsed = time.monotonic() - start
+        if args.fail_adapter_at and failed_adapter is None and elapsed >= args.fail_adapter_at:
+            failed_adapter = adapters[0]
+            transport.fail_adapter(failed_adapter)
+            print(f"  t={elapsed:5.1f}s 模拟适配器 {failed_adapter} 故障")
+        connected = sum(1 for connector in connectors if connector.is_connected)
+        connected_samples.append(connected)
+        task_samples.append(len(asyncio.all_tasks()))
+        if args.verbose:
+            loads = ' '.join(f"{adapter}:{transport.adapter_load(adapter)}" for adapter in adapters)
+            print(f"  t={elapsed:5.1f}s 已连接 {connected:3d}/{len(connectors)} "
+                  f"任务数 {task_samples[-1]} 适配器 {loads}")
+
+    adapter_loads = {adapter: transport.adapter_load(adapter) for adapter in adapters}
+
+    for connector in connectors:
+        connector.stop_scanning()
+    for connector in connectors:
+        await connector.disconnect()
+    for task in scan_tasks:
+        task.cancel()
+    await asyncio.gather(*scan_tasks, return_exceptions=True)
+
+    stats = transport.stats
+    return {
+        'sensors': args.sensors,
+        'duration': args.duration,
+        'scans': stats.scans,
+        'connects': stats.connects,
+        'connect_failures': stats.connect_failures,
+        'random_disconnects': stats.random_disconnects,
+        'frames': stats.frames,
+        'malformed_frames': stats.malformed_frames,
+        'readings': readings,
+        'connected_last': connected_samples[-1] if connected_samples else 0,
+        'connected_max': max(connected_samples) if connected_samples else 0,
+        'adapter_loads': adapter_loads,
+        'failed_adapter': failed_adapter,
+        'duplicate_connections': transport.duplicate_connections(),
+        'exhausted_reconnects': sum(1 for c in connectors if c.reconnect_attempts >= c.max_reconnect_attempts),
+        'tasks_first': task_samples[0] if task_samples else 0,
+        'tasks_max': max(task_samples) if task_samples else 0,
+        'tasks_last': task_samples[-1] if task_samples else 0,
+        'leftover_simulator_tasks': len(transport.tasks),
+        'leftover_callback_tasks': sum(len(c._callback_tasks) for c in connectors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟蓝牙设备的连接抖动测试")
+    parser.add_argument('--sensors', type=int, default=50, help="模拟温度计数量")
+    parser.add_argument('--duration', type=float, default=60, help="测试时长（秒）")
+    parser.add_argument('--seed', type=int, default=1, help="随机种子")
+    parser.add_argument('--discovery-latency', type=float, default=0.5, help="扫描耗时（秒）")
+    parser.add_argument('--discovery-miss-rate', type=float, default=0.0, help="扫描漏掉设备的概率")
+    parser.add_argument('--connect-latency', type=float, default=0.2, help="连接耗时（秒）")
+    parser.add_argument('--connect-failure-rate', type=float, default=0.3, help="连接失败概率")
+    parser.add_argument('--mean-connected-time', type=float, default=10, help="平均连接时长（秒），0 表示不随机断线")
+    parser.add_argument('--notify-interval', type=float, default=1.0, help="通知间隔（秒）")
+    parser.add_argument('--malformed-rate', type=float, default=0.05, help="畸形数据包概率")
+    parser.add_argument('--reconnect-delay', type=float, default=1.0, help="连接器重连等待时间（秒）")
+    parser.add_argument('--adapters', type=int, default=1, help="模拟的蓝牙适配器数量")
+    parser.add_argument('--adapter-capacity', type=int, default=0, help="每个适配器的最大连接数，0 表示不限制")
+    parser.add_argument('--adapter-cooldown', type=float, default=60, help="故障适配器暂停使用的时间（秒）")
+    parser.add_argument('--fail-adapter-at', type=float, default=0, help="在该时间（秒）让第一个适配器故障，0 表示不注入")
+    parser.add_argument('--verbose', action='store_true', help="每秒输出连接数和任务数")
+    args = parser.parse_args()
+
+    # 连接器每次连接、断线都会记录日志，测试时只显示警告以上
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('temperature_sensor_connector').setLevel(logging.CRITICAL)
+
+    print(f"🔌 {args.sensors} 个模拟温度计，测试 {args.duration:.0f} 秒 (seed={args.seed})")
+    result = asyncio.run(run(args))
+
+    print()
+    print(f"扫描次数:       {result['scans']}")
+    print(f"连接成功/失败:  {result['connects']} / {result['connect_failures']}")
+    print(f"随机断线:       {result['random_disconnects']}")
+    print(f"数据包/畸形:    {result['frames']} / {result['malformed_frames']}")
+    print(f"有效读数:       {result['readings']}")
+    print(f"已连接设备:     结束时 {result['connected_last']}, 峰值 {result['connected_max']}")
+    if args.adapters > 1:
+        loads = ', '.join(f"{adapter} {load}" for adapter, load in result['adapter_loads'].items())
+        print(f"适配器连接数:   {loads}" + (f" ({result['failed_adapter']} 已故障)" if result['failed_adapter'] else ''))
+    print(f"重连次数用尽:   {result['exhausted_reconnects']} 个连接器")
+    print(f"重复连接设备:   {result['duplicate_connections'] or '无'}")
+    print(f"事件循环任务数: 开始 {result['tasks_first']}, 峰值 {result['tasks_max']}, 结束 {result['tasks_last']}")
+    print(f"残留任务:       模拟器 {result['leftover_simulator_tasks']}, 数据回调 {result['leftover_callback_tasks']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+联邦同步测试
+在子进程中启动 aggregator 模式的 web_app（使用临时数据库，不连接蓝牙设备），当前进程作为采集主机
+持续写入读数（包括早于最新读数的回填记录）并由 FederationSyncClient 推送；运行期间强制结束汇聚端进程，
+等待一段时间后在同一数据库上重新启动。最后检查:
+- 两端的读数条数与 (设备, 时间) 集合一致，汇聚端没有重复读数
+- 从头重新推送（模拟采集主机丢失同步进度）不会写入任何读数
+
+用法（在项目根目录运行）:
+    python benchmarks/federation_sync_test.py [--readings 20000] [--rate 2000] [--outage 3] [--batch-size 500]
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DEVICES = ['A4:C1:38:00:00:01', 'A4:C1:38:00:00:02', 'A4:C1:38:00:00:03']
+TOKEN = 'federation-test'
+
+
+# ---------------------------------------------------------------- 汇聚端
+
+def serve(port: int, db_path: str):
+    """在当前进程中运行 aggregator 模式的Web服务"""
+    os.chdir(ROOT)
+    from temperature_sensor_connector import server_config
+
+    server_config.setdefault('storage', {})['db_path'] = db_path
+    server_config['federation'] = {'mode': 'aggregator', 'token': TOKEN}
+    # 导出缓存、告警日志等写入数据库所在的临时目录
+    os.chdir(os.path.dirname(db_path))
+
+    import web_app
+
+    web_app.socketio.run(web_app.app, host='127.0.0.1', port=port, debug=False,
+                         log_output=False, allow_unsafe_werkzeug=True)
+
+
+def start_aggregator(port: int, db_path: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), '--serve', '--port', str(port), '--db', db_path],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def wait_for_server(base_url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    request = urllib.request.Request(base_url + '/api/federation/hosts', headers={'X-Federation-Token': TOKEN})
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"汇聚端进程已退出 (返回码 {process.returncode})")
+        try:
+            with urllib.request.urlopen(request, timeout=2):
+                return
+        except Exception:
+            time.sleep(0.3)
+    raise RuntimeError("等待汇聚端启动超时")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+# ---------------------------------------------------------------- 采集主机
+
+def produce(storage, data_class, count: int, rate: float, done: threading.Event):
+    """按固定速率写入读数，每20条中有一条早于最新读数（模拟设备历史记录回填）"""
+    start = datetime.now().replace(microsecond=0) - timedelta(seconds=count)
+    batch = []
+    interval = 20 / rate
+    next_time = time.monotonic()
+    for step in range(count):
+        offset = step - 1000 if step % 20 == 19 and step >= 1000 else step
+        address = DEVICES[step % len(DEVICES)]
+        batch.append(data_class(
+            temperature=20 + (step % 50) / 10, humidity=50 + (step % 20) / 2, battery=90, voltage=3000,
+            timestamp=start + timedelta(seconds=offset, milliseconds=step % len(DEVICES)),
+            device_name=f"Sensor-{address[-2:]}", device_address=address
+        ))
+        if len(batch) == 20:
+            storage.save_batch(batch, skip_existing=True)
+            batch = []
+            next_time += interval
+            time.sleep(max(0.0, next_time - time.monotonic()))
+    if batch:
+        storage.save_batch(batch, skip_existing=True)
+    done.set()
+
+
+def reading_keys(db_path: str) -> list:
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute('SELECT device_address, ts_epoch FROM temperature_data').fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="联邦同步测试（汇聚端中途重启）")
+    parser.add_argument('--readings', type=int, default=20000, help="采集主机写入的读数条数")
+    parser.add_argument('--rate', type=float, default=2000, help="每秒写入的读数条数")
+    parser.add_argument('--outage', type=float, default=3, help="汇聚端停止的时间（秒）")
+    parser.add_argument('--batch-size', type=int, default=500, help="每次推送的最大条数")
+    parser.add_argument('--port', type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.db)
+        return
+
+    os.chdir(ROOT)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    from federation_sync import FederationSyncClient, encode_batch
+    from temperature_sensor_connector import TemperatureData, TemperatureDataStorage
+
+    work_dir = tempfile.mkdtemp(prefix='federation_sync_test_')
+    collector_db = os.path.join(work_dir, 'collector.db')
+    aggregator_db = os.path.join(work_dir, 'aggregator.db')
+    port = args.port or free_port()
+    base_url = f'http://127.0.0.1:{port}'
+
+    storage = TemperatureDataStorage(collector_db)
+    client = FederationSyncClient(storage, base_url, host_id='collector-test', token=TOKEN,
+                                  batch_size=args.batch_size, interval=0.2, timeout=5, max_retry_interval=1)
+
+    print(f"🚀 启动汇聚端 {base_url}")
+    aggregator = start_aggregator(port, aggregator_db)
+    try:
+        wait_for_server(base_url, aggregator)
+
+        done = threading.Event()
+        producer = threading.Thread(target=produce, args=(storage, TemperatureData, args.readings, args.rate, done),
+                                    daemon=True)
+        started = time.monotonic()
+        producer.start()
+        client.start()
+
+        # 写入约三分之一后强制结束汇聚端
+        while client.pushed < args.readings // 3 and not done.is_set():
+            time.sleep(0.05)
+        print(f"💥 已推送 {client.pushed} 条，强制结束汇聚端，{args.outage:g} 秒后重启")
+        aggregator.send_signal(signal.SIGKILL)
+        aggregator.wait()
+        time.sleep(args.outage)
+        aggregator = start_aggregator(port, aggregator_db)
+        wait_for_server(base_url, aggregator)
+
+        done.wait()
+        _, local_last_id = storage.get_rows_after_id(0, limit=-1)
+        deadline = time.monotonic() + 120
+        while client.last_id != local_last_id:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"同步超时: 高水位 {client.last_id}，本地最大 id {local_last_id}")
+            time.sleep(0.1)
+        elapsed = time.monotonic() - started
+        client.stop(timeout=5)
+
+        # 丢失同步进度后从头推送，汇聚端应全部去重
+        rows, last_id = storage.get_rows_after_id(0, limit=-1)
+        request = urllib.request.Request(
+            base_url + '/api/federation/push', data=encode_batch('collector-test', 0, last_id, rows),
+            headers={'Content-Encoding': 'gzip', 'Content-Type': 'application/json', 'X-Federation-Token': TOKEN},
+            method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=60) as response:
+            replay = json.loads(response.read())
+    finally:
+        client.stop(timeout=5)
+        aggregator.terminate()
+        try:
+            aggregator.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            aggregator.kill()
+
+    local = reading_keys(collector_db)
+    remote = reading_keys(aggregator_db)
+    duplicates = len(remote) - len(set(remote))
+    print(f"⏱️  同步 {len(local)} 条读数用时 {elapsed:.1f} 秒，推送失败 {client.failures} 次")
+    print(f"   采集主机 {len(local)} 条，汇聚端 {len(remote)} 条，重复 {duplicates} 条")
+    print(f"   从头重新推送 {len(rows)} 条，新写入 {replay['inserted']} 条")
+
+    ok = set(local) == set(remote) and len(remote) == len(local) and not duplicates and replay['inserted'] == 0
+    print("✅ 两端数据一致" if ok else "❌ 两端数据不一致")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
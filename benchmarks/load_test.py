@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Web服务负载测试
+在子进程中启动 web_app（使用临时数据库，不连接蓝牙设备），由模拟数据源按固定频率调用
+socketio.emit 推送读数；同时逐级增加 Socket.IO polling 客户端，并用若干HTTP客户端循环请求
+/api/latest、/api/history、/api/status。每一级输出推送延迟 p50/p99、HTTP吞吐量与延迟、服务端内存。
+
+推送延迟为读数生成时间（temperature_update 中的 timestamp）到客户端收到事件的时间，
+服务端与客户端在同一台机器上运行，时钟一致。
+
+用法（在项目根目录运行，客户端需要 pip install "python-socketio[client]"）:
+    python benchmarks/load_test.py [--clients 10,50,100,200] [--duration 20] [--rate 2] [--http-workers 4]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from pathlib import Path
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+HTTP_ENDPOINTS = ['/api/latest', '/api/history?hours=24', '/api/status']
+DEVICES = ['A4:C1:38:00:00:01', 'A4:C1:38:00:00:02']
+
+
+# ---------------------------------------------------------------- 服务端
+
+def serve(port: int, rate: float, seed_hours: int):
+    """在当前进程中运行被测Web服务和模拟数据源"""
+    os.chdir(ROOT)
+    from temperature_sensor_connector import TemperatureData, server_config
+
+    # 使用临时目录保存数据库、导出缓存和告警日志，不影响正式数据
+    work_dir = tempfile.mkdtemp(prefix='load_test_')
+    server_config.setdefault('storage', {})['db_path'] = os.path.join(work_dir, 'load_test.db')
+    os.chdir(work_dir)
+
+    import web_app
+
+    seed_history(web_app.monitor.storage, TemperatureData, seed_hours)
+    # 不启动蓝牙扫描，只创建写库所需的采集组件
+    web_app.monitor.build_pipeline()
+
+    def publish_loop():
+        interval = 1.0 / rate
+        step = 0
+        next_time = time.monotonic()
+        while True:
+            step += 1
+            address = DEVICES[step % len(DEVICES)]
+            data = TemperatureData(
+                temperature=20 + (step % 50) / 10,
+                humidity=50 + (step % 20) / 2,
+                battery=90,
+                voltage=3000,
+                timestamp=datetime.now(),
+                device_name=f"Sensor-{address[-2:]}",
+                device_address=address
+            )
+            # 与 TemperatureMonitor 的数据回调相同的处理：更新最新值、推送、异步写库
+            web_app.latest_data = data
+            web_app.latest_by_device[address] = data
+            web_app.publish_reading(data)
+            web_app.monitor.async_storage.save_data_nowait(data)
+
+            next_time += interval
+            time.sleep(max(0.0, next_time - time.monotonic()))
+
+    threading.Thread(target=publish_loop, name='synthetic-publisher', daemon=True).start()
+    web_app.socketio.run(web_app.app, host='127.0.0.1', port=port, debug=False,
+                         log_output=False, allow_unsafe_werkzeug=True)
+
+
+def seed_history(storage, data_class, hours: int):
+    """写入每分钟一条的历史数据，使 /api/history 返回与实际部署相近的数据量"""
+    end = datetime.now()
+    batch = []
+    for minute in range(hours * 60, 0, -1):
+        for address in DEVICES:
+            batch.append(data_class(
+                temperature=22.0, humidity=55.0, battery=90, voltage=3000,
+                timestamp=end - timedelta(minutes=minute),
+                device_name=f"Sensor-{address[-2:]}", device_address=address
+            ))
+    storage.save_batch(batch)
+
+
+# ---------------------------------------------------------------- 客户端
+
+class LatencyRecorder:
+    """线程安全的延迟记录"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.values = []
+        self.errors = 0
+
+    def add(self, value: float):
+        with self._lock:
+            self.values.append(value)
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+    def drain(self):
+        with self._lock:
+            values, errors = self.values, self.errors
+            self.values, self.errors = [], 0
+        return values, errors
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def connect_client(base_url: str, recorder: LatencyRecorder):
+    """建立一个 polling 模式的 Socket.IO 客户端，记录 temperature_update 的推送延迟"""
+    import socketio
+
+    client = socketio.Client(reconnection=False)
+
+    @client.on('temperature_update')
+    def on_update(payload):
+        try:
+            sent = datetime.fromisoformat(payload['timestamp']).timestamp()
+            recorder.add((time.time() - sent) * 1000)
+        except (KeyError, ValueError):
+            recorder.error()
+
+    client.connect(base_url, transports=['polling'], wait_timeout=30)
+    return client
+
+
+def http_worker(base_url: str, stop: threading.Event, recorders: dict):
+    """循环请求HTTP接口"""
+    index = 0
+    while not stop.is_set():
+        endpoint = HTTP_ENDPOINTS[index % len(HTTP_ENDPOINTS)]
+        index += 1
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base_url + endpoint, timeout=30) as response:
+                response.read()
+            recorders[endpoint].add((time.perf_counter() - start) * 1000)
+        except Exception:
+            recorders[endpoint].error()
+
+
+def server_rss_mb(pid: int):
+    """读取服务端进程的常驻内存（MB）"""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss / 1024 / 1024
+        except psutil.Error:
+            return None
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(base_url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"服务端进程已退出 (返回码 {process.returncode})")
+        try:
+            with urllib.request.urlopen(base_url + '/api/status', timeout=2):
+                return
+        except Exception:
+            time.sleep(0.5)
+    raise RuntimeError("等待服务端启动超时")
+
+
+def run_step(base_url: str, clients: list, target: int, duration: float, http_workers: int,
+             push: LatencyRecorder, pid: int) -> dict:
+    """将客户端数量增加到 target 后压测 duration 秒，返回本级结果"""
+    connect_errors = 0
+    while len(clients) < target:
+        try:
+            clients.append(connect_client(base_url, push))
+        except Exception:
+            connect_errors += 1
+            if connect_errors > target:
+                break
+
+    # 丢弃连接阶段的数据
+    time.sleep(2)
+    push.drain()
+
+    recorders = {endpoint: LatencyRecorder() for endpoint in HTTP_ENDPOINTS}
+    stop = threading.Event()
+    workers = [threading.Thread(target=http_worker, args=(base_url, stop, recorders), daemon=True)
+               for _ in range(http_workers)]
+    start = time.monotonic()
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop.set()
+    for worker in workers:
+        worker.join(timeout=30)
+    elapsed = time.monotonic() - start
+
+    push_values, push_errors = push.drain()
+    http = {}
+    total_requests = 0
+    for endpoint, recorder in recorders.items():
+        values, errors = recorder.drain()
+        total_requests += len(values)
+        http[endpoint] = {
+            'requests': len(values),
+            'errors': errors,
+            'rps': round(len(values) / elapsed, 1),
+            'p50_ms': round(percentile(values, 0.5), 1),
+            'p99_ms': round(percentile(values, 0.99), 1),
+        }
+
+    rss = server_rss_mb(pid)
+    return {
+        'clients': len(clients),
+        'connect_errors': connect_errors,
+        'push_events': len(push_values),
+        'push_errors': push_errors,
+        'push_p50_ms': round(percentile(push_values, 0.5), 1),
+        'push_p99_ms': round(percentile(push_values, 0.99), 1),
+        'push_mean_ms': round(statistics.fmean(push_values), 1) if push_values else float('nan'),
+        'http_rps': round(total_requests / elapsed, 1),
+        'http': http,
+        'server_rss_mb': round(rss, 1) if rss is not None else None,
+    }
+
+
+def print_results(results: list):
+    print()
+    print(f"{'clients':>8} {'events':>8} {'push_p50':>9} {'push_p99':>9} {'http_rps':>9} {'rss_mb':>8}")
+    for row in results:
+        rss = row['server_rss_mb'] if row['server_rss_mb'] is not None else '-'
+        print(f"{row['clients']:>8} {row['push_events']:>8} {row['push_p50_ms']:>9} {row['push_p99_ms']:>9} "
+              f"{row['http_rps']:>9} {rss:>8}")
+    print()
+    print("HTTP接口延迟 (p50 / p99 ms):")
+    for row in results:
+        parts = [f"{endpoint.split('?')[0]} {stats['p50_ms']}/{stats['p99_ms']}"
+                 + (f" ({stats['errors']} 错误)" if stats['errors'] else '')
+                 for endpoint, stats in row['http'].items()]
+        print(f"  {row['clients']:>4} 客户端: " + ', '.join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Web服务 Socket.IO/HTTP 负载测试")
+    parser.add_argument('--clients', default='10,50,100,200', help="逐级增加的 Socket.IO 客户端数，逗号分隔")
+    parser.add_argument('--duration', type=float, default=20, help="每一级的压测时长（秒）")
+    parser.add_argument('--rate', type=float, default=2, help="模拟数据源每秒推送的读数条数")
+    parser.add_argument('--http-workers', type=int, default=4, help="循环请求HTTP接口的并发数")
+    parser.add_argument('--seed-hours', type=int, default=24, help="预先写入的历史数据小时数")
+    parser.add_argument('--port', type=int, default=0, help="服务端端口，默认自动选择空闲端口")
+    parser.add_argument('--json', help="将结果另存为JSON文件")
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.rate, args.seed_hours)
+        return
+
+    try:
+        import socketio  # noqa: F401
+        import requests  # noqa: F401
+    except ImportError:
+        print('❌ 缺少 Socket.IO 客户端依赖，请运行: pip install "python-socketio[client]"')
+        sys.exit(1)
+
+    port = args.port or free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    steps = sorted(int(n) for n in args.clients.split(',') if n.strip())
+
+    print(f"🚀 启动被测服务 {base_url}（模拟推送 {args.rate} 条/秒）")
+    process = subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), '--serve', '--port', str(port),
+         '--rate', str(args.rate), '--seed-hours', str(args.seed_hours)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    clients = []
+    results = []
+    push = LatencyRecorder()
+    try:
+        wait_for_server(base_url, process)
+        idle_rss = server_rss_mb(process.pid)
+        if idle_rss is not None:
+            print(f"   空载内存: {idle_rss:.1f} MB")
+
+        for target in steps:
+            print(f"⏱️  {target} 个客户端，压测 {args.duration:.0f} 秒...")
+            result = run_step(base_url, clients, target, args.duration, args.http_workers, push, process.pid)
+            results.append(result)
+            print(f"   推送 p50 {result['push_p50_ms']} ms / p99 {result['push_p99_ms']} ms, "
+                  f"HTTP {result['http_rps']} 请求/秒, 内存 {result['server_rss_mb']} MB")
+    except KeyboardInterrupt:
+        print("\n⏹️  已中断")
+    finally:
+        for client in clients:
+            try:
+                client.disconnect()
+            except Exception:
+                pass
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    if results:
+        print_results(results)
+        if args.json:
+            Path(args.json).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+            print(f"\n结果已保存到 {args.json}")
+
+
+if __name__ == '__main__':
+    main()
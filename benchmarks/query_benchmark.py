@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+时间范围查询基准测试
+生成模拟数据库，对1小时/24小时/30天范围的查询输出 EXPLAIN QUERY PLAN 与耗时，
+确认查询在 ts_epoch 索引上做有界范围扫描（SEARCH ... USING INDEX），而不是全表扫描
+
+用法（在项目根目录运行）:
+    python benchmarks/query_benchmark.py [--days 90] [--devices 2] [--interval 60]
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# 添加项目根目录到Python路径，并切换到根目录以读取 static/config.json
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+from temperature_sensor_connector import TemperatureDataStorage, to_epoch  # noqa: E402
+
+WINDOWS = [
+    ('1h', timedelta(hours=1)),
+    ('24h', timedelta(hours=24)),
+    ('30d', timedelta(days=30)),
+]
+
+
+def populate(storage: TemperatureDataStorage, days: int, devices: int, interval: int) -> int:
+    """按固定间隔为每个设备生成读数，返回写入行数"""
+    end = datetime.now().replace(microsecond=0)
+    start = end - timedelta(days=days)
+    steps = int((end - start).total_seconds() // interval)
+
+    conn = sqlite3.connect(storage.db_path)
+    rows = 0
+    for device_index in range(devices):
+        address = f"A4:C1:38:00:00:{device_index:02X}"
+        batch = []
+        for step in range(steps):
+            timestamp = start + timedelta(seconds=step * interval)
+            batch.append((
+                timestamp.isoformat(), 20 + (step % 100) / 10, 50 + (step % 40) / 2, 90, 3000,
+                f"Sensor-{device_index}", address, to_epoch(timestamp)
+            ))
+        conn.executemany('''
+            INSERT INTO temperature_data
+            (timestamp, temperature, humidity, battery, voltage, device_name, device_address, ts_epoch)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', batch)
+        rows += len(batch)
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+    storage.rebuild_coverage()
+    return rows
+
+
+def query_plan(db_path: str, start_time: datetime, end_time: datetime, device_address=None) -> list:
+    """捕获 TemperatureDataStorage 实际执行的SQL并返回其查询计划"""
+    conn = sqlite3.connect(db_path)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    TemperatureDataStorage._execute_time_range(conn.cursor(), start_time, end_time, device_address)
+    conn.set_trace_callback(None)
+    plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + statements[-1])]
+    conn.close()
+    return plan
+
+
+def legacy_span(db_path: str, start_time: datetime, end_time: datetime) -> tuple:
+    """旧实现：按 isoformat 字符串比较 timestamp 列，返回 (行数, 最早时间, 最晚时间)"""
+    conn = sqlite3.connect(db_path)
+    span = conn.execute(
+        'SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM temperature_data WHERE timestamp BETWEEN ? AND ?',
+        (start_time.isoformat(), end_time.isoformat())
+    ).fetchone()
+    conn.close()
+    return span
+
+
+def main():
+    parser = argparse.ArgumentParser(description='时间范围查询基准测试')
+    parser.add_argument('--days', type=int, default=90, help='模拟数据天数')
+    parser.add_argument('--devices', type=int, default=2, help='模拟设备数')
+    parser.add_argument('--interval', type=int, default=60, help='读数间隔（秒）')
+    parser.add_argument('--repeat', type=int, default=5, help='每个查询的重复次数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'benchmark.db')
+        storage = TemperatureDataStorage(db_path)
+
+        started = time.perf_counter()
+        rows = populate(storage, args.days, args.devices, args.interval)
+        print(f"生成 {rows} 条数据，用时 {time.perf_counter() - started:.1f}s")
+        print()
+
+        device_address = "A4:C1:38:00:00:00"
+        end_time = datetime.now().astimezone(timezone.utc)  # 带时区的UTC时间，模拟前端传入的参数
+        all_seek = True
+
+        for label, span in WINDOWS:
+            start_time = end_time - span
+            for device in (None, device_address):
+                plan = query_plan(db_path, start_time, end_time, device)
+                seek = all(detail.startswith('SEARCH') for detail in plan)
+                all_seek = all_seek and seek
+
+                timings = []
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    result = storage.get_columns_by_time_range(start_time, end_time, device)
+                    timings.append((time.perf_counter() - t0) * 1000)
+
+                scope = '单设备' if device else '全部设备'
+                print(f"[{label} {scope}] {len(result)} 行, 中位数 {statistics.median(timings):.2f}ms, "
+                      f"最大 {max(timings):.2f}ms {'✅ 索引范围扫描' if seek else '⚠️ 非索引扫描'}")
+                for detail in plan:
+                    print(f"    {detail}")
+
+            legacy_count, legacy_start, legacy_end = legacy_span(db_path, start_time, end_time)
+            expected = storage.get_columns_by_time_range(start_time, end_time)
+            expected_span = f"{min(expected.timestamps)} ~ {max(expected.timestamps)}" if expected else '-'
+            print(f"    旧实现（字符串比较）: {legacy_count} 行, {legacy_start} ~ {legacy_end}")
+            print(f"    当前实现（epoch比较）: {len(expected)} 行, {expected_span}")
+            print()
+
+        storage._read_pool.close()
+        print('全部查询均为索引范围扫描' if all_seek else '存在非索引扫描的查询')
+        sys.exit(0 if all_seek else 1)
+
+
+if __name__ == '__main__':
+    main()
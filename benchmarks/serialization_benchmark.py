@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+读数序列化基准测试
+比较每条读数从创建到推送/接口响应的CPU开销，以及24小时历史数据接口的响应生成时间:
+- 读数: 旧实现（dataclass + asdict + 每次推送重新 json.dumps）与当前实现（__slots__ + 缓存的JSON）
+- 历史数据: 逐行构造字典再 json.dumps 与 SQLite JSON1 在查询中拼接JSON
+
+用法（在项目根目录运行）:
+    python benchmarks/serialization_benchmark.py [--readings 20000] [--rooms 2] [--hours 24] [--devices 2]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+# 添加项目根目录到Python路径，并切换到根目录以读取 static/config.json
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+import fast_json  # noqa: E402
+from temperature_sensor_connector import TemperatureData, TemperatureDataStorage  # noqa: E402
+
+
+@dataclass
+class LegacyTemperatureData:
+    """旧版读数结构（dataclass，to_dict 每次调用 asdict）"""
+    temperature: float
+    humidity: float
+    battery: Optional[int] = None
+    voltage: Optional[int] = None
+    timestamp: Optional[datetime] = None
+    device_name: Optional[str] = None
+    device_address: Optional[str] = None
+
+    def to_dict(self):
+        data = asdict(self)
+        if self.timestamp:
+            data['timestamp'] = self.timestamp.isoformat()
+        return data
+
+
+def make_reading(cls, step: int, now: datetime):
+    return cls(
+        temperature=20 + (step % 500) / 100,
+        humidity=50 + (step % 40) / 2,
+        battery=90,
+        voltage=3000,
+        timestamp=now + timedelta(seconds=step),
+        device_name='LYWSD03MMC',
+        device_address='A4:C1:38:00:00:01'
+    )
+
+
+def legacy_pipeline(reading: LegacyTemperatureData, rooms: int):
+    """旧实现: 每个房间的推送都序列化一次字典，最新数据接口和落盘各再序列化一次"""
+    payload = reading.to_dict()
+    for _ in range(rooms):
+        json.dumps(['temperature_update', payload], separators=(',', ':'))
+    json.dumps(reading.to_dict())
+    json.dumps(reading.to_dict(), ensure_ascii=False, separators=(',', ':'))
+
+
+def current_pipeline(reading: TemperatureData, rooms: int):
+    """当前实现: 读数只序列化一次，推送时直接拼接"""
+    payload = reading.json_payload()
+    for _ in range(rooms):
+        fast_json.dumps(['temperature_update', payload], separators=(',', ':'))
+    reading.to_json()
+    reading.to_json()
+
+
+def bench_readings(cls, pipeline, count: int, rooms: int) -> dict:
+    now = datetime.now()
+    start = time.process_time()
+    for step in range(count):
+        pipeline(make_reading(cls, step, now), rooms)
+    cpu = time.process_time() - start
+
+    # 读数对象本身占用的内存，以及推送过程中的分配峰值（缓存的JSON计入峰值）
+    tracemalloc.start()
+    readings = [make_reading(cls, step, now) for step in range(1000)]
+    instance_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for reading in readings:
+        pipeline(reading, rooms)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'us_per_reading': cpu / count * 1e6,
+        'instance_bytes': instance_size / len(readings),
+        'peak_bytes': (peak - instance_size) / len(readings),
+    }
+
+
+def bench_history(hours: int, devices: int, repeat: int) -> dict:
+    work_dir = tempfile.mkdtemp(prefix='serialization_benchmark_')
+    storage = TemperatureDataStorage(os.path.join(work_dir, 'bench.db'))
+    end = datetime.now()
+    batch = []
+    for minute in range(hours * 60, 0, -1):
+        for index in range(devices):
+            batch.append(TemperatureData(
+                temperature=22.0 + minute % 7 / 10, humidity=55.0, battery=90, voltage=3000,
+                timestamp=end - timedelta(minutes=minute),
+                device_name=f'Sensor-{index}', device_address=f'A4:C1:38:00:00:{index:02X}'
+            ))
+    storage.save_batch(batch)
+    start_time = end - timedelta(hours=hours)
+
+    def python_path():
+        return json.dumps(storage.get_data_by_time_range(start_time, end)).encode('utf-8')
+
+    def json1_path():
+        return storage.get_history_json(start_time, end)
+
+    assert json.loads(python_path()) == json.loads(json1_path()), "两种实现的结果不一致"
+
+    result = {'rows': len(batch)}
+    for name, func in (('python', python_path), ('json1', json1_path)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            body = func()
+        result[f'{name}_ms'] = (time.perf_counter() - start) / repeat * 1000
+        result[f'{name}_bytes'] = len(body)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="读数序列化与历史数据接口基准测试")
+    parser.add_argument('--readings', type=int, default=20000, help="每种实现处理的读数条数")
+    parser.add_argument('--rooms', type=int, default=2, help="每条读数推送的房间数（所有设备 + 单设备）")
+    parser.add_argument('--hours', type=int, default=24, help="历史数据小时数（每分钟一条）")
+    parser.add_argument('--devices', type=int, default=2, help="历史数据的设备数")
+    parser.add_argument('--repeat', type=int, default=20, help="历史数据接口的重复次数")
+    args = parser.parse_args()
+
+    print(f"JSON后端: {'orjson' if fast_json.orjson is not None else '标准库 json'}")
+    print()
+    legacy = bench_readings(LegacyTemperatureData, legacy_pipeline, args.readings, args.rooms)
+    current = bench_readings(TemperatureData, current_pipeline, args.readings, args.rooms)
+    print(f"每条读数 ({args.rooms} 个房间推送 + 最新数据接口 + 落盘编码):")
+    for label, result in (('旧实现:  ', legacy), ('当前实现:', current)):
+        print(f"  {label} {result['us_per_reading']:7.1f} µs CPU, 对象 {result['instance_bytes']:5.0f} 字节, "
+              f"处理时内存增长 {result['peak_bytes']:5.0f} 字节")
+
+    history = bench_history(args.hours, args.devices, args.repeat)
+    print()
+    print(f"历史数据接口 ({history['rows']} 条, {history['json1_bytes'] / 1024:.0f} KB):")
+    print(f"  字典 + json.dumps: {history['python_ms']:7.1f} ms")
+    print(f"  SQLite JSON1:      {history['json1_ms']:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
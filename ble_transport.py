@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+蓝牙传输层
+- BleTransport: 连接器使用的传输接口（设备发现 + 创建客户端）
+- BleakTransport: 基于 bleak 的真实蓝牙实现，可指定使用的蓝牙适配器（Linux/BlueZ，如 hci1）
+- SimulatedTransport: 进程内模拟的温度计和蓝牙适配器，可注入发现延迟、连接失败、随机断线、通知频率、
+  畸形数据包、适配器连接数上限和适配器故障，用于在没有蓝牙硬件的机器上复现重连风暴和任务泄漏
+"""
+
+import asyncio
+import logging
+import random
+import struct
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    from bleak import BleakClient, BleakScanner
+except ImportError:
+    BleakClient = None
+    BleakScanner = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DiscoveredDevice:
+    """扫描发现的设备"""
+    name: Optional[str]
+    address: str
+    rssi: Optional[int] = None
+
+
+class BleTransport:
+    """蓝牙传输接口"""
+
+    def list_adapters(self) -> List[Optional[str]]:
+        """本机可用的蓝牙适配器，[None] 表示只能使用系统默认适配器"""
+        return [None]
+
+    async def discover(self, timeout: float, adapter: Optional[str] = None) -> List[DiscoveredDevice]:
+        """
+        扫描附近的设备
+
+        Args:
+            timeout: 扫描时间（秒）
+            adapter: 使用的蓝牙适配器，为空时使用默认适配器
+        """
+        raise NotImplementedError
+
+    def create_client(self, address: str, disconnected_callback: Callable, adapter: Optional[str] = None):
+        """
+        创建设备客户端
+
+        返回的客户端需提供与 BleakClient 相同的方法：connect、disconnect、start_notify、
+        stop_notify、read_gatt_char、write_gatt_char 以及 is_connected 属性
+
+        Args:
+            address: 设备地址
+            disconnected_callback: 连接断开时以客户端为参数调用
+            adapter: 建立连接使用的蓝牙适配器，为空时使用默认适配器
+        """
+        raise NotImplementedError
+
+
+class BleakTransport(BleTransport):
+    """基于 bleak 的蓝牙传输"""
+
+    def __init__(self):
+        if BleakClient is None:
+            raise RuntimeError("未安装bleak库，请运行: pip install bleak")
+
+    def list_adapters(self) -> List[Optional[str]]:
+        # 只有 BlueZ 后端支持 adapter 参数，适配器名称取自 /sys/class/bluetooth
+        if sys.platform.startswith('linux'):
+            adapters = sorted(path.name for path in Path('/sys/class/bluetooth').glob('hci*')
+                              if ':' not in path.name)
+            if adapters:
+                return adapters
+        return [None]
+
+    async def discover(self, timeout: float, adapter: Optional[str] = None) -> List[DiscoveredDevice]:
+        kwargs = {'adapter': adapter} if adapter else {}
+        devices = await BleakScanner.discover(timeout=timeout, return_adv=True, **kwargs)
+        return [DiscoveredDevice(device.name, device.address, advertisement.rssi)
+                for device, advertisement in devices.values()]
+
+    def create_client(self, address: str, disconnected_callback: Callable, adapter: Optional[str] = None):
+        kwargs = {'adapter': adapter} if adapter else {}
+        return BleakClient(address, disconnected_callback=disconnected_callback, **kwargs)
+
+
+@dataclass
+class FaultProfile:
+    """模拟设备的故障参数（时间单位为秒，概率为0~1）"""
+    discovery_latency: float = 1.0       # 扫描耗时
+    discovery_miss_rate: float = 0.0     # 单次扫描漏掉某个设备的概率
+    connect_latency: float = 0.5         # 建立连接耗时
+    connect_failure_rate: float = 0.1    # 连接失败概率
+    mean_connected_time: float = 60.0    # 平均连接时长（指数分布），0 表示不会随机断线
+    notify_interval: float = 2.0         # 通知间隔
+    notify_jitter: float = 0.2           # 通知间隔的随机抖动比例
+    malformed_rate: float = 0.02         # 畸形数据包概率
+
+
+@dataclass
+class SimulatedCharacteristic:
+    """模拟的GATT特征"""
+    uuid: str
+
+
+@dataclass
+class SimulatorStats:
+    """模拟器事件计数"""
+    scans: int = 0
+    connects: int = 0
+    connect_failures: int = 0
+    disconnects: int = 0
+    random_disconnects: int = 0
+    frames: int = 0
+    malformed_frames: int = 0
+    adapter_failures: int = 0
+    max_concurrent_connections: Dict[str, int] = field(default_factory=dict)
+
+
+class SimulatedSensor:
+    """一个模拟的温度计"""
+
+    # 实时数据通知使用的特征（Mi 格式: 温度 s16 0.01°C, 湿度 u8 %, 电压 u16 mV）
+    NOTIFY_UUID = 'ebe0ccc1-7a0a-4b0c-8a1a-6ff2997da3a6'
+
+    def __init__(self, name: str, address: str, faults: FaultProfile, rng: random.Random,
+                 adapters: Optional[List[str]] = None):
+        self.name = name
+        self.address = address
+        self.faults = faults
+        self.rng = rng
+        self.temperature = rng.uniform(18, 28)
+        self.humidity = rng.uniform(35, 65)
+        self.connections = 0  # 当前连接到本设备的客户端数，大于1说明连接器重复连接
+        # 各适配器收到的信号强度（dBm），模拟设备与各个USB蓝牙适配器的距离不同
+        self.rssi = {adapter: rng.randrange(-95, -45) for adapter in adapters or []}
+
+    def next_frame(self, stats: SimulatorStats) -> bytearray:
+        """生成下一条通知数据，按概率生成畸形数据包"""
+        stats.frames += 1
+        if self.rng.random() < self.faults.malformed_rate:
+            stats.malformed_frames += 1
+            kind = self.rng.randrange(3)
+            if kind == 0:
+                return bytearray(self.rng.randrange(1, 3))  # 过短
+            if kind == 1:
+                return bytearray(self.rng.getrandbits(8) for _ in range(5))  # 随机字节
+            return bytearray(b'\xff' * self.rng.randrange(5, 12))  # 超出量程
+
+        self.temperature += self.rng.uniform(-0.05, 0.05)
+        self.humidity = min(100.0, max(0.0, self.humidity + self.rng.uniform(-0.3, 0.3)))
+        return bytearray(struct.pack('<hBH', round(self.temperature * 100), round(self.humidity), 2900))
+
+
+class SimulatedClient:
+    """模拟的设备客户端，接口与 BleakClient 一致"""
+
+    def __init__(self, transport: 'SimulatedTransport', sensor: Optional[SimulatedSensor], address: str,
+                 disconnected_callback: Optional[Callable], adapter: str):
+        self.transport = transport
+        self.sensor = sensor
+        self.address = address
+        self.disconnected_callback = disconnected_callback
+        self.adapter = adapter
+        self.is_connected = False
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def connect(self, **kwargs) -> bool:
+        faults = self.transport.faults
+        stats = self.transport.stats
+        await asyncio.sleep(self.transport.jitter(faults.connect_latency))
+        if self.adapter in self.transport.failed_adapters or self.adapter not in self.transport.adapters:
+            stats.connect_failures += 1
+            raise ConnectionError(f"模拟适配器 {self.adapter} 不可用")
+        capacity = self.transport.adapter_capacity
+        if capacity and self.transport.adapter_load(self.adapter) >= capacity:
+            stats.connect_failures += 1
+            raise ConnectionError(f"模拟适配器 {self.adapter} 连接数已满 ({capacity})")
+        if self.sensor is None or self.transport.rng.random() < faults.connect_failure_rate:
+            stats.connect_failures += 1
+            raise ConnectionError(f"模拟连接失败: {self.address}")
+
+        self.is_connected = True
+        self.transport.clients.add(self)
+        stats.connects += 1
+        self.sensor.connections += 1
+        peak = stats.max_concurrent_connections.get(self.address, 0)
+        stats.max_concurrent_connections[self.address] = max(peak, self.sensor.connections)
+
+        if faults.mean_connected_time > 0:
+            lifetime = self.transport.rng.expovariate(1 / faults.mean_connected_time)
+            self._spawn('watchdog', self._drop_after(lifetime))
+        return True
+
+    async def disconnect(self) -> bool:
+        if self.is_connected:
+            self._close()
+        return True
+
+    async def start_notify(self, uuid: str, callback: Callable):
+        self._require_connected()
+        if uuid.lower() != SimulatedSensor.NOTIFY_UUID:
+            raise ValueError(f"模拟设备不支持特征 {uuid}")
+        self._spawn(f'notify:{uuid}', self._notify_loop(SimulatedCharacteristic(uuid.lower()), callback))
+
+    async def stop_notify(self, uuid: str):
+        task = self._tasks.pop(f'notify:{uuid}', None)
+        if task:
+            task.cancel()
+
+    async def read_gatt_char(self, uuid: str) -> bytearray:
+        self._require_connected()
+        if uuid.lower() != SimulatedSensor.NOTIFY_UUID:
+            raise ValueError(f"模拟设备不支持特征 {uuid}")
+        return self.sensor.next_frame(self.transport.stats)
+
+    async def write_gatt_char(self, uuid: str, data: bytes, response: bool = False):
+        self._require_connected()
+        raise ValueError(f"模拟设备不支持写入特征 {uuid}")
+
+    def _require_connected(self):
+        if not self.is_connected:
+            raise ConnectionError("设备未连接")
+
+    def _spawn(self, name: str, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks[name] = task
+        self.transport.tasks.add(task)
+        task.add_done_callback(self.transport.tasks.discard)
+
+    async def _notify_loop(self, characteristic: SimulatedCharacteristic, callback: Callable):
+        faults = self.transport.faults
+        while self.is_connected:
+            await asyncio.sleep(self.transport.jitter(faults.notify_interval, faults.notify_jitter))
+            if self.is_connected:
+                callback(characteristic, self.sensor.next_frame(self.transport.stats))
+
+    async def _drop_after(self, lifetime: float):
+        await asyncio.sleep(lifetime)
+        if self.is_connected:
+            self.transport.stats.random_disconnects += 1
+            self._close(notify=True)
+
+    def _close(self, notify: bool = False):
+        """断开连接并停止所有后台任务，notify 为 True 时调用断开回调（设备侧断开）"""
+        self.is_connected = False
+        self.transport.clients.discard(self)
+        self.sensor.connections -= 1
+        self.transport.stats.disconnects += 1
+        current = asyncio.current_task()
+        for task in self._tasks.values():
+            if task is not current:
+                task.cancel()
+        self._tasks.clear()
+        if notify and self.disconnected_callback:
+            self.disconnected_callback(self)
+
+
+class SimulatedTransport(BleTransport):
+    """进程内模拟的蓝牙传输，相同的随机种子产生相同的故障序列"""
+
+    def __init__(self, sensor_count: int = 1, faults: Optional[FaultProfile] = None, seed: int = 0,
+                 name_prefix: str = 'LYWSD03MMC', adapters: Optional[List[str]] = None,
+                 adapter_capacity: int = 0):
+        """
+        初始化模拟传输
+
+        Args:
+            sensor_count: 模拟的温度计数量
+            faults: 故障参数
+            seed: 随机种子
+            name_prefix: 设备名称前缀
+            adapters: 模拟的蓝牙适配器名称，默认只有 hci0
+            adapter_capacity: 每个适配器同时保持的最大连接数，0 表示不限制
+        """
+        self.faults = faults or FaultProfile()
+        self.rng = random.Random(seed)
+        self.stats = SimulatorStats()
+        self.tasks = set()  # 模拟器自身的后台任务（通知、断线计时）
+        self.clients = set()  # 已连接的客户端
+        self.adapters = list(adapters or ['hci0'])
+        self.adapter_capacity = adapter_capacity
+        self.failed_adapters = set()
+        self.sensors: Dict[str, SimulatedSensor] = {}
+        for index in range(sensor_count):
+            address = f"A4:C1:38:{index >> 16 & 0xFF:02X}:{index >> 8 & 0xFF:02X}:{index & 0xFF:02X}"
+            name = f"{name_prefix}_{index:04d}"
+            self.sensors[address] = SimulatedSensor(name, address, self.faults,
+                                                    random.Random(seed * 1000003 + index), self.adapters)
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> 'SimulatedTransport':
+        """
+        根据配置创建模拟传输
+
+        Args:
+            config: 配置中的 simulator 部分，如 {"sensors": 50, "seed": 1, "faults": {"connect_failure_rate": 0.3}}
+        """
+        config = config or {}
+        return cls(
+            sensor_count=config.get('sensors', 1),
+            faults=FaultProfile(**config.get('faults', {})),
+            seed=config.get('seed', 0),
+            adapters=config.get('adapters'),
+            adapter_capacity=config.get('adapter_capacity', 0)
+        )
+
+    def jitter(self, value: float, ratio: float = 0.2) -> float:
+        """在 value 上下 ratio 比例内随机取值"""
+        return max(0.0, value * (1 + self.rng.uniform(-ratio, ratio)))
+
+    def list_adapters(self) -> List[Optional[str]]:
+        return list(self.adapters)
+
+    async def discover(self, timeout: float, adapter: Optional[str] = None) -> List[DiscoveredDevice]:
+        adapter = adapter or self.adapters[0]
+        self.stats.scans += 1
+        await asyncio.sleep(min(timeout, self.jitter(self.faults.discovery_latency)))
+        if adapter in self.failed_adapters or adapter not in self.adapters:
+            raise OSError(f"模拟适配器 {adapter} 不可用")
+        return [DiscoveredDevice(sensor.name, sensor.address, sensor.rssi[adapter] + self.rng.randrange(-3, 4))
+                for sensor in self.sensors.values()
+                if self.rng.random() >= self.faults.discovery_miss_rate]
+
+    def create_client(self, address: str, disconnected_callback: Callable,
+                      adapter: Optional[str] = None) -> SimulatedClient:
+        return SimulatedClient(self, self.sensors.get(address), address, disconnected_callback,
+                               adapter or self.adapters[0])
+
+    def adapter_load(self, adapter: str) -> int:
+        """适配器当前的连接数"""
+        return sum(1 for client in self.clients if client.adapter == adapter)
+
+    def fail_adapter(self, adapter: str):
+        """模拟适配器故障（如USB蓝牙适配器被拔出）：断开其上的所有连接，恢复前无法扫描和连接"""
+        self.failed_adapters.add(adapter)
+        self.stats.adapter_failures += 1
+        for client in [client for client in self.clients if client.adapter == adapter]:
+            client._close(notify=True)
+
+    def restore_adapter(self, adapter: str):
+        """恢复故障的适配器"""
+        self.failed_adapters.discard(adapter)
+
+    def duplicate_connections(self) -> Dict[str, int]:
+        """同一设备同时存在多个连接的次数峰值（大于1的设备）"""
+        return {address: peak for address, peak in self.stats.max_concurrent_connections.items() if peak > 1}
+
+
+def create_transport(config: Optional[dict] = None) -> BleTransport:
+    """
+    根据配置创建传输
+
+    Args:
+        config: 配置文件中 server.ble 部分，backend 为 "bleak"（默认）或 "simulated"
+    """
+    config = config or {}
+    backend = config.get('backend', 'bleak')
+    if backend == 'simulated':
+        logger.warning("⚠️ 使用模拟蓝牙设备，读数为模拟数据")
+        return SimulatedTransport.from_config(config.get('simulator'))
+    if backend != 'bleak':
+        raise ValueError(f"未知的蓝牙后端: {backend}")
+    return BleakTransport()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静态资源构建脚本
+将页面使用的CSS/JS合并为少量文件，文件名带内容哈希，并生成gzip/brotli预压缩版本，
+图标样式只保留页面实际使用的图标。构建结果输出到 static/dist，由Web服务以长期缓存方式提供。
+
+用法（在项目根目录运行）:
+    python build_assets.py
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import re
+import shutil
+import sys
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from fontTools import subset as font_subset
+except ImportError:
+    font_subset = None
+
+ROOT = Path(__file__).resolve().parent
+STATIC_DIR = ROOT / 'static'
+DIST_DIR = STATIC_DIR / 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# 合并后的资源及其来源（相对 static 目录，按顺序拼接）
+BUNDLES = {
+    'css/bundle.css': [
+        'vendor/bootstrap/css/bootstrap.min.css',
+        'vendor/bootstrap-icons/bootstrap-icons.css',
+        'css/style.css',
+    ],
+    # 页面头部加载的脚本
+    'js/head.js': [
+        'vendor/chartjs/chart.min.js',
+        'vendor/socketio/socket.io.min.js',
+        'js/i18n.js',
+    ],
+    # 页面底部加载的脚本
+    'js/app.js': [
+        'vendor/bootstrap/js/bootstrap.bundle.min.js',
+        'js/history-cache.js',
+        'js/app.js',
+    ],
+}
+
+# 按原样发布（仅加哈希）的资源
+ASSETS = [
+    'js/i18n/zh.json',
+    'js/i18n/en.json',
+]
+
+ICONS_CSS = 'vendor/bootstrap-icons/bootstrap-icons.css'
+ICON_FONTS = ['vendor/bootstrap-icons/fonts/bootstrap-icons.woff2', 'vendor/bootstrap-icons/fonts/bootstrap-icons.woff']
+
+# 扫描图标类名的文件
+ICON_SOURCES = ['templates/*.html', 'static/js/*.js']
+ICON_PATTERN = re.compile(r'\bbi-[a-z0-9-]+')
+
+# 需要预压缩的文件类型
+COMPRESSIBLE = {'.css', '.js', '.json', '.svg'}
+
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+logger = logging.getLogger(__name__)
+
+
+def hashed_name(logical_path: str, content: bytes) -> str:
+    """在扩展名前插入内容哈希，如 js/app.js -> js/app.1a2b3c4d5e.js"""
+    path = Path(logical_path)
+    digest = hashlib.sha256(content).hexdigest()[:10]
+    return str(path.with_name(f"{path.stem}.{digest}{path.suffix}").as_posix())
+
+
+def used_icons() -> set:
+    """扫描模板和脚本中使用的图标类名"""
+    icons = set()
+    for pattern in ICON_SOURCES:
+        for path in ROOT.glob(pattern):
+            icons.update(ICON_PATTERN.findall(path.read_text(encoding='utf-8')))
+    return icons
+
+
+def icon_codepoints(css: str, icons: set) -> dict:
+    """从 bootstrap-icons.css 中解析图标类名对应的字符码"""
+    codepoints = {}
+    for name, code in re.findall(r'\.(bi-[a-z0-9-]+)::before\s*\{\s*content:\s*"\\([0-9a-f]+)"', css):
+        if name in icons:
+            codepoints[name] = int(code, 16)
+    return codepoints
+
+
+def subset_icons_css(css: str, icons: set, font_urls: dict) -> str:
+    """
+    只保留使用到的图标规则
+
+    Args:
+        css: bootstrap-icons.css 内容
+        icons: 使用到的图标类名
+        font_urls: 原字体文件名 -> 构建后的URL
+    """
+    # 字体声明和 .bi 基础规则位于第一个图标规则之前
+    first_icon = re.search(r'\.bi-[a-z0-9-]+::before\s*\{', css)
+    header = css[:first_icon.start()] if first_icon else css
+
+    for font_name, url in font_urls.items():
+        header = re.sub(r'url\("\./fonts/' + re.escape(font_name) + r'[^"]*"\)', f'url("{url}")', header)
+
+    rules = [f'.{name}::before {{ content: "\\{code:x}"; }}'
+             for name, code in sorted(icon_codepoints(css, icons).items())]
+    return header + '\n'.join(rules) + '\n'
+
+
+def subset_font(content: bytes, codepoints: set, flavor: str) -> bytes:
+    """使用 fontTools 裁剪字体，只保留使用到的字形；未安装 fontTools 时返回原字体"""
+    if font_subset is None or not codepoints:
+        return content
+    if flavor == 'woff2' and brotli is None:
+        # fontTools 生成 woff2 需要 brotli
+        return content
+
+    import io
+    from fontTools.ttLib import TTFont
+
+    font = TTFont(io.BytesIO(content))
+    options = font_subset.Options()
+    options.flavor = flavor
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    output = io.BytesIO()
+    font.save(output)
+    return output.getvalue()
+
+
+def write_asset(logical_path: str, content: bytes, manifest: dict) -> str:
+    """写入带哈希的资源文件及其预压缩版本，返回构建后的相对路径"""
+    built_path = hashed_name(logical_path, content)
+    target = DIST_DIR / built_path
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_bytes(content)
+
+    if target.suffix in COMPRESSIBLE:
+        # mtime=0 保证相同内容生成相同的压缩文件
+        Path(f"{target}.gz").write_bytes(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            Path(f"{target}.br").write_bytes(brotli.compress(content, quality=11))
+
+    manifest[logical_path] = built_path
+    logger.info(f"  {logical_path} -> {built_path} ({len(content) / 1024:.1f} KB)")
+    return built_path
+
+
+def build() -> dict:
+    """构建全部静态资源，返回资源清单"""
+    if DIST_DIR.exists():
+        shutil.rmtree(DIST_DIR)
+    DIST_DIR.mkdir(parents=True)
+
+    manifest = {}
+    icons = used_icons()
+    icons_css = (STATIC_DIR / ICONS_CSS).read_text(encoding='utf-8')
+    codepoints = set(icon_codepoints(icons_css, icons).values())
+    logger.info(f"使用到的图标: {len(icons)} 个")
+
+    # 字体需先构建，图标样式中引用的是带哈希的字体地址
+    font_urls = {}
+    for font in ICON_FONTS:
+        font_path = Path(font)
+        content = subset_font((STATIC_DIR / font).read_bytes(), codepoints, font_path.suffix.lstrip('.'))
+        built = write_asset(f"fonts/{font_path.name}", content, manifest)
+        font_urls[font_path.name] = f"../{built}"
+
+    for bundle, sources in BUNDLES.items():
+        parts = []
+        for source in sources:
+            text = (STATIC_DIR / source).read_text(encoding='utf-8')
+            if source == ICONS_CSS:
+                text = subset_icons_css(text, icons, font_urls)
+            # 分号隔开，避免前一个脚本末尾缺少分号时与下一个脚本连在一起
+            parts.append(text if bundle.endswith('.css') else text + '\n;')
+        write_asset(bundle, '\n'.join(parts).encode('utf-8'), manifest)
+
+    for asset in ASSETS:
+        write_asset(asset, (STATIC_DIR / asset).read_bytes(), manifest)
+
+    (DIST_DIR / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding='utf-8')
+    return manifest
+
+
+def main():
+    print("📦 构建静态资源")
+    if brotli is None:
+        logger.warning("未安装 brotli，只生成gzip预压缩文件 (pip install brotli)")
+    if font_subset is None:
+        logger.warning("未安装 fonttools，图标字体不做裁剪 (pip install fonttools)")
+
+    try:
+        manifest = build()
+    except Exception as e:
+        logger.error(f"❌ 构建失败: {e}")
+        sys.exit(1)
+
+    print(f"✅ 构建完成，共 {len(manifest)} 个文件，输出目录: {DIST_DIR}")
+    print("   static/config.json 中 server.assets.mode 为 auto 或 build 时，Web服务将使用构建结果")
+
+
+if __name__ == '__main__':
+    main()
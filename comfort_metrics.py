@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+由温度和相对湿度计算的舒适度指标
+- 露点（°C）: Magnus 公式（Sonntag 1990 系数）
+- 绝对湿度（g/m³）: 饱和水汽压 × 相对湿度，按理想气体换算
+- 体感温度 / 热指数（°C）: 美国国家气象局（NWS）算法，低温时为简化公式，
+  高温时为 Rothfusz 回归及其低湿、高湿修正
+
+写入单条或少量读数时使用标量版本 compute，大批量写入和历史数据回填使用 NumPy 向量版本 compute_columns，
+两者结果一致；温度不是有限值或相对湿度不在 (0, 100] 内时结果为空（写入数据库为NULL）
+升级前写入的读数由 backfill_database 分块回填，可在 CPU 任务进程中执行
+"""
+
+import math
+import sqlite3
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 派生指标列，顺序与数据库列及 offload.DERIVED_COLUMNS 一致
+COMFORT_COLUMNS = ('dew_point', 'absolute_humidity', 'heat_index')
+
+# Magnus 公式系数（水面，-45°C ~ 60°C）
+MAGNUS_A = 17.62
+MAGNUS_B = 243.12
+
+# 保留的小数位数，与传感器精度相当
+DECIMALS = 2
+
+# 条数少于该值时逐条使用标量计算，NumPy 每次调用的固定开销高于逐条计算
+VECTORIZE_MIN_ROWS = 64
+
+
+# 可以计算出舒适度指标但尚未计算的读数（湿度无效的读数结果为NULL，不算在内）
+MISSING_CONDITION = '''dew_point IS NULL AND humidity > 0 AND humidity <= 100
+    AND temperature BETWEEN -1e308 AND 1e308'''
+
+
+def _rothfusz(f, rh):
+    """NWS 热指数回归公式（华氏度），标量与数组通用"""
+    return (-42.379 + 2.04901523 * f + 10.14333127 * rh - 0.22475541 * f * rh
+            - 6.83783e-3 * f * f - 5.481717e-2 * rh * rh + 1.22874e-3 * f * f * rh
+            + 8.5282e-4 * f * rh * rh - 1.99e-6 * f * f * rh * rh)
+
+
+def compute(temperature: Optional[float], humidity: Optional[float]) -> Tuple[Optional[float], ...]:
+    """
+    计算单条读数的舒适度指标
+
+    Returns:
+        (露点, 绝对湿度, 体感温度)，温度或湿度无效（含 NaN、无穷大）时均为None
+    """
+    if temperature is None or humidity is None or not math.isfinite(temperature) or not 0 < humidity <= 100:
+        return None, None, None
+
+    magnus = MAGNUS_A * temperature / (MAGNUS_B + temperature)
+    gamma = math.log(humidity / 100) + magnus
+    dew_point = MAGNUS_B * gamma / (MAGNUS_A - gamma)
+    # 6.112 hPa 为 0°C 时的饱和水汽压，216.74 由水汽气体常数 461.5 J/(kg·K) 换算为 g/m³
+    absolute_humidity = 216.74 * 6.112 * math.exp(magnus) * humidity / 100 / (273.15 + temperature)
+
+    f = temperature * 1.8 + 32
+    heat_index = 0.5 * (f + 61.0 + (f - 68.0) * 1.2 + humidity * 0.094)
+    if (heat_index + f) / 2 >= 80:
+        heat_index = _rothfusz(f, humidity)
+        if humidity < 13 and 80 <= f <= 112:
+            heat_index -= (13 - humidity) / 4 * math.sqrt(max(17 - abs(f - 95), 0) / 17)
+        elif humidity > 85 and 80 <= f <= 87:
+            heat_index += (humidity - 85) / 10 * (87 - f) / 5
+
+    return (round(dew_point, DECIMALS), round(absolute_humidity, DECIMALS),
+            round((heat_index - 32) / 1.8, DECIMALS))
+
+
+def compute_columns(temperature: Sequence[float],
+                    humidity: Sequence[float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    批量计算舒适度指标
+
+    Args:
+        temperature: 温度（°C）数组
+        humidity: 相对湿度（%）数组
+
+    Returns:
+        (露点, 绝对湿度, 体感温度) 三个 float64 数组，无效读数为 NaN
+    """
+    t = np.asarray(temperature, dtype=np.float64)
+    t = np.where(np.isfinite(t), t, np.nan)
+    rh = np.asarray(humidity, dtype=np.float64)
+    rh = np.where((rh > 0) & (rh <= 100), rh, np.nan)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        magnus = MAGNUS_A * t / (MAGNUS_B + t)
+        gamma = np.log(rh / 100) + magnus
+        dew_point = MAGNUS_B * gamma / (MAGNUS_A - gamma)
+        absolute_humidity = 216.74 * 6.112 * np.exp(magnus) * rh / 100 / (273.15 + t)
+
+        f = t * 1.8 + 32
+        simple = 0.5 * (f + 61.0 + (f - 68.0) * 1.2 + rh * 0.094)
+        regression = _rothfusz(f, rh)
+        dry = (rh < 13) & (f >= 80) & (f <= 112)
+        regression = np.where(
+            dry, regression - (13 - rh) / 4 * np.sqrt(np.clip(17 - np.abs(f - 95), 0, None) / 17), regression
+        )
+        humid = (rh > 85) & (f >= 80) & (f <= 87)
+        regression = np.where(humid, regression + (rh - 85) / 10 * (87 - f) / 5, regression)
+        heat_index = np.where((simple + f) / 2 >= 80, regression, simple)
+
+    return (np.round(dew_point, DECIMALS), np.round(absolute_humidity, DECIMALS),
+            np.round((heat_index - 32) / 1.8, DECIMALS))
+
+
+def compute_rows(temperature: Sequence[float], humidity: Sequence[float]) -> List[Tuple[Optional[float], ...]]:
+    """
+    计算一批读数的舒适度指标，按读数返回 COMFORT_COLUMNS 顺序的元组（可直接作为SQL参数）
+
+    条数较多时使用 compute_columns 向量计算，NaN 转为None
+    """
+    if len(temperature) < VECTORIZE_MIN_ROWS:
+        return [compute(t, rh) for t, rh in zip(temperature, humidity)]
+    rows = np.column_stack(compute_columns(temperature, humidity)).tolist()
+    return [tuple(None if value != value else value for value in row) for row in rows]
+
+
+def backfill_database(db_path: str, chunk_size: int = 20000) -> int:
+    """
+    为尚未计算舒适度指标的读数（升级前写入的数据）回填露点、绝对湿度和体感温度
+
+    先检查是否还有需要回填的读数，没有时立即返回；否则按 id 顺序分块读取，
+    每块用 NumPy 向量运算一次算完并在单独的事务中写回，不会长时间占用写锁。
+    模块级函数，可交给 OffloadExecutor 在工作进程中执行
+
+    Args:
+        db_path: 数据库文件路径
+        chunk_size: 每块的读数条数
+
+    Returns:
+        回填的条数
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        if conn.execute(f'SELECT 1 FROM temperature_data WHERE {MISSING_CONDITION} LIMIT 1').fetchone() is None:
+            return 0
+
+        last_id = 0
+        updated = 0
+        while True:
+            rows = conn.execute(f'''
+                SELECT id, temperature, humidity FROM temperature_data
+                WHERE id > ? AND {MISSING_CONDITION}
+                ORDER BY id
+                LIMIT ?
+            ''', (last_id, chunk_size)).fetchall()
+            if not rows:
+                return updated
+            last_id = rows[-1][0]
+
+            ids, temperature, humidity = zip(*rows)
+            conn.executemany('''
+                UPDATE temperature_data SET dew_point = ?, absolute_humidity = ?, heat_index = ?
+                WHERE id = ? AND dew_point IS NULL
+            ''', [metrics + (row_id,) for metrics, row_id in zip(compute_rows(temperature, humidity), ids)])
+            conn.commit()
+            updated += len(rows)
+    finally:
+        conn.close()
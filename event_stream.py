@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Server-Sent Events 推送
+- EventStream: 保存最近事件的环形缓冲区，每个事件只编码一次，所有连接共用同一份字节串
+- 客户端断线重连时通过 Last-Event-ID 从缓冲区补发错过的事件，超出缓冲区时发送 reset 事件
+- 每个连接阻塞在自己的条件变量上并按关注的设备登记，发布事件时只唤醒关注该设备的连接，
+  其余连接仅在心跳时被唤醒，心跳注释同时用于发现已断开的连接
+- subscribe() 在检查连接数上限的同一把锁内占用名额，并发连接不会超出 max_clients
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set
+
+
+class StreamFull(Exception):
+    """连接数达到上限"""
+
+
+class StreamEvent(NamedTuple):
+    """缓冲区中的事件"""
+    id: int
+    device_address: Optional[str]
+    frame: bytes  # 编码好的SSE消息
+
+
+def encode_frame(event_id: int, event: str, data: str) -> bytes:
+    """编码一条SSE消息（data 为单行JSON）"""
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode('utf-8')
+
+
+class EventStream:
+    """SSE事件广播"""
+
+    HEARTBEAT = b": heartbeat\n\n"
+    RESET = b"event: reset\ndata: {}\n\n"
+
+    def __init__(self, buffer_size: int = 256, heartbeat_interval: float = 15.0,
+                 max_clients: int = 2000, retry: int = 5000):
+        """
+        初始化事件广播
+
+        Args:
+            buffer_size: 补发缓冲区保存的事件数
+            heartbeat_interval: 没有事件时发送心跳注释的间隔（秒）
+            max_clients: 最大连接数，超过时拒绝新连接
+            retry: 建议浏览器断线后重连的等待时间（毫秒）
+        """
+        self.heartbeat_interval = heartbeat_interval
+        self.max_clients = max_clients
+        self.retry = retry
+        self._buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        # 设备地址 -> 等待该设备事件的连接的条件变量，None 对应不按设备过滤的连接
+        self._waiters: Dict[Optional[str], Set[threading.Condition]] = {}
+        # 设备地址 -> 该设备已被挤出缓冲区的最新事件编号
+        self._evicted: Dict[Optional[str], int] = {}
+        self._last_id = 0
+        self._clients = 0
+        self._closed = False
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> 'EventStream':
+        """
+        根据配置创建事件广播
+
+        Args:
+            config: 配置文件中 server.stream 部分
+        """
+        config = config or {}
+        return cls(
+            buffer_size=config.get('buffer_size', 256),
+            heartbeat_interval=config.get('heartbeat_interval', 15),
+            max_clients=config.get('max_clients', 2000),
+            retry=config.get('retry', 5000)
+        )
+
+    @property
+    def clients(self) -> int:
+        """当前连接数"""
+        with self._lock:
+            return self._clients
+
+    @property
+    def last_id(self) -> int:
+        """最近一个事件的编号"""
+        with self._lock:
+            return self._last_id
+
+    def publish(self, event: str, data: str, device_address: Optional[str] = None) -> int:
+        """
+        发布事件
+
+        Args:
+            event: 事件名
+            data: JSON字符串
+            device_address: 事件所属设备，为空时发送给所有连接
+
+        Returns:
+            事件编号
+        """
+        with self._lock:
+            self._last_id += 1
+            if self._buffer.maxlen and len(self._buffer) == self._buffer.maxlen:
+                evicted = self._buffer[0]
+                self._evicted[evicted.device_address] = evicted.id
+            self._buffer.append(StreamEvent(self._last_id, device_address,
+                                            encode_frame(self._last_id, event, data)))
+            self._notify(device_address)
+            return self._last_id
+
+    def subscribe(self, devices: Optional[Iterable[str]] = None,
+                  last_event_id: Optional[int] = None) -> Iterator[bytes]:
+        """
+        订阅事件，返回逐条产生SSE消息的生成器（用作流式响应的内容）
+
+        Args:
+            devices: 只接收这些设备的事件，为空时接收所有设备的事件
+            last_event_id: 浏览器重连时带上的 Last-Event-ID，从该事件之后开始补发
+
+        Raises:
+            StreamFull: 连接数达到上限
+        """
+        with self._lock:
+            if self._clients >= self.max_clients:
+                raise StreamFull(f"SSE连接数已达上限 ({self.max_clients})")
+            self._clients += 1
+            # 编号大于当前最新编号说明服务端已重启，编号从头计数
+            if last_event_id is None or last_event_id > self._last_id:
+                cursor = self._last_id
+            else:
+                cursor = last_event_id
+        return Subscription(self, set(devices or ()), cursor)
+
+    def _release(self):
+        with self._lock:
+            self._clients -= 1
+
+    def _notify(self, device_address: Optional[str]):
+        """唤醒关注该设备的连接，设备为空时唤醒所有连接（调用方需持有锁）"""
+        if device_address is None:
+            keys = list(self._waiters)
+        else:
+            keys = [device_address, None]
+        for key in keys:
+            for waiter in self._waiters.get(key, ()):
+                waiter.notify()
+
+    def _iterate(self, devices: set, cursor: int, release) -> Iterator[bytes]:
+        waiter = threading.Condition(self._lock)
+        keys = devices or {None}
+        try:
+            yield f"retry: {self.retry}\n\n".encode('utf-8')
+            with self._lock:
+                for key in keys:
+                    self._waiters.setdefault(key, set()).add(waiter)
+            last_write = time.monotonic()
+            while True:
+                with self._lock:
+                    events, lost = self._events_after(devices, cursor)
+                    if not self._closed and not events and not lost:
+                        # 其他设备的事件不需要发送，直接跳过
+                        cursor = self._last_id
+                        waiter.wait(max(0.0, last_write + self.heartbeat_interval - time.monotonic()))
+                        events, lost = self._events_after(devices, cursor)
+                    if self._closed:
+                        return
+                    cursor = self._last_id
+
+                chunks = []
+                if lost:
+                    # 错过的事件已不在缓冲区中，通知客户端重新加载
+                    chunks.append(self.RESET)
+                chunks.extend(event.frame for event in events)
+                now = time.monotonic()
+                if not chunks and now - last_write >= self.heartbeat_interval:
+                    # 心跳注释防止代理断开空闲连接，写入失败时服务器结束该连接
+                    chunks.append(self.HEARTBEAT)
+                if chunks:
+                    last_write = now
+                    yield b''.join(chunks)
+        finally:
+            with self._lock:
+                for key in keys:
+                    waiters = self._waiters.get(key)
+                    if waiters is not None:
+                        waiters.discard(waiter)
+                        if not waiters:
+                            del self._waiters[key]
+            release()
+
+    def _events_after(self, devices: set, cursor: int):
+        """
+        返回编号大于 cursor 且属于 devices 的事件，以及其中是否有事件已被挤出缓冲区（调用方需持有锁）
+
+        按设备过滤的连接不会被其他设备的事件唤醒，游标可能早于缓冲区起点，
+        此时只有所关注设备的事件被挤出才需要重新加载
+        """
+        if not self._buffer or self._last_id <= cursor:
+            return [], False
+        if devices:
+            lost = any(self._evicted.get(key, 0) > cursor for key in (*devices, None))
+        else:
+            lost = cursor < self._buffer[0].id - 1
+        events: List[StreamEvent] = []
+        for event in reversed(self._buffer):
+            if event.id <= cursor:
+                break
+            if not devices or event.device_address is None or event.device_address in devices:
+                events.append(event)
+        events.reverse()
+        return events, lost
+
+    def stats(self) -> dict:
+        """连接与缓冲区状态"""
+        with self._lock:
+            return {
+                'clients': self._clients,
+                'last_id': self._last_id,
+                'buffered': len(self._buffer),
+            }
+
+    def close(self):
+        """结束所有连接"""
+        with self._lock:
+            self._closed = True
+            self._notify(None)
+
+
+class Subscription:
+    """
+    一个SSE连接的消息迭代器
+
+    subscribe() 返回时已占用连接名额，迭代结束或调用 close() 时释放；
+    响应未开始发送就被关闭时生成器的 finally 不会执行，由 close()（WSGI服务器关闭响应时调用）释放
+    """
+
+    def __init__(self, stream: EventStream, devices: set, cursor: int):
+        self._stream = stream
+        self._lock = threading.Lock()
+        self._released = False
+        self._generator = stream._iterate(devices, cursor, self._release)
+
+    def __iter__(self) -> 'Subscription':
+        return self
+
+    def __next__(self) -> bytes:
+        return next(self._generator)
+
+    def close(self):
+        """结束连接并释放名额"""
+        self._generator.close()
+        self._release()
+
+    def _release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._stream._release()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+温湿度数据导出
+生成带折线图的Excel工作簿或CSV文件
+"""
+
+from datetime import datetime
+from typing import BinaryIO, Union
+
+import numpy as np
+import pandas as pd
+
+from offload import ColumnarData
+
+# 支持的导出格式及其MIME类型
+EXPORT_FORMATS = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+}
+
+SHEET_NAME = '温湿度数据'
+
+
+def export_filename(start_time: datetime, end_time: datetime, export_format: str = 'xlsx') -> str:
+    """生成导出文件名，格式为"DUT温湿度数据_起始时间_结束时间.xlsx\""""
+    return f"DUT温湿度数据_{start_time.strftime('%Y%m%d%H%M')}_{end_time.strftime('%Y%m%d%H%M')}.{export_format}"
+
+
+def columns_to_dataframe(columns: ColumnarData) -> pd.DataFrame:
+    """将列式数据转换为DataFrame，列顺序为 offload.COLUMNS + offload.DERIVED_COLUMNS"""
+    return pd.DataFrame({
+        'timestamp': columns.timestamps,
+        # 直接引用数组缓冲区，不逐个复制
+        'temperature': np.frombuffer(columns.temperature, dtype=np.float64),
+        'humidity': np.frombuffer(columns.humidity, dtype=np.float64),
+        # 电量和电压为整数，使用可空整数类型，避免导出为 85.0 这样的小数
+        'battery': pd.array(np.frombuffer(columns.battery, dtype=np.float64), dtype='Int64'),
+        'voltage': pd.array(np.frombuffer(columns.voltage, dtype=np.float64), dtype='Int64'),
+        'device_name': columns.device_names(),
+        'device_address': columns.device_addresses(),
+        # 写入时计算的舒适度指标
+        'dew_point': np.frombuffer(columns.dew_point, dtype=np.float64),
+        'absolute_humidity': np.frombuffer(columns.absolute_humidity, dtype=np.float64),
+        'heat_index': np.frombuffer(columns.heat_index, dtype=np.float64),
+    })
+
+
+def write_export_columns(columns: ColumnarData, output: str, export_format: str = 'xlsx') -> int:
+    """
+    将列式数据写入导出文件，供 OffloadExecutor 在工作进程中调用
+
+    Args:
+        columns: 列式数据
+        output: 文件路径
+        export_format: 导出格式 (xlsx/csv)
+
+    Returns:
+        写入的数据行数
+    """
+    write_dataframe(columns_to_dataframe(columns), output, export_format)
+    return len(columns)
+
+
+def write_dataframe(df: pd.DataFrame, output: Union[str, BinaryIO], export_format: str = 'xlsx'):
+    """将DataFrame写入导出文件"""
+    if export_format == 'csv':
+        # 带BOM的UTF-8，Excel可直接正确识别中文
+        df.to_csv(output, index=False, encoding='utf-8-sig')
+        return
+
+    # 创建Excel工作簿和工作表
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        # 写入数据
+        df.to_excel(writer, sheet_name=SHEET_NAME, index=False)
+
+        # 获取工作簿和工作表对象
+        workbook = writer.book
+        worksheet = writer.sheets[SHEET_NAME]
+
+        # 添加图表
+        chart = workbook.add_chart({'type': 'line'})
+
+        # 配置图表数据范围
+        # 假设第一列是时间戳，第二列是温度，第三列是湿度
+        # 添加温度数据系列
+        chart.add_series({
+            'name': '温度',
+            'categories': [SHEET_NAME, 1, 0, len(df), 0],  # 时间列
+            'values': [SHEET_NAME, 1, 1, len(df), 1],      # 温度列
+            'line': {'color': '#ff6b6b'},
+        })
+
+        # 添加湿度数据系列
+        chart.add_series({
+            'name': '湿度',
+            'categories': [SHEET_NAME, 1, 0, len(df), 0],  # 时间列
+            'values': [SHEET_NAME, 1, 2, len(df), 2],      # 湿度列
+            'line': {'color': '#74b9ff'},
+        })
+
+        # 设置图表标题和坐标轴
+        chart.set_title({'name': 'DUT宿舍温湿度变化图'})
+        chart.set_x_axis({'name': '时间'})
+        chart.set_y_axis({'name': '数值', 'major_gridlines': {'visible': True}})
+
+        # 插入图表到工作表
+        worksheet.insert_chart('E2', chart, {'x_scale': 2, 'y_scale': 1})
+
+        # 设置列宽
+        worksheet.set_column('A:A', 20)  # 时间戳列宽
+        worksheet.set_column('B:C', 10)  # 温度湿度列宽
+
+        # 添加格式
+        header_format = workbook.add_format({
+            'bold': True,
+            'text_wrap': True,
+            'valign': 'top',
+            'align': 'center',
+            'bg_color': '#D7E4BC',
+            'border': 1
+        })
+
+        # 应用表头格式
+        for col_num, value in enumerate(df.columns.values):
+            worksheet.write(0, col_num, value, header_format)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台导出任务队列
+导出在有界线程池中执行，通过回调报告进度，生成的文件按内容寻址缓存并按总大小淘汰
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from excel_export import EXPORT_FORMATS, export_filename, write_export_columns
+from offload import COLUMNS, DERIVED_COLUMNS, ColumnarData, OffloadExecutor
+from temperature_sensor_connector import TemperatureDataStorage, to_epoch
+
+logger = logging.getLogger(__name__)
+
+
+class ExportCache:
+    """按 (时间范围, 设备, 格式) 内容寻址的导出文件缓存"""
+
+    def __init__(self, cache_dir: str = "export_cache", max_bytes: int = 200 * 1024 * 1024):
+        """
+        初始化导出文件缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存文件总大小上限，超出时淘汰最久未使用的文件
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(start_time: datetime, end_time: datetime, devices: List[str], export_format: str,
+                 revision: int = 0) -> str:
+        """
+        计算缓存键
+
+        Args:
+            revision: 历史记录回填版本号（TemperatureDataStorage.get_backfill_revision），
+                回填、联邦同步等向已结束区间插入读数后版本号变化，不再命中旧文件
+        """
+        # 按epoch秒计算，同一时刻无论以何种时区表示都得到相同的键
+        params = {
+            'start': to_epoch(start_time),
+            'end': to_epoch(end_time),
+            'devices': sorted(devices),
+            'format': export_format,
+            'revision': revision,
+            # 导出列变化后不再命中旧文件
+            'columns': COLUMNS + DERIVED_COLUMNS,
+        }
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def path_for(self, key: str, export_format: str) -> Path:
+        """缓存键对应的文件路径"""
+        return self.cache_dir / f"{key}.{export_format}"
+
+    def get(self, key: str, export_format: str) -> Optional[Path]:
+        """获取缓存文件，命中时更新其访问时间"""
+        path = self.path_for(key, export_format)
+        with self._lock:
+            if not path.exists():
+                return None
+            os.utime(path)
+            return path
+
+    def put(self, key: str, export_format: str, temp_path: Path) -> Path:
+        """将生成完成的临时文件移入缓存，并按总大小淘汰旧文件"""
+        path = self.path_for(key, export_format)
+        with self._lock:
+            os.replace(temp_path, path)
+            self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: Path):
+        """淘汰最久未使用的文件，直到总大小不超过上限"""
+        files = []
+        total = 0
+        for entry in self.cache_dir.iterdir():
+            # 跳过正在生成的临时文件（以.开头）
+            if entry.name.startswith('.') or entry.suffix.lstrip('.') not in EXPORT_FORMATS \
+                    or not entry.is_file():
+                continue
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+
+        for _, size, entry in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            try:
+                entry.unlink()
+                total -= size
+                logger.info(f"导出缓存已淘汰: {entry.name}")
+            except OSError as e:
+                logger.warning(f"淘汰导出缓存失败: {e}")
+
+
+@dataclass
+class ExportJob:
+    """导出任务"""
+    id: str
+    key: str
+    start_time: datetime
+    end_time: datetime
+    devices: List[str]
+    export_format: str
+    owner: Optional[str] = None  # 发起任务的Socket.IO会话ID，用于定向推送进度
+    status: str = 'queued'  # queued / running / done / failed
+    progress: int = 0
+    rows: int = 0
+    cached: bool = False
+    error: Optional[str] = None
+    path: Optional[Path] = None
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def filename(self) -> str:
+        return export_filename(self.start_time, self.end_time, self.export_format)
+
+    def to_dict(self) -> dict:
+        """转换为API返回格式"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'rows': self.rows,
+            'cached': self.cached,
+            'error': self.error,
+            'format': self.export_format,
+            'devices': self.devices,
+            'start_time': self.start_time.isoformat(),
+            'end_time': self.end_time.isoformat(),
+            'filename': self.filename,
+            'download_url': f"/api/export-jobs/{self.id}/download" if self.status == 'done' else None,
+        }
+
+
+class ExportJobManager:
+    """导出任务管理器"""
+
+    def __init__(self, storage: TemperatureDataStorage, cache: ExportCache, max_workers: int = 2,
+                 job_ttl: float = 3600, offload: Optional[OffloadExecutor] = None,
+                 progress_callback: Optional[Callable[[ExportJob], None]] = None, closed_grace: float = 300):
+        """
+        初始化导出任务管理器
+
+        Args:
+            storage: 数据存储
+            cache: 导出文件缓存
+            max_workers: 同时执行的导出任务数
+            job_ttl: 已结束任务的保留时间（秒）
+            offload: CPU任务执行器，生成文件在工作进程中完成；为空则在导出线程中直接生成
+            progress_callback: 任务状态或进度变化时的回调
+            closed_grace: 设备的最新读数晚于时间范围终点超过该秒数时，才认为该范围已结束、生成的文件可以复用
+        """
+        self.storage = storage
+        self.closed_grace = closed_grace
+        self.cache = cache
+        self.job_ttl = job_ttl
+        self.offload = offload
+        self.progress_callback = progress_callback
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+        self._jobs: Dict[str, ExportJob] = {}
+        self._active_by_key: Dict[str, ExportJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, start_time: datetime, end_time: datetime, devices: Optional[List[str]] = None,
+               export_format: str = 'xlsx', owner: Optional[str] = None) -> ExportJob:
+        """
+        提交导出任务
+
+        缓存命中时任务直接完成；相同参数的任务正在执行时复用该任务
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"不支持的导出格式: {export_format}")
+
+        devices = devices or []
+        key = ExportCache.make_key(start_time, end_time, devices, export_format,
+                                   self.storage.get_backfill_revision())
+
+        with self._lock:
+            self._expire_jobs()
+
+            active = self._active_by_key.get(key)
+            if active:
+                return active
+
+            job = ExportJob(
+                id=uuid.uuid4().hex,
+                key=key,
+                start_time=start_time,
+                end_time=end_time,
+                devices=devices,
+                export_format=export_format,
+                owner=owner
+            )
+            self._jobs[job.id] = job
+
+            cached_path = self.cache.get(key, export_format)
+            if cached_path:
+                job.status = 'done'
+                job.progress = 100
+                job.cached = True
+                job.path = cached_path
+            else:
+                self._active_by_key[key] = job
+                self._executor.submit(self._run, job)
+
+        self._notify(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        """获取任务"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self):
+        """停止接收新任务并等待正在执行的任务结束"""
+        self._executor.shutdown(wait=True)
+
+    def _expire_jobs(self):
+        """清理过期的已结束任务（调用方需持有锁）"""
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.status in ('done', 'failed') and now - job.created_at > self.job_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _notify(self, job: ExportJob):
+        """报告任务进度"""
+        if self.progress_callback:
+            try:
+                self.progress_callback(job)
+            except Exception as e:
+                logger.error(f"导出进度推送失败: {e}")
+
+    def _range_closed(self, end_time: datetime, devices: List[Optional[str]]) -> bool:
+        """
+        时间范围是否已结束：每个设备的最新读数都晚于范围终点 closed_grace 秒以上，
+        之后实时写入的读数不会再落入该范围（回填的读数通过缓存键中的回填版本号区分）
+        """
+        end_ts = to_epoch(end_time)
+        for device_address in devices:
+            latest = self.storage.get_last_epoch(device_address)
+            if latest is None or latest < end_ts + self.closed_grace:
+                return False
+        return bool(devices)
+
+    def _update(self, job: ExportJob, progress: int, status: str = 'running'):
+        job.status = status
+        job.progress = progress
+        self._notify(job)
+
+    def _run(self, job: ExportJob):
+        """在工作线程中执行导出任务"""
+        temp_path = self.cache.cache_dir / f".{job.id}.tmp.{job.export_format}"
+        try:
+            self._update(job, 0)
+
+            # 按设备分别查询，每个设备完成后更新进度（查询阶段占0-50%）
+            columns = ColumnarData()
+            targets = job.devices or [None]
+            for index, device_address in enumerate(targets, start=1):
+                columns.extend(self.storage.get_columns_by_time_range(job.start_time, job.end_time, device_address))
+                self._update(job, int(50 * index / len(targets)))
+
+            if not columns:
+                raise ValueError('指定时间范围内无数据')
+
+            job.rows = len(columns)
+            # DataFrame构建和xlsxwriter图表生成是CPU密集的，放到工作进程中执行
+            if self.offload:
+                self.offload.run(write_export_columns, columns, str(temp_path), job.export_format)
+            else:
+                write_export_columns(columns, str(temp_path), job.export_format)
+            self._update(job, 90)
+
+            # 只有已经结束的时间范围才能复用；仍可能写入数据的范围按任务ID单独存放
+            devices = job.devices or list(dict.fromkeys(address for _, address in columns.devices))
+            cache_key = job.key if self._range_closed(job.end_time, devices) else job.id
+            job.path = self.cache.put(cache_key, job.export_format, temp_path)
+            self._update(job, 100, 'done')
+            logger.info(f"导出任务完成: {job.id} ({job.rows} 条数据)")
+
+        except Exception as e:
+            logger.error(f"导出任务失败: {e}")
+            job.error = str(e)
+            temp_path.unlink(missing_ok=True)
+            self._update(job, job.progress, 'failed')
+
+        finally:
+            with self._lock:
+                self._active_by_key.pop(job.key, None)
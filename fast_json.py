@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON序列化
+- 安装 orjson 时使用 orjson 序列化（比标准库快数倍），未安装时使用标准库
+- PreEncoded: 已序列化好的JSON片段，作为 Socket.IO 事件参数时直接拼接，不会再次序列化
+- 模块提供 dumps/loads，可作为 SocketIO 的 json 参数
+"""
+
+import json
+from datetime import date, datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class PreEncoded:
+    """已序列化的JSON片段"""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+def _default(obj):
+    """标准库和 orjson 不支持的类型"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, PreEncoded):
+        return json.loads(obj.text)
+    raise TypeError(f"无法序列化的类型: {type(obj).__name__}")
+
+
+def dumps(obj, **kwargs) -> str:
+    """
+    序列化为JSON字符串
+
+    Socket.IO 编码事件时传入 [事件名, 参数...]，其中已序列化的参数直接拼接
+    """
+    if isinstance(obj, list) and any(isinstance(item, PreEncoded) for item in obj):
+        return '[' + ','.join(
+            item.text if isinstance(item, PreEncoded) else dumps(item, **kwargs) for item in obj
+        ) + ']'
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default).decode('utf-8')
+        except TypeError:
+            # orjson 不支持的数据（如非字符串的字典键）交给标准库处理
+            pass
+    kwargs.setdefault('default', _default)
+    return json.dumps(obj, **kwargs)
+
+
+def dumps_bytes(obj) -> bytes:
+    """序列化为UTF-8编码的紧凑JSON，用于HTTP响应"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+loads = json.loads
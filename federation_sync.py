@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+采集主机到汇聚端的联邦同步
+- 每台采集主机使用自己的 temperature_data.db，FederationSyncClient 按本地 id 顺序把高水位之后的读数
+  分批压缩（gzip JSON）推送到汇聚端；回填的历史记录同样会分配新的 id，因此也会被同步
+- 汇聚端是以 aggregator 模式运行的同一个Web应用（create_blueprint），在单个事务中按 (设备, 时间) 去重写入
+  并推进该主机的高水位；高水位以汇聚端为准，网络中断或进程重启后从汇聚端的高水位继续推送，
+  重复推送的数据不会重复写入
+- 直接运行本模块时只做同步（采集由 start_data_collector.py 完成）:
+    python federation_sync.py [--once]
+"""
+
+import argparse
+import gzip
+import hmac
+import json
+import logging
+import socket
+import threading
+import urllib.error
+import urllib.request
+import zlib
+from typing import Optional
+
+from offload import COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# 推送数据的列顺序
+SYNC_COLUMNS = COLUMNS + ('ts_epoch',)
+
+# 解压后请求体的上限，防止异常数据占满内存
+MAX_BATCH_BYTES = 64 * 1024 * 1024
+
+
+class SyncError(Exception):
+    """推送数据无法解析或不符合协议"""
+
+
+def encode_batch(host_id: str, after_id: int, last_id: int, rows: list) -> bytes:
+    """将一批读数编码为gzip压缩的JSON"""
+    payload = {
+        'host_id': host_id,
+        'after_id': after_id,
+        'last_id': last_id,
+        'columns': SYNC_COLUMNS,
+        'rows': rows,
+    }
+    return gzip.compress(json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 6)
+
+
+def decode_batch(body: bytes, content_encoding: Optional[str] = None) -> dict:
+    """
+    解码推送的数据
+
+    Raises:
+        SyncError: 数据无法解压、解析或列顺序不一致
+    """
+    try:
+        if content_encoding == 'gzip':
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            body = decompressor.decompress(body, MAX_BATCH_BYTES)
+            if decompressor.unconsumed_tail:
+                raise SyncError(f"推送数据解压后超过 {MAX_BATCH_BYTES // 1024 // 1024} MB")
+        payload = json.loads(body)
+    except (zlib.error, ValueError) as e:
+        raise SyncError(f"推送数据无法解析: {e}")
+
+    if not isinstance(payload, dict) or not payload.get('host_id'):
+        raise SyncError("缺少 host_id")
+    if tuple(payload.get('columns') or ()) != SYNC_COLUMNS:
+        raise SyncError(f"列顺序不一致: {payload.get('columns')}")
+    try:
+        payload['after_id'] = int(payload['after_id'])
+        payload['last_id'] = int(payload['last_id'])
+    except (KeyError, TypeError, ValueError):
+        raise SyncError("缺少 after_id 或 last_id")
+    if not isinstance(payload.get('rows'), list) or any(len(row) != len(SYNC_COLUMNS) for row in payload['rows']):
+        raise SyncError("rows 格式错误")
+    return payload
+
+
+def create_blueprint(storage, token: str):
+    """
+    创建汇聚端接口
+
+    - GET  /api/federation/hosts            各采集主机的同步进度
+    - GET  /api/federation/hosts/<host_id>  采集主机已合并的高水位
+    - POST /api/federation/push             合并一批读数（gzip JSON），after_id 大于汇聚端高水位时返回 409
+
+    Args:
+        storage: 汇聚端的 TemperatureDataStorage
+        token: 共享密钥，请求需带上 X-Federation-Token 头
+
+    Raises:
+        ValueError: 未设置共享密钥（推送接口会写入数据库，不允许无认证开放）
+    """
+    from flask import Blueprint, jsonify, request
+
+    if not token:
+        raise ValueError("汇聚端必须设置共享密钥 token")
+
+    blueprint = Blueprint('federation', __name__, url_prefix='/api/federation')
+
+    @blueprint.before_request
+    def check_token():
+        if not hmac.compare_digest(request.headers.get('X-Federation-Token', ''), token):
+            return jsonify({'error': '同步密钥错误'}), 401
+
+    @blueprint.route('/hosts')
+    def list_hosts():
+        return jsonify(storage.get_sync_hosts())
+
+    @blueprint.route('/hosts/<host_id>')
+    def get_host(host_id):
+        return jsonify({'host_id': host_id, 'last_id': storage.get_sync_last_id(host_id)})
+
+    @blueprint.route('/push', methods=['POST'])
+    def push():
+        try:
+            payload = decode_batch(request.get_data(), request.headers.get('Content-Encoding'))
+        except SyncError as e:
+            return jsonify({'error': str(e)}), 400
+
+        try:
+            result = storage.merge_remote_batch(
+                payload['host_id'], payload['after_id'], payload['last_id'], payload['rows']
+            )
+        except Exception as e:
+            logger.error(f"合并 {payload['host_id']} 的同步数据失败: {e}")
+            return jsonify({'error': f'合并同步数据失败: {e}'}), 500
+
+        if not result['accepted']:
+            logger.warning(f"采集主机 {payload['host_id']} 的推送从 {payload['after_id']} 开始，"
+                           f"汇聚端高水位为 {result['last_id']}，要求重新推送")
+            return jsonify(result), 409
+        if result['inserted']:
+            logger.info(f"合并采集主机 {payload['host_id']} 的 {result['inserted']} 条读数 "
+                        f"(高水位 {result['last_id']})")
+        return jsonify(result)
+
+    return blueprint
+
+
+class FederationSyncClient:
+    """采集主机的同步客户端（后台线程）"""
+
+    def __init__(self, storage, central_url: str, host_id: Optional[str] = None, token: Optional[str] = None,
+                 batch_size: int = 2000, interval: float = 30, timeout: float = 30,
+                 max_retry_interval: float = 300):
+        """
+        初始化同步客户端
+
+        Args:
+            storage: 本机的 TemperatureDataStorage
+            central_url: 汇聚端地址，如 http://192.168.1.10:5001
+            host_id: 本机标识，默认为主机名
+            token: 共享密钥
+            batch_size: 每次推送的最大条数
+            interval: 没有新数据时的检查间隔（秒）
+            timeout: 请求超时时间（秒）
+            max_retry_interval: 推送失败后重试间隔的上限（秒），失败后间隔从 interval 开始倍增
+        """
+        self.storage = storage
+        self.central_url = central_url.rstrip('/')
+        self.host_id = host_id or socket.gethostname()
+        self.token = token
+        self.batch_size = batch_size
+        self.interval = interval
+        self.timeout = timeout
+        self.max_retry_interval = max_retry_interval
+        self.last_id: Optional[int] = None  # 汇聚端确认的高水位，None 表示尚未从汇聚端获取
+        self.pushed = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config: Optional[dict], storage) -> Optional['FederationSyncClient']:
+        """
+        根据配置创建同步客户端
+
+        Args:
+            config: 配置文件中 server.federation 部分，mode 不为 collector 时返回 None
+        """
+        config = config or {}
+        if config.get('mode') != 'collector':
+            return None
+        if not config.get('central_url'):
+            logger.warning("联邦同步未配置 central_url，不启用同步")
+            return None
+        return cls(
+            storage,
+            config['central_url'],
+            host_id=config.get('host_id'),
+            token=config.get('token'),
+            batch_size=config.get('batch_size', 2000),
+            interval=config.get('interval', 30),
+            timeout=config.get('timeout', 30)
+        )
+
+    def start(self):
+        """启动后台同步线程"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='federation-sync', daemon=True)
+            self._thread.start()
+            logger.info(f"联邦同步已启动: {self.host_id} -> {self.central_url}")
+
+    def stop(self, timeout: Optional[float] = None):
+        """停止同步线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        retry_interval = self.interval
+        while not self._stop.is_set():
+            try:
+                pushed = self.sync_once()
+                retry_interval = self.interval
+                if pushed >= self.batch_size:
+                    continue  # 还有积压数据，立即推送下一批
+                self._stop.wait(self.interval)
+            except (urllib.error.URLError, OSError, ValueError, SyncError) as e:
+                # 网络中断或汇聚端不可用：保留高水位，间隔倍增后重试
+                self.failures += 1
+                logger.warning(f"联邦同步失败，{retry_interval:g}秒后重试: {e}")
+                self.last_id = None
+                self._stop.wait(retry_interval)
+                retry_interval = min(retry_interval * 2, self.max_retry_interval)
+
+    def sync_once(self) -> int:
+        """
+        推送一批高水位之后的读数
+
+        Returns:
+            推送的条数
+        """
+        if self.last_id is None:
+            self.last_id = self._request('GET', f'/api/federation/hosts/{self.host_id}')['last_id']
+            logger.info(f"汇聚端已同步到本机 id {self.last_id}")
+
+        rows, last_id = self.storage.get_rows_after_id(self.last_id, self.batch_size)
+        if not rows:
+            return 0
+
+        body = encode_batch(self.host_id, self.last_id, last_id, rows)
+        try:
+            result = self._request('POST', '/api/federation/push', body)
+        except urllib.error.HTTPError as e:
+            if e.code != 409:
+                raise
+            # 汇聚端的高水位低于本机记录，从汇聚端的高水位重新推送
+            self.last_id = json.loads(e.read())['last_id']
+            return 0
+
+        self.last_id = result['last_id']
+        self.pushed += len(rows)
+        logger.debug(f"已推送 {len(rows)} 条读数 ({len(body)} 字节)，高水位 {self.last_id}")
+        return len(rows)
+
+    def _request(self, method: str, path: str, body: Optional[bytes] = None) -> dict:
+        headers = {'Accept': 'application/json'}
+        if body is not None:
+            headers.update({'Content-Type': 'application/json', 'Content-Encoding': 'gzip'})
+        if self.token:
+            headers['X-Federation-Token'] = self.token
+        request = urllib.request.Request(self.central_url + path, data=body, headers=headers, method=method)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def stats(self) -> dict:
+        """同步状态"""
+        return {
+            'host_id': self.host_id,
+            'central_url': self.central_url,
+            'last_id': self.last_id,
+            'pushed': self.pushed,
+            'failures': self.failures,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='将本机数据库同步到汇聚端（server.federation）')
+    parser.add_argument('--once', action='store_true', help='推送完积压数据后退出')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    from temperature_sensor_connector import TemperatureDataStorage, server_config
+
+    config = dict(server_config.get('federation') or {}, mode='collector')
+    client = FederationSyncClient.from_config(config, TemperatureDataStorage(**server_config.get('storage', {})))
+    if client is None:
+        return
+
+    if args.once:
+        total = 0
+        while True:
+            pushed = client.sync_once()
+            total += pushed
+            if pushed < client.batch_size:
+                break
+        logger.info(f"同步完成，共推送 {total} 条读数")
+        return
+
+    client.start()
+    try:
+        client._thread.join()
+    except KeyboardInterrupt:
+        client.stop(timeout=5)
+
+
+if __name__ == '__main__':
+    main()
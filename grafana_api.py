@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Grafana 数据源接口（SimpleJSON / JSON 数据源约定）
+- 在 Grafana 中添加 SimpleJSON 或 JSON (simpod-json-datasource) 数据源，URL 填写 http://<主机>:5001/api/grafana
+- 查询目标为 "<指标>:<设备地址>"（如 temperature:A4:C1:38:00:00:01），省略设备地址时为所有设备的平均值
+- 查询按 intervalMs / maxDataPoints 计算时间桶，在SQL中聚合后只返回每个桶一个点，
+  响应大小与原始读数条数无关；同一设备的多个指标只查询一次
+- 数据缺口（断线重连）作为注释返回
+- Infinity 数据源可直接读取 GET /api/grafana/series 返回的列式数据
+"""
+
+import hmac
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from flask import Blueprint, Response, jsonify, request
+
+import fast_json
+from offload import NUMERIC_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+METRIC_LABELS = {
+    'temperature': '温度',
+    'humidity': '湿度',
+    'battery': '电量',
+    'voltage': '电压',
+    'dew_point': '露点',
+    'absolute_humidity': '绝对湿度',
+    'heat_index': '体感温度',
+}
+
+
+def parse_target(target: str) -> Tuple[str, Optional[str]]:
+    """
+    解析查询目标
+
+    Returns:
+        (指标, 设备地址)，未指定设备时设备地址为None
+
+    Raises:
+        ValueError: 指标不受支持
+    """
+    metric, _, device_address = (target or '').partition(':')
+    metric = metric.strip()
+    if metric not in NUMERIC_COLUMNS:
+        raise ValueError(f"不支持的指标: {metric}")
+    return metric, device_address.strip() or None
+
+
+def parse_time(value) -> float:
+    """
+    解析时间参数为epoch秒: 整数视为epoch毫秒（Grafana 的 ${__from}），
+    其余按ISO格式解析（以Z结尾为UTC时间，不带时区时按服务器本地时间处理）
+    """
+    if isinstance(value, (int, float)):
+        return value / 1000
+    value = str(value).strip()
+    if value.lstrip('-').isdigit():
+        return int(value) / 1000
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed.timestamp()
+
+
+def bucket_seconds(start_ts: float, end_ts: float, interval_ms: Optional[float], max_points: Optional[int],
+                   max_points_limit: int, min_interval: float) -> float:
+    """
+    计算时间桶长度（秒）: 不小于 intervalMs，且点数不超过 maxDataPoints 与服务端上限中较小者
+    """
+    limit = min(max_points or max_points_limit, max_points_limit)
+    bucket = max((interval_ms or 0) / 1000, (end_ts - start_ts) / max(limit, 1), min_interval)
+    # 取整到毫秒，避免浮点误差使相邻请求的桶边界不一致
+    return round(bucket, 3)
+
+
+def create_blueprint(storage, token: Optional[str] = None, max_points: int = 10000, min_interval: float = 1.0):
+    """
+    创建 Grafana 数据源接口
+
+    - GET  /api/grafana/             连接测试
+    - POST /api/grafana/search       可用的查询目标（SimpleJSON，[{text, value}]）
+    - POST /api/grafana/metrics      可用的查询目标（JSON 数据源，[{label, value}]）
+    - POST /api/grafana/query        时间序列（timeserie）或表格（table）
+    - POST /api/grafana/annotations  数据缺口
+    - GET  /api/grafana/series       列式数据，参数 device、metrics、from、to、interval_ms、max_points
+
+    Args:
+        storage: TemperatureDataStorage
+        token: 访问令牌，设置后请求需带上 Authorization: Bearer <令牌>
+        max_points: 单个序列的最大点数
+        min_interval: 最小时间桶长度（秒）
+    """
+    blueprint = Blueprint('grafana', __name__, url_prefix='/api/grafana')
+
+    def json_response(data) -> Response:
+        return Response(fast_json.dumps_bytes(data), mimetype='application/json')
+
+    def query_series(targets: List[Tuple[str, Optional[str]]], start_ts: float, end_ts: float,
+                     bucket: float) -> Dict[Optional[str], dict]:
+        """按设备查询降采样数据，同一设备的多个指标合并为一次查询"""
+        metrics_by_device: Dict[Optional[str], List[str]] = {}
+        for metric, device_address in targets:
+            metrics = metrics_by_device.setdefault(device_address, [])
+            if metric not in metrics:
+                metrics.append(metric)
+        return {
+            device_address: storage.get_downsampled(start_ts, end_ts, bucket, metrics, device_address)
+            for device_address, metrics in metrics_by_device.items()
+        }
+
+    def device_names() -> Dict[str, str]:
+        return {device['device_address']: device['device_name'] or device['device_address']
+                for device in storage.get_devices()}
+
+    @blueprint.before_request
+    def check_token():
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return jsonify({'error': '访问令牌错误'}), 401
+
+    @blueprint.route('/')
+    def health():
+        return jsonify({'status': 'ok'})
+
+    def list_targets(keyword: str) -> List[Tuple[str, str]]:
+        targets = [(metric, f'全部设备 {label}') for metric, label in METRIC_LABELS.items()]
+        for address, name in device_names().items():
+            targets.extend((f'{metric}:{address}', f'{name} {label}') for metric, label in METRIC_LABELS.items())
+        keyword = keyword.lower()
+        return [(value, text) for value, text in targets if keyword in value.lower() or keyword in text.lower()]
+
+    @blueprint.route('/search', methods=['POST'])
+    def search():
+        params = request.get_json(silent=True) or {}
+        return json_response([{'text': text, 'value': value}
+                              for value, text in list_targets(params.get('target') or '')])
+
+    @blueprint.route('/metrics', methods=['POST'])
+    def metrics():
+        params = request.get_json(silent=True) or {}
+        return json_response([{'label': text, 'value': value}
+                              for value, text in list_targets(params.get('metric') or '')])
+
+    @blueprint.route('/query', methods=['POST'])
+    def query():
+        params = request.get_json(silent=True) or {}
+        try:
+            start_ts = parse_time(params['range']['from'])
+            end_ts = parse_time(params['range']['to'])
+            targets = [target for target in params.get('targets') or [] if not target.get('hide')]
+            parsed = [parse_target(target.get('target')) for target in targets]
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({'error': f'查询参数错误: {e}'}), 400
+
+        bucket = bucket_seconds(start_ts, end_ts, params.get('intervalMs'), params.get('maxDataPoints'),
+                                max_points, min_interval)
+        series = query_series(parsed, start_ts, end_ts, bucket)
+
+        result = []
+        for target, (metric, device_address) in zip(targets, parsed):
+            data = series[device_address]
+            if target.get('type') == 'table':
+                result.append({
+                    'type': 'table',
+                    'refId': target.get('refId'),
+                    'columns': [{'text': 'Time', 'type': 'time'}, {'text': metric, 'type': 'number'}],
+                    'rows': [[time_ms, value] for time_ms, value in zip(data['time'], data[metric])
+                             if value is not None],
+                })
+            else:
+                result.append({
+                    'target': target.get('target'),
+                    'refId': target.get('refId'),
+                    'datapoints': [[value, time_ms] for time_ms, value in zip(data['time'], data[metric])
+                                   if value is not None],
+                })
+        return json_response(result)
+
+    @blueprint.route('/annotations', methods=['POST'])
+    def annotations():
+        params = request.get_json(silent=True) or {}
+        try:
+            start_ts = parse_time(params['range']['from'])
+            end_ts = parse_time(params['range']['to'])
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({'error': f'查询参数错误: {e}'}), 400
+        annotation = params.get('annotation') or {}
+        # 注释查询内容为设备地址，为空时返回所有设备的缺口
+        device_address = (annotation.get('query') or '').strip() or None
+
+        coverage = storage.get_coverage(datetime.fromtimestamp(start_ts), datetime.fromtimestamp(end_ts),
+                                        device_address)
+        names = device_names() if coverage else {}
+        result = []
+        for device in coverage:
+            name = names.get(device['device_address']) or device['device_address'] or '未知设备'
+            for gap in device['gaps']:
+                result.append({
+                    'annotation': annotation,
+                    'time': int(datetime.fromisoformat(gap['start']).timestamp() * 1000),
+                    'timeEnd': int(datetime.fromisoformat(gap['end']).timestamp() * 1000),
+                    'isRegion': True,
+                    'title': f'{name} 数据缺口',
+                    'text': f"{device['device_address']} 无数据 {gap['duration']} 秒",
+                    'tags': ['gap', device['device_address'] or ''],
+                })
+        return json_response(result)
+
+    @blueprint.route('/series')
+    def columnar_series():
+        device_address = request.args.get('device') or None
+        metrics = [metric for metric in (request.args.get('metrics') or 'temperature,humidity').split(',')
+                   if metric in NUMERIC_COLUMNS]
+        now = datetime.now(timezone.utc).timestamp()
+        try:
+            end_ts = parse_time(request.args['to']) if request.args.get('to') else now
+            start_ts = parse_time(request.args['from']) if request.args.get('from') else end_ts - 24 * 3600
+        except ValueError as e:
+            return jsonify({'error': f'时间参数格式错误: {e}'}), 400
+
+        bucket = bucket_seconds(start_ts, end_ts, request.args.get('interval_ms', type=float),
+                                request.args.get('max_points', type=int), max_points, min_interval)
+        data = storage.get_downsampled(start_ts, end_ts, bucket, metrics, device_address)
+        data['interval_ms'] = int(bucket * 1000)
+        return json_response(data)
+
+    return blueprint
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+设备历史记录回填
+每次连接（包括重连）后从设备存储中下载断线期间的读数，补齐数据库中的缺口
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+from temperature_sensor_connector import TemperatureDataStorage, TemperatureSensorConnector
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryBackfill:
+    """连接后自动回填设备历史记录"""
+
+    def __init__(self, connector: TemperatureSensorConnector, storage: TemperatureDataStorage,
+                 max_records: int = 2000, chunk_size: int = 100, device_time_utc: bool = False,
+                 on_backfilled: Optional[Callable[[str, int], None]] = None):
+        """
+        初始化历史记录回填
+
+        Args:
+            connector: 温度计连接器
+            storage: 数据存储
+            max_records: 每次连接最多下载的记录数
+            chunk_size: 每次向设备请求的记录数
+            device_time_utc: 设备时钟是否为UTC时间
+            on_backfilled: 写入历史记录后的回调，参数为设备地址和写入条数
+        """
+        self.connector = connector
+        self.storage = storage
+        self.max_records = max_records
+        self.chunk_size = chunk_size
+        self.device_time_utc = device_time_utc
+        self.on_backfilled = on_backfilled
+
+    @classmethod
+    def attach(cls, connector: TemperatureSensorConnector, storage: TemperatureDataStorage,
+               config: Optional[dict] = None, **kwargs) -> Optional['HistoryBackfill']:
+        """
+        根据配置创建并注册到连接器
+
+        Args:
+            config: 配置文件中 server.history 部分，enabled 为 false 时不启用
+        """
+        options = dict(config or {})
+        if not options.pop('enabled', True):
+            return None
+        backfill = cls(connector, storage, **options, **kwargs)
+        connector.set_connect_callback(backfill.run)
+        return backfill
+
+    async def run(self, device_address: str) -> int:
+        """
+        下载并保存设备中晚于数据库最后一条读数的历史记录
+
+        Returns:
+            写入数据库的条数
+        """
+        # 以连接时间为界：连接后收到的实时数据不参与计算，设备中晚于该时间的记录也不下载
+        connected_at = time.time()
+        loop = asyncio.get_running_loop()
+
+        since = await loop.run_in_executor(None, self.storage.get_last_epoch, device_address, connected_at)
+        records = await self.connector.download_history(
+            since=since,
+            until=connected_at,
+            max_records=self.max_records,
+            chunk_size=self.chunk_size,
+            device_time_utc=self.device_time_utc
+        )
+        if not records:
+            return 0
+
+        inserted = await loop.run_in_executor(None, self.storage.save_history, records)
+        logger.info(f"📥 已从设备 {device_address} 回填 {inserted} 条历史记录 "
+                    f"({records[0].timestamp} ~ {records[-1].timestamp})")
+
+        if inserted and self.on_backfilled:
+            self.on_backfilled(device_address, inserted)
+        return inserted
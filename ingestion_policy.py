@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据入库策略
+部分固件每秒推送一次数值不变的通知，按设备过滤后只保存有信息量的读数：
+- 死区：指标相对上次保存的值变化超过阈值才保存
+- 最小保存间隔：两次保存之间至少间隔指定秒数
+- 心跳：数值不变时也每隔指定秒数保存一条，用于表明设备在线
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+from temperature_sensor_connector import TemperatureData
+
+# 入库决策结果
+STORE_FIRST = 'first'          # 设备的第一条读数
+STORE_CHANGED = 'changed'      # 超出死区
+STORE_HEARTBEAT = 'heartbeat'  # 心跳
+DROP_INTERVAL = 'interval'     # 距上次保存未达到最小间隔
+DROP_DEADBAND = 'deadband'     # 变化在死区内
+
+DROP_REASONS = (DROP_INTERVAL, DROP_DEADBAND)
+
+
+class IngestionPolicy:
+    """单个设备的入库策略"""
+
+    def __init__(self, deadband: Optional[Dict[str, float]] = None, min_interval: float = 0,
+                 heartbeat: Optional[float] = None):
+        """
+        初始化入库策略
+
+        Args:
+            deadband: 各指标的死区阈值，如 {"temperature": 0.1, "humidity": 0.5}；
+                      未列出的指标不参与变化判断，为空则任何读数都视为有变化
+            min_interval: 最小保存间隔（秒）
+            heartbeat: 心跳间隔（秒），为空则不写心跳；应小于 storage.gap_threshold，否则会被记为数据缺口
+        """
+        self.deadband = deadband or {}
+        self.min_interval = min_interval
+        self.heartbeat = heartbeat
+
+    def decide(self, data: TemperatureData, last: Optional[TemperatureData], elapsed: float) -> str:
+        """
+        判断读数是否需要保存
+
+        Args:
+            data: 当前读数
+            last: 该设备上次保存的读数
+            elapsed: 距上次保存的秒数
+
+        Returns:
+            STORE_* 或 DROP_* 之一
+        """
+        if last is None:
+            return STORE_FIRST
+        if self.heartbeat is not None and elapsed >= self.heartbeat:
+            return STORE_HEARTBEAT
+        if elapsed < self.min_interval:
+            return DROP_INTERVAL
+        if not self.deadband:
+            return STORE_CHANGED
+
+        for metric, threshold in self.deadband.items():
+            value = getattr(data, metric)
+            previous = getattr(last, metric)
+            if value is None or previous is None:
+                if value is not previous:
+                    return STORE_CHANGED
+                continue
+            if abs(value - previous) > threshold:
+                return STORE_CHANGED
+        return DROP_DEADBAND
+
+
+class IngestionFilter:
+    """按设备应用入库策略，并统计保存与丢弃的读数"""
+
+    def __init__(self, default_policy: Optional[IngestionPolicy] = None,
+                 device_policies: Optional[Dict[str, IngestionPolicy]] = None):
+        """
+        初始化入库过滤器
+
+        Args:
+            default_policy: 默认策略，为空则保存所有读数
+            device_policies: 设备地址 -> 该设备专用策略
+        """
+        self.default_policy = default_policy or IngestionPolicy()
+        self.device_policies = device_policies or {}
+        # 设备地址 -> (上次保存的读数, 保存时间)
+        self._last_stored: Dict[Optional[str], tuple] = {}
+        self._counters: Dict[Optional[str], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> 'IngestionFilter':
+        """
+        从配置创建入库过滤器
+
+        Args:
+            config: 配置文件中 server.ingestion 部分，devices 下可按设备地址覆盖默认策略的任意字段；
+                    enabled 不为 true 时不过滤，保存所有读数
+        """
+        config = dict(config or {})
+        if not config.pop('enabled', False):
+            return cls()
+        device_configs = config.pop('devices', {})
+        device_policies = {
+            address: IngestionPolicy(**{**config, **overrides})
+            for address, overrides in device_configs.items()
+        }
+        return cls(IngestionPolicy(**config), device_policies)
+
+    def policy_for(self, device_address: Optional[str]) -> IngestionPolicy:
+        """获取设备对应的策略"""
+        return self.device_policies.get(device_address, self.default_policy)
+
+    def accept(self, data: TemperatureData) -> bool:
+        """
+        评估一条读数，需要保存时返回True并记为该设备最近保存的读数
+
+        使用读数自带的时间戳计算间隔，没有时间戳时使用当前时间
+        """
+        device = data.device_address
+        now = data.timestamp.timestamp() if data.timestamp else time.time()
+
+        with self._lock:
+            last, last_time = self._last_stored.get(device, (None, 0.0))
+            decision = self.policy_for(device).decide(data, last, now - last_time)
+
+            counters = self._counters.setdefault(device, {'stored': 0, 'dropped': 0})
+            counters[decision] = counters.get(decision, 0) + 1
+            if decision in DROP_REASONS:
+                counters['dropped'] += 1
+                return False
+
+            counters['stored'] += 1
+            self._last_stored[device] = (data, now)
+            return True
+
+    def stats(self) -> dict:
+        """
+        入库统计
+
+        Returns:
+            总计与按设备的 stored/dropped 数量，以及各决策原因的计数
+        """
+        with self._lock:
+            devices = {device or 'unknown': dict(counters) for device, counters in self._counters.items()}
+
+        stored = sum(counters['stored'] for counters in devices.values())
+        dropped = sum(counters['dropped'] for counters in devices.values())
+        total = stored + dropped
+        return {
+            'stored': stored,
+            'dropped': dropped,
+            'drop_ratio': round(dropped / total, 4) if total else 0,
+            'devices': devices,
+        }
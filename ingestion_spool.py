@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+读数落盘缓冲区（spool）
+每条读数先追加写入本地分段文件，再由数据库写线程异步读出并写入数据库，写入成功后记录确认位置。
+数据库被锁定或变慢（VACUUM、导出、备份）时读数保留在缓冲区中等待重试，采集端不受影响；
+进程崩溃后重新启动时从确认位置继续写入，不丢失数据。
+
+文件格式: 目录下的 <序号>.seg 分段文件，每条记录为 [长度 u32][CRC32 u32][JSON]；
+ack.json 保存已写入数据库的位置 {"segment": 序号, "offset": 字节偏移}；
+dead_letter.jsonl 保存多次重试后仍无法写入数据库的读数，每行为 {"record": 读数, "error": 错误, "time": 时间}。
+"""
+
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from temperature_sensor_connector import TemperatureData
+
+logger = logging.getLogger(__name__)
+
+RECORD_HEADER = struct.Struct('<II')
+SEGMENT_SUFFIX = '.seg'
+ACK_FILE = 'ack.json'
+DEAD_LETTER_FILE = 'dead_letter.jsonl'
+
+
+class SpoolPosition(NamedTuple):
+    """缓冲区中的位置"""
+    segment: int
+    offset: int
+
+
+def encode_record(data: TemperatureData) -> bytes:
+    """将读数编码为一条带长度和校验的记录"""
+    payload = data.to_json().encode('utf-8')  # 与推送共用缓存的JSON
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_payload(payload: bytes) -> TemperatureData:
+    """将记录内容还原为读数"""
+    fields = json.loads(payload)
+    if fields.get('timestamp'):
+        fields['timestamp'] = datetime.fromisoformat(fields['timestamp'])
+    return TemperatureData(**fields)
+
+
+class IngestionSpool:
+    """追加写入的分段缓冲区（单个写入方、单个读取方）"""
+
+    def __init__(self, directory: str = 'spool', segment_max_bytes: int = 4 * 1024 * 1024,
+                 fsync_interval: float = 0.2, max_attempts: int = 5):
+        """
+        初始化缓冲区，恢复上次未写入数据库的数据
+
+        Args:
+            directory: 缓冲区目录
+            segment_max_bytes: 单个分段文件的大小上限，超出后切换到新分段
+            fsync_interval: 批量调用 fsync 的间隔（秒）。进程崩溃不会丢失已追加的数据，
+                断电时最多丢失该间隔内的数据
+            max_attempts: 一批读数因读数本身的错误（字段无效、违反约束）写入失败的次数上限，达到后逐条写入，
+                仍无法写入的读数移入死信文件；数据库锁定或不可用时一直重试，不计入次数
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_interval = fsync_interval
+        self.max_attempts = max_attempts
+
+        self._cond = threading.Condition()
+        # fsync 不持有 _cond，追加写入不会等待 fsync；切换分段和关闭时用此锁等待正在进行的 fsync
+        self._fd_lock = threading.Lock()
+        self._closed = False
+        self._dirty = False
+        self._appended = 0
+        self._acked = 0
+        self._dead_lettered = 0
+        self._skipped = 0  # 因损坏或无法解析而跳过的记录数，与已确认的读数一样从待写入数中扣除
+        self._unacked_skipped = 0  # 上次确认之后读取时跳过的记录数，确认时计入 _skipped
+        # 各分段计入待写入数的记录数（启动时确认位置所在分段从确认位置开始计数），用于计算跳过的损坏记录数
+        self._segment_counts: Dict[int, int] = {}
+
+        self._ack = self._load_ack()
+        self._count_base = self._ack
+        self._remove_segments_before(self._ack.segment)
+        segments = self._segment_ids()
+
+        # 最后一个分段可能在写入中途崩溃，截掉不完整的记录
+        if segments:
+            self._truncate_torn_tail(segments[-1])
+        self._recovered = self._count_records(self._ack, segments)
+        last = segments[-1] if segments else max(self._ack.segment, 1)
+        self._open_segment(last)
+        self.recovered_end = SpoolPosition(self._segment_id, self._write_offset)
+        self._read_pos = self._ack
+
+        if self._recovered:
+            logger.warning(f"📦 缓冲区中有 {self._recovered} 条上次未写入数据库的数据，将重新写入")
+
+        self._flusher = threading.Thread(target=self._flush_loop, name='spool-fsync', daemon=True)
+        self._flusher.start()
+
+    @classmethod
+    def from_config(cls, config: Optional[dict], name: str) -> Optional['IngestionSpool']:
+        """
+        根据配置创建缓冲区
+
+        Args:
+            config: 配置文件中 server.spool 部分，enabled 为 false 时返回None
+            name: 子目录名称，采集服务和Web服务各自使用独立的缓冲区
+        """
+        options = dict(config or {})
+        if not options.pop('enabled', True):
+            return None
+        directory = Path(options.pop('directory', 'spool')) / name
+        segment_max_mb = options.pop('segment_max_mb', 4)
+        return cls(str(directory), segment_max_bytes=int(segment_max_mb * 1024 * 1024), **options)
+
+    # ------------------------------------------------------------ 写入
+
+    def append(self, data: TemperatureData):
+        """追加一条读数（写入操作系统缓存后返回，fsync 由后台线程批量完成）"""
+        record = encode_record(data)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("缓冲区已关闭")
+            if self._write_offset and self._write_offset + len(record) > self.segment_max_bytes:
+                self._roll()
+            # 单次 write 调用写入完整记录，读取方不会读到交错的数据
+            os.write(self._fd, record)
+            self._write_offset += len(record)
+            self._appended += 1
+            self._segment_counts[self._segment_id] = self._segment_counts.get(self._segment_id, 0) + 1
+            self._dirty = True
+            self._cond.notify_all()
+
+    def _roll(self):
+        """关闭当前分段并切换到新分段（调用方需持有 _cond）"""
+        with self._fd_lock:
+            os.fsync(self._fd)
+            os.close(self._fd)
+            self._open_segment(self._segment_id + 1)
+
+    def _open_segment(self, segment_id: int):
+        self._segment_id = segment_id
+        path = self._segment_path(segment_id)
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0), 0o644)
+        self._write_offset = os.fstat(self._fd).st_size
+
+    def _flush_loop(self):
+        """后台线程：定期将已追加的数据 fsync 到磁盘"""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._dirty)
+                if self._closed:
+                    return
+                self._dirty = False
+            with self._fd_lock:
+                if self._closed:
+                    return
+                try:
+                    os.fsync(self._fd)
+                except OSError as e:
+                    logger.error(f"缓冲区 fsync 失败: {e}")
+            if self.fsync_interval > 0:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._closed, timeout=self.fsync_interval)
+
+    # ------------------------------------------------------------ 读取与确认
+
+    def read_batch(self, max_records: int, timeout: Optional[float] = None) -> Tuple[List[TemperatureData], SpoolPosition]:
+        """
+        从读取位置读出最多 max_records 条读数，暂无数据时最多等待 timeout 秒
+
+        Returns:
+            (读数列表, 读完这些读数后的位置)，写入数据库后以该位置调用 ack
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or self._read_pos != self._end_position(), timeout=timeout)
+            end = self._end_position()
+            end_count = self._segment_counts.get(end.segment, 0)
+
+        records = []
+        position = self._read_pos
+        while len(records) < max_records and position != end:
+            if position.segment == end.segment:
+                limit, expected = end.offset, end_count
+            else:
+                limit, expected = None, self._segment_count(position.segment)
+            batch, position, skipped = self._read_segment(position, max_records - len(records), limit, expected)
+            records.extend(batch)
+            self._unacked_skipped += skipped
+            if position.segment < end.segment and len(records) < max_records:
+                # 已切换的分段已读完（或剩余数据损坏），继续读下一个分段
+                position = SpoolPosition(position.segment + 1, 0)
+            elif not batch:
+                break
+        self._read_pos = position
+        return records, position
+
+    def rewind(self):
+        """回到上次确认的位置（写入数据库失败时重新读取同一批数据）"""
+        self._read_pos = self._ack
+        self._unacked_skipped = 0
+
+    def ack(self, position: SpoolPosition, count: int):
+        """
+        确认 position 之前的数据已写入数据库，删除已全部确认的分段
+
+        Args:
+            position: read_batch 返回的位置
+            count: 本次确认的读数条数（读取时跳过的损坏记录由缓冲区自行计入 skipped）
+        """
+        tmp_path = self.directory / f".{ACK_FILE}.tmp"
+        tmp_path.write_text(json.dumps(position._asdict()), encoding='utf-8')
+        tmp_path.replace(self.directory / ACK_FILE)
+        if position.segment > self._ack.segment:
+            self._remove_segments_before(position.segment)
+        self._ack = position
+        with self._cond:
+            self._acked += count
+            self._skipped += self._unacked_skipped
+            self._unacked_skipped = 0
+            for segment_id in [segment_id for segment_id in self._segment_counts if segment_id < position.segment]:
+                del self._segment_counts[segment_id]
+
+    def dead_letter(self, data: TemperatureData, error: Exception):
+        """
+        将无法写入数据库的读数追加到死信文件（之后随所在批次一起确认）
+
+        Raises:
+            OSError: 写入死信文件失败，读数应保留在缓冲区中
+        """
+        line = json.dumps({'record': data.to_dict(), 'error': f"{type(error).__name__}: {error}",
+                           'time': datetime.now().isoformat()}, ensure_ascii=False)
+        with open(self.directory / DEAD_LETTER_FILE, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        with self._cond:
+            self._dead_lettered += 1
+        logger.error(f"读数无法写入数据库，已移入死信文件 {self.directory / DEAD_LETTER_FILE}: {error}")
+
+    @property
+    def replaying(self) -> bool:
+        """下一批数据是否包含启动时恢复的数据（这些数据可能在崩溃前已写入数据库，写入时需去重）"""
+        return self._ack < self.recovered_end
+
+    def pending(self) -> int:
+        """尚未确认写入数据库的读数条数"""
+        with self._cond:
+            return self._recovered + self._appended - self._acked - self._skipped
+
+    def stats(self) -> dict:
+        """缓冲区统计"""
+        with self._cond:
+            return {
+                'pending': self._recovered + self._appended - self._acked - self._skipped,
+                'appended': self._appended,
+                'acked': self._acked,
+                'recovered': self._recovered,
+                'dead_lettered': self._dead_lettered,
+                'skipped': self._skipped,
+                'segment': self._segment_id,
+            }
+
+    def close(self):
+        """fsync 并关闭当前分段，未确认的数据保留到下次启动"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+            with self._fd_lock:
+                try:
+                    os.fsync(self._fd)
+                finally:
+                    os.close(self._fd)
+        self._flusher.join(timeout=1)
+
+    # ------------------------------------------------------------ 文件
+
+    def _end_position(self) -> SpoolPosition:
+        return SpoolPosition(self._segment_id, self._write_offset)
+
+    def _segment_path(self, segment_id: int) -> Path:
+        return self.directory / f"{segment_id:012d}{SEGMENT_SUFFIX}"
+
+    def _segment_size(self, segment_id: int) -> int:
+        try:
+            return self._segment_path(segment_id).stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _segment_ids(self) -> List[int]:
+        ids = []
+        for path in self.directory.glob(f"*{SEGMENT_SUFFIX}"):
+            try:
+                ids.append(int(path.stem))
+            except ValueError:
+                continue
+        return sorted(ids)
+
+    def _remove_segments_before(self, segment_id: int):
+        for existing in self._segment_ids():
+            if existing < segment_id:
+                try:
+                    self._segment_path(existing).unlink()
+                except OSError as e:
+                    logger.warning(f"删除缓冲区分段失败: {e}")
+
+    def _load_ack(self) -> SpoolPosition:
+        try:
+            ack = json.loads((self.directory / ACK_FILE).read_text(encoding='utf-8'))
+            return SpoolPosition(int(ack['segment']), int(ack['offset']))
+        except FileNotFoundError:
+            segments = self._segment_ids()
+            return SpoolPosition(segments[0] if segments else 1, 0)
+        except (ValueError, KeyError, TypeError) as e:
+            # 确认位置损坏时从头重放，重放的数据写入时会去重
+            logger.error(f"缓冲区确认位置损坏，将重放全部数据: {e}")
+            segments = self._segment_ids()
+            return SpoolPosition(segments[0] if segments else 1, 0)
+
+    def _read_segment(self, position: SpoolPosition, max_records: int, limit: Optional[int],
+                      expected: int = 0) -> Tuple[List[TemperatureData], SpoolPosition, int]:
+        """
+        从分段中读取完整且校验通过的记录
+
+        Args:
+            expected: 该分段（到 limit 为止）计入待写入数的记录数，遇到损坏数据时据此计算跳过的条数
+
+        Returns:
+            (读数列表, 读取后的位置, 跳过的记录数)
+        """
+        records = []
+        skipped = 0
+        offset = position.offset
+        try:
+            with open(self._segment_path(position.segment), 'rb') as f:
+                f.seek(offset)
+                while len(records) < max_records and (limit is None or offset < limit):
+                    header = f.read(RECORD_HEADER.size)
+                    if not header:
+                        break
+                    length, crc = RECORD_HEADER.unpack(header) if len(header) == RECORD_HEADER.size else (0, 0)
+                    payload = f.read(length)
+                    if len(header) < RECORD_HEADER.size or len(payload) < length or zlib.crc32(payload) != crc:
+                        logger.error(f"缓冲区分段 {position.segment} 在偏移 {offset} 处损坏，跳过该分段剩余数据")
+                        # 损坏位置之后计入待写入数的记录都被跳过
+                        before = self._count_valid(position.segment, self._segment_base(position.segment), offset)
+                        skipped += max(0, expected - before)
+                        offset = self._segment_size(position.segment) if limit is None else limit
+                        break
+                    offset += RECORD_HEADER.size + length
+                    try:
+                        records.append(decode_payload(payload))
+                    except (ValueError, TypeError) as e:
+                        logger.error(f"缓冲区记录无法解析，已跳过: {e}")
+                        skipped += 1
+        except FileNotFoundError:
+            pass
+        return records, SpoolPosition(position.segment, offset), skipped
+
+    def _segment_base(self, segment_id: int) -> int:
+        """分段中开始计入待写入数的偏移"""
+        return self._count_base.offset if segment_id == self._count_base.segment else 0
+
+    def _segment_count(self, segment_id: int) -> int:
+        with self._cond:
+            return self._segment_counts.get(segment_id, 0)
+
+    def _count_valid(self, segment_id: int, start: int, stop: Optional[int] = None) -> int:
+        """统计分段中 [start, stop) 内校验通过的记录数（含无法解析的记录），遇到损坏数据时停止"""
+        count = 0
+        offset = start
+        try:
+            with open(self._segment_path(segment_id), 'rb') as f:
+                f.seek(offset)
+                while stop is None or offset < stop:
+                    header = f.read(RECORD_HEADER.size)
+                    if len(header) < RECORD_HEADER.size:
+                        break
+                    length, crc = RECORD_HEADER.unpack(header)
+                    payload = f.read(length)
+                    if len(payload) < length or zlib.crc32(payload) != crc:
+                        break
+                    offset += RECORD_HEADER.size + length
+                    count += 1
+        except FileNotFoundError:
+            pass
+        return count
+
+    def _scan_valid_length(self, segment_id: int) -> int:
+        """返回分段中完整且校验通过的记录的总长度"""
+        offset = 0
+        with open(self._segment_path(segment_id), 'rb') as f:
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                length, crc = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                offset += RECORD_HEADER.size + length
+        return offset
+
+    def _truncate_torn_tail(self, segment_id: int):
+        valid_length = self._scan_valid_length(segment_id)
+        size = self._segment_size(segment_id)
+        if valid_length < size:
+            logger.warning(f"缓冲区分段 {segment_id} 末尾有 {size - valid_length} 字节不完整的数据，已截断")
+            with open(self._segment_path(segment_id), 'r+b') as f:
+                f.truncate(valid_length)
+
+    def _count_records(self, start: SpoolPosition, segments: List[int]) -> int:
+        """统计 start 之后的记录数，并记录各分段的记录数"""
+        count = 0
+        for segment_id in segments:
+            if segment_id < start.segment:
+                continue
+            segment_count = self._count_valid(segment_id, start.offset if segment_id == start.segment else 0)
+            self._segment_counts[segment_id] = segment_count
+            count += segment_count
+        return count
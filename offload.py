@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CPU密集任务卸载
+将导出、汇总回填、归档压缩等CPU密集任务交给独立进程执行，避免占用Web进程的GIL
+导致Socket.IO轮询响应和实时推送变慢。跨进程传递的数据使用紧凑的列式数组。
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from array import array
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 数据列顺序与 TemperatureDataStorage 查询结果一致
+COLUMNS = ('timestamp', 'temperature', 'humidity', 'battery', 'voltage', 'device_name', 'device_address')
+
+# 写入时由温湿度计算的舒适度指标列（comfort_metrics），时间范围查询结果中排在 COLUMNS 之后
+DERIVED_COLUMNS = ('dew_point', 'absolute_humidity', 'heat_index')
+
+# 以浮点数组存放的数值列，NULL 存为 NaN
+NUMERIC_COLUMNS = ('temperature', 'humidity', 'battery', 'voltage') + DERIVED_COLUMNS
+
+NAN = float('nan')
+
+
+class ColumnarData:
+    """
+    列式温湿度数据
+
+    数值列为 array('d')，设备名称/地址按字典编码存放，
+    序列化体积远小于字典列表，适合在进程间传递
+    """
+
+    __slots__ = ('timestamps', 'temperature', 'humidity', 'battery', 'voltage',
+                 'dew_point', 'absolute_humidity', 'heat_index',
+                 'devices', 'device_index', '_device_ids')
+
+    def __init__(self):
+        self.timestamps: List[str] = []
+        self.temperature = array('d')
+        self.humidity = array('d')
+        self.battery = array('d')
+        self.voltage = array('d')
+        self.dew_point = array('d')
+        self.absolute_humidity = array('d')
+        self.heat_index = array('d')
+        # 设备字典: [(device_name, device_address)]，device_index 为每行对应的字典下标
+        self.devices: List[tuple] = []
+        self.device_index = array('H')
+        self._device_ids: Dict[tuple, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name != '_device_ids'}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._device_ids = {device: index for index, device in enumerate(self.devices)}
+
+    def extend_rows(self, rows: Iterable[tuple]):
+        """追加按 COLUMNS + DERIVED_COLUMNS 顺序排列的数据行"""
+        for (timestamp, temperature, humidity, battery, voltage, device_name, device_address,
+             dew_point, absolute_humidity, heat_index) in rows:
+            self.timestamps.append(timestamp)
+            self.temperature.append(NAN if temperature is None else temperature)
+            self.humidity.append(NAN if humidity is None else humidity)
+            self.battery.append(NAN if battery is None else battery)
+            self.voltage.append(NAN if voltage is None else voltage)
+            self.dew_point.append(NAN if dew_point is None else dew_point)
+            self.absolute_humidity.append(NAN if absolute_humidity is None else absolute_humidity)
+            self.heat_index.append(NAN if heat_index is None else heat_index)
+
+            device = (device_name, device_address)
+            index = self._device_ids.get(device)
+            if index is None:
+                index = self._device_ids[device] = len(self.devices)
+                self.devices.append(device)
+            self.device_index.append(index)
+
+    def extend(self, other: 'ColumnarData'):
+        """追加另一份列式数据"""
+        self.timestamps.extend(other.timestamps)
+        for name in NUMERIC_COLUMNS:
+            getattr(self, name).extend(getattr(other, name))
+
+        remap = array('H')
+        for device in other.devices:
+            index = self._device_ids.get(device)
+            if index is None:
+                index = self._device_ids[device] = len(self.devices)
+                self.devices.append(device)
+            remap.append(index)
+        self.device_index.extend(remap[index] for index in other.device_index)
+
+    def device_names(self) -> List[Optional[str]]:
+        """展开设备名称列"""
+        return [self.devices[index][0] for index in self.device_index]
+
+    def device_addresses(self) -> List[Optional[str]]:
+        """展开设备地址列"""
+        return [self.devices[index][1] for index in self.device_index]
+
+
+class OffloadExecutor:
+    """
+    CPU密集任务执行器
+
+    基于 ProcessPoolExecutor，进程数和排队任务数均有上限；
+    超出上限时 submit 会阻塞调用线程，而不是无限堆积任务
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 8):
+        """
+        初始化任务执行器
+
+        Args:
+            max_workers: 工作进程数
+            max_pending: 已提交但未完成的任务数上限（含执行中）
+        """
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_run_ms = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """首次使用时创建进程池"""
+        with self._lock:
+            if self._executor is None:
+                # 统一使用spawn：不从多线程的Web进程fork，避免子进程继承持有中的锁
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                logger.info(f"CPU任务进程池已创建: {self.max_workers} 个工作进程")
+            return self._executor
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        提交任务到工作进程
+
+        Args:
+            fn: 模块级函数（需可被pickle）
+            *args, **kwargs: 函数参数（需可被pickle，大数据请使用 ColumnarData）
+
+        Returns:
+            任务的 Future
+        """
+        executor = self._get_executor()
+        self._slots.acquire()
+        with self._lock:
+            self._pending += 1
+        started = time.perf_counter()
+
+        try:
+            future = executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release(None, started)
+            raise
+
+        future.add_done_callback(lambda f: self._release(f, started))
+        return future
+
+    def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """提交任务并等待结果（阻塞当前线程，但不占用GIL）"""
+        return self.submit(fn, *args, **kwargs).result(timeout=timeout)
+
+    def _release(self, future: Optional[Future], started: float):
+        with self._lock:
+            self._pending -= 1
+            if future is None or future.cancelled() or future.exception() is not None:
+                self._failed += 1
+            else:
+                self._completed += 1
+                self._total_run_ms += (time.perf_counter() - started) * 1000
+        self._slots.release()
+
+    def stats(self) -> dict:
+        """任务执行统计"""
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'pending': self._pending,
+                'completed': self._completed,
+                'failed': self._failed,
+                'avg_run_ms': round(self._total_run_ms / self._completed, 2) if self._completed else 0,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """关闭进程池"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
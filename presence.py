@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+在线人数统计与状态快照
+- PresenceTracker: 线程安全地记录在线连接，人数变化时合并推送，每个间隔最多广播一次
+- CachedSnapshot: 缓存序列化后的状态数据，在有效期内的请求直接返回缓存
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceTracker:
+    """在线连接统计"""
+
+    def __init__(self, broadcast: Callable[[int], None], interval: float = 2.0):
+        """
+        初始化在线连接统计
+
+        Args:
+            broadcast: 推送在线人数的回调
+            interval: 两次推送之间的最小间隔（秒），期间的所有变化合并为一次推送
+        """
+        self.broadcast = broadcast
+        self.interval = interval
+        self._sessions = set()
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._last_broadcast_time = 0.0
+        self._last_broadcast_count: Optional[int] = None
+
+    @property
+    def count(self) -> int:
+        """当前在线连接数"""
+        with self._lock:
+            return len(self._sessions)
+
+    def connect(self, sid: str) -> int:
+        """记录新连接，返回当前在线连接数"""
+        with self._lock:
+            self._sessions.add(sid)
+            count = len(self._sessions)
+            self._schedule()
+        return count
+
+    def disconnect(self, sid: str) -> int:
+        """移除断开的连接，返回当前在线连接数"""
+        with self._lock:
+            self._sessions.discard(sid)
+            count = len(self._sessions)
+            self._schedule()
+        return count
+
+    def _schedule(self):
+        """安排一次合并推送（调用方需持有锁）"""
+        if self._timer is not None:
+            return
+        delay = max(0.0, self._last_broadcast_time + self.interval - time.monotonic())
+        self._timer = threading.Timer(delay, self._flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush(self):
+        """推送当前在线人数（人数与上次推送相同则跳过）"""
+        with self._lock:
+            self._timer = None
+            count = len(self._sessions)
+            if count == self._last_broadcast_count:
+                return
+            self._last_broadcast_count = count
+            self._last_broadcast_time = time.monotonic()
+
+        try:
+            self.broadcast(count)
+        except Exception as e:
+            logger.error(f"在线人数推送失败: {e}")
+
+    def stop(self):
+        """取消尚未执行的推送"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+class CachedSnapshot:
+    """带有效期的JSON快照"""
+
+    def __init__(self, builder: Callable[[], dict], ttl: float = 1.0):
+        """
+        初始化快照
+
+        Args:
+            builder: 生成快照数据的函数
+            ttl: 快照有效期（秒）
+        """
+        self.builder = builder
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._body: Optional[str] = None
+        self._built_at = 0.0
+
+    def get(self) -> str:
+        """返回序列化后的快照，过期时重新生成（并发请求只生成一次）"""
+        with self._lock:
+            now = time.monotonic()
+            if self._body is None or now - self._built_at >= self.ttl:
+                self._body = json.dumps(self.builder(), ensure_ascii=False)
+                self._built_at = now
+            return self._body
+
+    def invalidate(self):
+        """使快照立即过期"""
+        with self._lock:
+            self._body = None
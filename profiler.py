@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内置性能分析模式
+- SamplingProfiler: 后台线程定时采样所有线程的调用栈，输出折叠栈格式（可直接用 flamegraph.pl 或 speedscope 生成火焰图）
+- StageTimers: 统计各处理阶段（蓝牙通知、数据库写入、序列化、推送、Flask路由）的调用次数与耗时
+- Profiler: 组合以上两者，通过包装函数的方式注入计时，未启用时不修改任何代码路径
+
+启动脚本的 --profile 参数启用本模块。
+"""
+
+import asyncio
+import atexit
+import functools
+import logging
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StageStats:
+    """单个阶段的耗时统计"""
+
+    __slots__ = ('count', 'total', 'max', 'samples')
+
+    def __init__(self, reservoir: int = 2048):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        # 只保留最近的耗时用于计算分位数
+        self.samples = deque(maxlen=reservoir)
+
+    def add(self, elapsed: float):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.samples.append(elapsed)
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class StageTimers:
+    """线程安全的阶段计时器"""
+
+    def __init__(self):
+        self._stats: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, elapsed: float):
+        """记录一次阶段耗时（秒）"""
+        with self._lock:
+            stats = self._stats.get(stage)
+            if stats is None:
+                stats = self._stats[stage] = StageStats()
+            stats.add(elapsed)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """统计 with 代码块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summary(self) -> List[dict]:
+        """按总耗时降序返回各阶段统计（毫秒）"""
+        with self._lock:
+            rows = [{
+                'stage': name,
+                'count': stats.count,
+                'total_ms': round(stats.total * 1000, 2),
+                'avg_ms': round(stats.total / stats.count * 1000, 3) if stats.count else 0.0,
+                'p50_ms': round(stats.percentile(0.5) * 1000, 3),
+                'p99_ms': round(stats.percentile(0.99) * 1000, 3),
+                'max_ms': round(stats.max * 1000, 3),
+            } for name, stats in self._stats.items()]
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+        return rows
+
+    def format_table(self) -> str:
+        """生成阶段耗时汇总表"""
+        rows = self.summary()
+        if not rows:
+            return "(无阶段计时数据)"
+
+        headers = ['stage', 'count', 'total_ms', 'avg_ms', 'p50_ms', 'p99_ms', 'max_ms']
+        widths = [max(len(h), *(len(str(row[h])) for row in rows)) for h in headers]
+        lines = ['  '.join(h.ljust(w) if i == 0 else h.rjust(w) for i, (h, w) in enumerate(zip(headers, widths)))]
+        lines.append('  '.join('-' * w for w in widths))
+        for row in rows:
+            lines.append('  '.join(
+                str(row[h]).ljust(w) if i == 0 else str(row[h]).rjust(w)
+                for i, (h, w) in enumerate(zip(headers, widths))
+            ))
+        return '\n'.join(lines)
+
+
+class SamplingProfiler:
+    """定时采样所有线程调用栈的统计型分析器"""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        """
+        初始化采样分析器
+
+        Args:
+            interval: 采样间隔（秒）
+            max_depth: 每个调用栈最多保留的帧数
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """启动采样线程"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止采样线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            folded = []
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                folded.append(self._fold(names.get(thread_id, str(thread_id)), frame))
+            with self._lock:
+                self.samples += 1
+                self._stacks.update(folded)
+
+    def _fold(self, thread_name: str, frame) -> str:
+        """将调用栈折叠为 "线程;外层函数;...;内层函数" 格式"""
+        parts = []
+        while frame is not None and len(parts) < self.max_depth:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+            frame = frame.f_back
+        parts.append(thread_name)
+        # 火焰图格式中分号为分隔符
+        return ';'.join(part.replace(';', ':') for part in reversed(parts))
+
+    def write_folded(self, path: Path) -> int:
+        """
+        写入折叠栈文件（每行为 "调用栈 采样数"）
+
+        Returns:
+            写入的调用栈数量
+        """
+        with self._lock:
+            stacks = list(self._stacks.items())
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks:
+                f.write(f"{stack} {count}\n")
+        tmp_path.replace(path)
+        return len(stacks)
+
+
+class Profiler:
+    """性能分析模式：调用栈采样 + 阶段计时，定期写出结果，退出时打印汇总表"""
+
+    def __init__(self):
+        self.enabled = False
+        self.timers = StageTimers()
+        self.sampler: Optional[SamplingProfiler] = None
+        self.output_dir = Path('profile')
+        self.name = 'profile'
+        self.flush_interval = 30.0
+        self._flush_stop = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+        self._started_at = 0.0
+
+    def enable(self, name: str, output_dir: str = 'profile', sample_interval: float = 0.005,
+               flush_interval: float = 30.0):
+        """
+        启用性能分析
+
+        Args:
+            name: 输出文件名前缀（如 collector、web）
+            output_dir: 输出目录
+            sample_interval: 调用栈采样间隔（秒）
+            flush_interval: 定期写出结果的间隔（秒）
+        """
+        if self.enabled:
+            return
+        self.enabled = True
+        self.name = name
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self._started_at = time.time()
+
+        self.sampler = SamplingProfiler(interval=sample_interval)
+        self.sampler.start()
+        self._flush_thread = threading.Thread(target=self._flush_loop, name='profiler-flush', daemon=True)
+        self._flush_thread.start()
+        atexit.register(self.shutdown)
+        logger.info(f"🔬 性能分析已启用，结果输出到 {self.output_dir.resolve()}")
+
+    @property
+    def folded_path(self) -> Path:
+        return self.output_dir / f"{self.name}.folded"
+
+    @property
+    def summary_path(self) -> Path:
+        return self.output_dir / f"{self.name}-stages.txt"
+
+    def stage(self, name: str):
+        """统计代码块耗时的上下文管理器"""
+        return self.timers.stage(name)
+
+    def wrap(self, func: Callable, stage: str) -> Callable:
+        """返回带阶段计时的包装函数（协程函数统计到协程结束）"""
+        timers = self.timers
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    timers.record(stage, time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timers.record(stage, time.perf_counter() - start)
+        return wrapper
+
+    def instrument(self, owner, attr: str, stage: Optional[str] = None):
+        """
+        为类或对象的方法注入阶段计时（未启用时不做任何修改）
+
+        Args:
+            owner: 类或实例
+            attr: 方法名
+            stage: 阶段名称，默认为 "类名.方法名"
+        """
+        if not self.enabled:
+            return
+        func = getattr(owner, attr)
+        if getattr(func, '_profiled', False):
+            return
+        owner_name = owner.__name__ if isinstance(owner, type) else type(owner).__name__
+        wrapped = self.wrap(func, stage or f"{owner_name}.{attr}")
+        wrapped._profiled = True
+        setattr(owner, attr, wrapped)
+
+    def instrument_flask(self, app):
+        """为 Flask 应用的所有路由注入计时，阶段名称为 "route:端点名" """
+        if not self.enabled:
+            return
+        for endpoint, view in list(app.view_functions.items()):
+            if endpoint == 'static' or getattr(view, '_profiled', False):
+                continue
+            wrapped = self.wrap(view, f"route:{endpoint}")
+            wrapped._profiled = True
+            app.view_functions[endpoint] = wrapped
+
+    def flush(self):
+        """写出折叠栈和阶段汇总"""
+        if self.sampler is None:
+            return
+        try:
+            self.sampler.write_folded(self.folded_path)
+            elapsed = time.time() - self._started_at
+            header = (f"# {self.name} 运行 {elapsed:.0f} 秒, "
+                      f"调用栈采样 {self.sampler.samples} 次 (间隔 {self.sampler.interval * 1000:.1f} ms)\n\n")
+            self.summary_path.write_text(header + self.timers.format_table() + '\n', encoding='utf-8')
+        except Exception as e:
+            logger.error(f"写出性能分析结果失败: {e}")
+
+    def _flush_loop(self):
+        while not self._flush_stop.wait(self.flush_interval):
+            self.flush()
+
+    def shutdown(self):
+        """停止采样，写出最终结果并打印汇总表"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._flush_stop.set()
+        if self.sampler is not None:
+            self.sampler.stop()
+        self.flush()
+
+        print()
+        print("🔬 性能分析汇总")
+        print(self.timers.format_table())
+        print(f"火焰图数据: {self.folded_path} (flamegraph.pl {self.folded_path.name} > flame.svg，或拖入 https://speedscope.app)")
+
+
+# 进程内共享的分析器，由启动脚本按 --profile 参数启用
+profiler = Profiler()
+
+
+def instrument_collector(profile_config: Optional[dict] = None, name: str = 'collector'):
+    """
+    启用分析并为数据采集相关阶段注入计时：蓝牙通知处理、数据库写入、序列化
+
+    Args:
+        profile_config: 配置文件中 server.profiling 部分
+        name: 输出文件名前缀
+    """
+    from temperature_sensor_connector import TemperatureData, TemperatureDataStorage, TemperatureSensorConnector
+
+    profiler.enable(name, **(profile_config or {}))
+    profiler.instrument(TemperatureSensorConnector, '_notification_handler', 'ble.notification_handler')
+    profiler.instrument(TemperatureDataStorage, 'save_data', 'storage.save_data')
+    profiler.instrument(TemperatureDataStorage, 'save_batch', 'storage.save_batch')
+    # 使用落盘缓冲区时写线程直接调用 write_batch
+    profiler.instrument(TemperatureDataStorage, 'write_batch', 'storage.write_batch')
+    profiler.instrument(TemperatureData, 'to_dict', 'data.to_dict')
+
+
+def instrument_web(app, socketio, profile_config: Optional[dict] = None, name: str = 'web'):
+    """
+    启用分析并为Web服务注入计时：采集相关阶段、Socket.IO推送和所有Flask路由
+
+    Args:
+        app: Flask 应用
+        socketio: SocketIO 实例
+        profile_config: 配置文件中 server.profiling 部分
+        name: 输出文件名前缀
+    """
+    instrument_collector(profile_config, name)
+    profiler.instrument(socketio, 'emit', 'socketio.emit')
+    profiler.instrument_flask(app)
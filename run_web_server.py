@@ -6,6 +6,7 @@ DLUT宿舍实时温度监控Web服务器启动脚本
 """
 
 import sys
+import argparse
 import logging
 import webbrowser
 import time
@@ -31,8 +32,16 @@ def open_browser():
     except Exception as e:
         logger.warning(f"无法自动打开浏览器: {e}")
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='DLUT宿舍实时温度监控Web服务器')
+    parser.add_argument('--profile', action='store_true',
+                        help='启用性能分析（调用栈采样与阶段计时，结果写入 server.profiling.output_dir）')
+    return parser.parse_args()
+
 def main():
     """主函数"""
+    args = parse_args()
     print("🌡️ DLUT宿舍实时温度监控Web服务器")
     print("=" * 50)
     print("大连理工大学宿舍环境监测Web界面")
@@ -41,6 +50,11 @@ def main():
     try:
         # 导入Web应用
         from web_app import app, socketio, monitor
+
+        if args.profile:
+            from profiler import instrument_web
+            from temperature_sensor_connector import server_config
+            instrument_web(app, socketio, server_config.get('profiling'), name='web')
         
         # 启动温度监控服务
         logger.info("🚀 启动温度监控服务...")
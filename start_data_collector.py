@@ -6,14 +6,24 @@ DLUT宿舍温度数据采集服务
 """
 
 import sys
+import argparse
 import logging
 import asyncio
+import threading
 from pathlib import Path
 
 # 添加当前目录到Python路径
 sys.path.insert(0, str(Path(__file__).parent))
 
-from temperature_sensor_connector import TemperatureSensorConnector, TemperatureDataStorage, TemperatureData
+from temperature_sensor_connector import (
+    TemperatureDataStorage, AsyncTemperatureDataStorage, TemperatureData, server_config
+)
+from alert_engine import AlertEngine
+from ingestion_policy import IngestionFilter
+from history_backfill import HistoryBackfill
+from ingestion_spool import IngestionSpool
+from adapter_placement import create_connectors
+from federation_sync import FederationSyncClient
 
 # 设置日志
 logging.basicConfig(
@@ -30,8 +40,23 @@ class TemperatureDataCollector:
     """温度数据采集服务"""
     
     def __init__(self):
-        self.connector = TemperatureSensorConnector(auto_reconnect=True)
-        self.storage = TemperatureDataStorage()
+        # server.ble.devices 指定多个设备时每个设备一个连接器，连接分散到本机的各个蓝牙适配器
+        self.connectors = create_connectors(server_config.get('ble'), auto_reconnect=True)
+        self.connector = self.connectors[0]
+        self.storage = TemperatureDataStorage(**server_config.get('storage', {}))
+        # 读数先写入落盘缓冲区，数据库锁定或变慢时不丢数据、不阻塞采集
+        self.async_storage = AsyncTemperatureDataStorage(
+            self.storage, spool=IngestionSpool.from_config(server_config.get('spool'), 'collector')
+        )
+        self.alert_engine = AlertEngine.from_config(server_config.get('alerts'))
+        self.ingestion = IngestionFilter.from_config(server_config.get('ingestion'))
+        # 连接后从设备存储中回填断线期间的读数
+        self.history_backfills = [
+            HistoryBackfill.attach(connector, self.storage, server_config.get('history'))
+            for connector in self.connectors
+        ]
+        # collector 模式下把本机数据库的新读数推送到汇聚端
+        self.federation = FederationSyncClient.from_config(server_config.get('federation'), self.storage)
         self.data_count = 0
         self.is_running = False
         
@@ -40,20 +65,29 @@ class TemperatureDataCollector:
         logger.info("🌡️ 启动DLUT宿舍温度数据采集服务")
         logger.info("=" * 60)
         
-        # 设置数据回调
-        def on_data_received(data: TemperatureData):
+        # 设置数据回调（协程，由连接器作为任务调度，不阻塞蓝牙通知）
+        async def on_data_received(data: TemperatureData):
             self.data_count += 1
             logger.info(f"📊 [{self.data_count}] {data}")
             
-            # 保存到数据库
-            self.storage.save_data(data)
+            # 评估告警规则（告警需要看到每一条读数）
+            self.alert_engine.process(data)
+
+            # 保存到数据库（先写入落盘缓冲区，由写线程写入数据库），数值无变化的重复通知不保存
+            if self.ingestion.accept(data):
+                await self.async_storage.save_data(data)
             
             # 每10条数据显示一次统计
             if self.data_count % 10 == 0:
-                self.show_statistics()
+                await self.show_statistics()
         
-        self.connector.set_data_callback(on_data_received)
+        for connector in self.connectors:
+            connector.set_data_callback(on_data_received)
         self.is_running = True
+        if self.federation:
+            self.federation.start()
+        # 升级前写入的读数在后台分块回填舒适度指标
+        threading.Thread(target=self.storage.backfill_comfort_metrics, name='comfort-backfill', daemon=True).start()
         
         try:
             logger.info("🔍 开始持续扫描和连接温度计设备...")
@@ -63,7 +97,9 @@ class TemperatureDataCollector:
             logger.info("-" * 60)
             
             # 开始持续扫描和连接
-            await self.connector.start_continuous_scanning()
+            if len(self.connectors) > 1:
+                logger.info(f"📡 采集 {len(self.connectors)} 个指定设备")
+            await asyncio.gather(*(connector.start_continuous_scanning() for connector in self.connectors))
             
         except KeyboardInterrupt:
             logger.info("\n⏹️ 用户停止数据采集")
@@ -75,15 +111,19 @@ class TemperatureDataCollector:
     def stop(self):
         """停止数据采集服务"""
         self.is_running = False
-        if self.connector:
-            self.connector.stop_scanning()
+        for connector in self.connectors:
+            connector.stop_scanning()
+        # 写完队列中尚未落盘的数据
+        self.async_storage.close(timeout=10)
+        if self.federation:
+            self.federation.stop(timeout=5)
         logger.info("🔌 数据采集服务已停止")
         self.show_final_statistics()
     
-    def show_statistics(self):
+    async def show_statistics(self):
         """显示统计信息"""
         try:
-            recent_data = self.storage.get_latest_data(10)
+            recent_data = await self.async_storage.get_latest_data(10)
             if recent_data:
                 temps = [d['temperature'] for d in recent_data]
                 humids = [d['humidity'] for d in recent_data]
@@ -91,6 +131,14 @@ class TemperatureDataCollector:
                 logger.info("📈 最近10条数据统计:")
                 logger.info(f"   温度: 最低 {min(temps):.1f}°C, 最高 {max(temps):.1f}°C, 平均 {sum(temps)/len(temps):.1f}°C")
                 logger.info(f"   湿度: 最低 {min(humids):.1f}%, 最高 {max(humids):.1f}%, 平均 {sum(humids)/len(humids):.1f}%")
+                ingestion = self.ingestion.stats()
+                logger.info(f"   入库: 已保存 {ingestion['stored']} 条, 已过滤 {ingestion['dropped']} 条")
+                placer = self.connector.placer
+                if placer and len(placer.adapters) > 1:
+                    adapters = ', '.join(f"{name} {stats['connections']}/{stats['capacity']}"
+                                         + ('' if stats['available'] else ' (暂停)')
+                                         for name, stats in placer.stats().items())
+                    logger.info(f"   蓝牙适配器: {adapters}")
                 logger.info("-" * 40)
         except Exception as e:
             logger.error(f"统计信息显示失败: {e}")
@@ -99,6 +147,8 @@ class TemperatureDataCollector:
         """显示最终统计信息"""
         logger.info("📊 采集会话统计:")
         logger.info(f"   总数据点数: {self.data_count}")
+        ingestion = self.ingestion.stats()
+        logger.info(f"   已保存: {ingestion['stored']}, 已过滤: {ingestion['dropped']}")
         
         try:
             latest = self.storage.get_latest_data(1)
@@ -116,6 +166,8 @@ class TemperatureDataCollector:
 
 def check_dependencies():
     """检查依赖包"""
+    if server_config.get('ble', {}).get('backend') == 'simulated':
+        return True
     try:
         import bleak
         return True
@@ -124,7 +176,14 @@ def check_dependencies():
         print("🔧 请运行: pip install bleak")
         return False
 
-async def main():
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='DLUT宿舍温度数据采集服务')
+    parser.add_argument('--profile', action='store_true',
+                        help='启用性能分析（调用栈采样与阶段计时，结果写入 server.profiling.output_dir）')
+    return parser.parse_args()
+
+async def main(args):
     """主函数"""
     print("🌡️ DLUT宿舍温度数据采集服务")
     print("=" * 50)
@@ -150,6 +209,10 @@ async def main():
     print("   python start_web_display.py")
     print()
     
+    if args.profile:
+        from profiler import instrument_collector
+        instrument_collector(server_config.get('profiling'), name='collector')
+
     try:
         collector = TemperatureDataCollector()
         await collector.start()
@@ -157,4 +220,4 @@ async def main():
         logger.error(f"程序异常: {e}", exc_info=True)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
@@ -6,6 +6,7 @@ DLUT宿舍实时温度数据展示Web服务
 """
 
 import sys
+import argparse
 import logging
 import webbrowser
 import time
@@ -52,8 +53,16 @@ def check_dependencies():
     
     return True
 
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='DLUT宿舍实时温度数据展示Web服务')
+    parser.add_argument('--profile', action='store_true',
+                        help='启用性能分析（调用栈采样与阶段计时，结果写入 server.profiling.output_dir）')
+    return parser.parse_args()
+
 def main():
     """主函数"""
+    args = parse_args()
     print("📊 DLUT宿舍实时温度数据展示")
     print("=" * 50)
     print("大连理工大学宿舍环境数据查看平台")
@@ -71,6 +80,11 @@ def main():
     try:
         # 导入Web应用（不启动监控服务）
         from web_app import app, socketio
+
+        if args.profile:
+            from profiler import instrument_web
+            from temperature_sensor_connector import server_config
+            instrument_web(app, socketio, server_config.get('profiling'), name='web')
         
         # 延迟打开浏览器
         browser_thread = threading.Thread(target=open_browser, daemon=True)
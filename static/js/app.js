@@ -24,8 +24,18 @@ class TemperatureMonitor {
         this.chart = null;
         this.lastTemperature = null;
         this.lastHumidity = null;
-        this.historyData = [];
+        // 已解析的图表数据（{x: 毫秒时间戳, y: 数值}，按时间升序）
+        this.series = { temperature: [], humidity: [] };
+        // 数据缺口（{start, end} 毫秒时间戳），在图表上以阴影标出
+        this.gaps = [];
+        this.chartUpdatePending = false;
         this.currentTimeRange = 24; // 默认24小时
+        this.selectedDevice = null; // 当前查看的设备地址，null表示全部设备
+        // 图表模式：trend（原始数据趋势）、heatmap（星期×小时热力图）、compare（周对比），后两者读取服务端聚合数据
+        this.chartMode = 'trend';
+        this.chartMetric = 'temperature';
+        this.profileData = null; // 最近一次加载的热力图/周对比数据，语言切换时直接重新渲染
+        this.comparisonChart = null;
 
         // 等待i18n初始化完成后再初始化组件
         this.waitForI18n().then(() => {
@@ -109,14 +119,15 @@ class TemperatureMonitor {
             this.refreshAllStatusLabels();
 
             // 重新请求数据以更新状态标签
-            this.socket.emit('request_latest');
+            this.socket.emit('request_latest', { device: this.selectedDevice });
 
             // 重新加载当前时间范围的历史数据
-            const activeButton = document.querySelector('.btn-group .btn.active');
+            const activeButton = document.querySelector('#time-range-buttons .btn.active');
             if (activeButton) {
                 const timeRange = this.getTimeRangeFromButton(activeButton);
                 this.loadHistory(timeRange);
             }
+            this.renderProfileView();
         });
     }
 
@@ -186,7 +197,11 @@ class TemperatureMonitor {
         this.socket.on('connect', () => {
             console.log(window.i18n.t('console.websocket_connected'));
             this.updateConnectionStatus(true);
-            this.socket.emit('request_latest');
+            // 重新连接后恢复设备订阅
+            if (this.selectedDevice) {
+                this.socket.emit('subscribe', { devices: [this.selectedDevice] });
+            }
+            this.socket.emit('request_latest', { device: this.selectedDevice });
         });
 
         this.socket.on('disconnect', (reason) => {
@@ -197,7 +212,7 @@ class TemperatureMonitor {
         // 添加重连事件监听
         this.socket.on('reconnect', (attemptNumber) => {
             console.log(`🔄 Reconnected after ${attemptNumber} attempts`);
-            this.socket.emit('request_latest');
+            this.socket.emit('request_latest', { device: this.selectedDevice });
             this.updateConnectionStatus(true);
         });
 
@@ -216,7 +231,12 @@ class TemperatureMonitor {
 
         this.socket.on('temperature_update', (data) => {
             console.log(window.i18n.t('console.received_data'), data);
+            this.updateDeviceTile(data);
+            if (this.selectedDevice && data.device_address !== this.selectedDevice) {
+                return;
+            }
             this.updateTemperatureData(data);
+            this.appendLivePoint(data);
         });
 
         this.socket.on('status', (status) => {
@@ -224,6 +244,18 @@ class TemperatureMonitor {
             this.updateSystemStatus(status);
         });
 
+        this.socket.on('alert', (alert) => {
+            console.log(window.i18n.t('console.alert_received'), alert);
+            showNotification(alert.message, alert.state === 'firing' ? 'warning' : 'success');
+        });
+
+        // 设备重连后回填了断线期间的读数，重新加载历史数据
+        this.socket.on('history_backfilled', (data) => {
+            console.log(window.i18n.t('console.history_backfilled', { count: data.count }), data.device_address);
+            window.historyCache.invalidate().then(() => this.loadHistory(this.currentTimeRange));
+            this.loadProfileView();
+        });
+
         this.socket.on('online_users_update', (data) => {
             console.log(window.i18n.t('console.online_users_update'), data);
             this.updateOnlineUsers(data.online_users);
@@ -256,8 +288,33 @@ class TemperatureMonitor {
             return label.includes('chart.axes') ? '时间' : label;
         };
 
+        // 数据缺口标记插件：在数据集绘制之前为每个缺口绘制阴影区域
+        const gapMarkerPlugin = {
+            id: 'gapMarkers',
+            beforeDatasetsDraw: (chart) => {
+                if (this.gaps.length === 0) return;
+                const area = chart.chartArea;
+                const xScale = chart.scales.x;
+                const context = chart.ctx;
+
+                context.save();
+                context.fillStyle = 'rgba(108, 117, 125, 0.12)';
+                context.strokeStyle = 'rgba(108, 117, 125, 0.5)';
+                context.setLineDash([4, 4]);
+                this.gaps.forEach(gap => {
+                    const left = Math.max(area.left, xScale.getPixelForValue(gap.start));
+                    const right = Math.min(area.right, xScale.getPixelForValue(gap.end));
+                    if (right <= left) return;
+                    context.fillRect(left, area.top, right - left, area.bottom - area.top);
+                    context.strokeRect(left, area.top, right - left, area.bottom - area.top);
+                });
+                context.restore();
+            }
+        };
+
         this.chart = new Chart(ctx, {
             type: 'line',
+            plugins: [gapMarkerPlugin],
             data: {
                 labels: [],
                 datasets: [{
@@ -299,6 +356,9 @@ class TemperatureMonitor {
             options: {
                 responsive: true,
                 maintainAspectRatio: false,
+                // 数据已预解析为 {x, y} 数值点，跳过Chart.js的解析步骤（LTTB抽稀插件的前提）
+                parsing: false,
+                normalized: true,
                 interaction: {
                     mode: 'index',
                     intersect: false,
@@ -311,6 +371,7 @@ class TemperatureMonitor {
                 },
                 scales: {
                     x: {
+                        type: 'linear',
                         display: true,
                         title: {
                             display: true,
@@ -330,7 +391,8 @@ class TemperatureMonitor {
                             font: {
                                 size: 11
                             },
-                            maxTicksLimit: 8
+                            maxTicksLimit: 8,
+                            callback: (value) => this.formatTimeTick(value)
                         }
                     },
                     y: {
@@ -385,6 +447,11 @@ class TemperatureMonitor {
                     }
                 },
                 plugins: {
+                    decimation: {
+                        enabled: true,
+                        algorithm: 'lttb',
+                        samples: 500
+                    },
                     legend: {
                         display: true,
                         position: 'top',
@@ -413,8 +480,8 @@ class TemperatureMonitor {
                         mode: 'index',
                         intersect: false,
                         callbacks: {
-                            title: function(context) {
-                                return window.i18n.t('chart.tooltip.time') + ': ' + context[0].label;
+                            title: (context) => {
+                                return window.i18n.t('chart.tooltip.time') + ': ' + this.formatTimeTick(context[0].parsed.x, true);
                             },
                             label: function(context) {
                                 let label = context.dataset.label || '';
@@ -711,21 +778,43 @@ class TemperatureMonitor {
         }
     }
 
+    // 当前设备的查询参数
+    deviceQuery() {
+        return this.selectedDevice ? `&device=${encodeURIComponent(this.selectedDevice)}` : '';
+    }
+
+    // 加载最新数据
+    async loadLatest() {
+        const url = this.selectedDevice
+            ? `/api/devices/${encodeURIComponent(this.selectedDevice)}/latest`
+            : '/api/latest';
+        const response = await fetch(url);
+        if (response.ok) {
+            const data = await response.json();
+            if (!data.error) {
+                this.updateTemperatureData(data);
+            }
+        }
+    }
+
     // 加载初始数据
     async loadInitialData() {
         try {
+            // 清理过期的历史数据缓存（不阻塞加载）
+            window.historyCache.prune();
+
             // 加载最新数据
-            const response = await fetch('/api/latest');
-            if (response.ok) {
-                const data = await response.json();
-                if (!data.error) {
-                    this.updateTemperatureData(data);
-                }
-            }
+            await this.loadLatest();
 
             // 默认加载24小时历史数据，如果数据不足24小时则显示所有数据
             await this.loadHistory(24);
 
+            // 加载设备列表，并定期刷新未订阅设备的读数
+            await this.loadDevices();
+            setInterval(() => this.loadDevices(), 60000);
+            // 聚合数据变化缓慢，热力图/周对比模式下每5分钟刷新一次
+            setInterval(() => this.loadProfileView(), 300000);
+
             // 加载系统状态
             const statusResponse = await fetch('/api/status');
             if (statusResponse.ok) {
@@ -738,21 +827,51 @@ class TemperatureMonitor {
     }
 
     // 加载历史数据
+    // 已缓存的部分从IndexedDB读取，只向服务端请求缓存高水位之后的新数据
     async loadHistory(hours) {
         try {
-            const response = await fetch(`/api/history?hours=${hours}`);
+            const from = Date.now() - hours * 3600000;
+            const cacheKey = this.selectedDevice || '*';
+            let cached = await window.historyCache.load(cacheKey, from);
+
+            const historyUrl = `/api/history?hours=${hours}${this.deviceQuery()}`;
+            let [response, coverageResponse] = await Promise.all([
+                fetch(cached ? `${historyUrl}&since=${encodeURIComponent(cached.meta.hwm)}` : historyUrl),
+                fetch(`/api/coverage?hours=${hours}${this.deviceQuery()}`)
+            ]);
+
+            // 服务端回填过历史记录后，缓存中可能缺少早于高水位的数据，重新完整加载
+            const revision = response.headers.get('X-Backfill-Revision');
+            if (cached && response.ok && revision !== cached.meta.revision) {
+                cached = null;
+                response = await fetch(historyUrl);
+            }
+
             if (response.ok) {
-                const data = await response.json();
-                this.historyData = data; // 保存历史数据
-                this.currentTimeRange = hours; // 保存当前时间范围
-                this.updateChart(data);
-                this.updateStatistics(data);
+                // API按时间倒序返回，转为升序
+                const fresh = (await response.json()).reverse();
+                let rows;
+                if (cached) {
+                    // since 为闭区间，去掉与高水位重复的数据
+                    const newRows = fresh.filter(row => Date.parse(row.timestamp) > cached.meta.hwmX);
+                    rows = cached.rows.concat(newRows);
+                    window.historyCache.append(cacheKey, newRows);
+                    console.log(window.i18n.t('console.history_cache_hit', { cached: cached.rows.length, fresh: newRows.length }));
+                } else {
+                    rows = fresh;
+                    window.historyCache.replace(cacheKey, rows, from, revision);
+                }
 
-                // 更新按钮状态
-                document.querySelectorAll('.btn-group .btn').forEach(btn => {
-                    btn.classList.remove('active');
-                });
-                if (event && event.target) {
+                this.currentTimeRange = hours; // 保存当前时间范围
+                this.setGaps(coverageResponse.ok ? await coverageResponse.json() : null);
+                this.setHistory(rows, true);
+                this.updateStatistics();
+
+                // 更新按钮状态（仅在由时间范围按钮触发时）
+                if (event && event.target && event.target.closest('#time-range-buttons')) {
+                    document.querySelectorAll('#time-range-buttons .btn').forEach(btn => {
+                        btn.classList.remove('active');
+                    });
                     event.target.classList.add('active');
                 }
             }
@@ -761,108 +880,226 @@ class TemperatureMonitor {
         }
     }
 
-    // 更新图表
-    updateChart(data) {
-        const isMobile = window.innerWidth <= 768;
-        let groupedData;
+    // 将API返回的数据（默认按时间倒序）一次性解析为数值型坐标点，避免渲染时重复创建Date对象和标签字符串
+    setHistory(rows, ascending = false) {
+        const n = rows.length;
+        const temperatures = new Array(n);
+        const humidities = new Array(n);
+
+        for (let i = 0; i < n; i++) {
+            const row = ascending ? rows[i] : rows[n - 1 - i];
+            const x = Date.parse(row.timestamp);
+            temperatures[i] = { x: x, y: row.temperature };
+            humidities[i] = { x: x, y: row.humidity };
+        }
 
-        // 一小时数据特殊处理
-        if (this.currentTimeRange === 1) {
-            if (isMobile) {
-                // 移动端：5分钟间隔采样（一小时12个点）
-                console.log('移动端一小时数据：使用5分钟间隔采样');
-                groupedData = this.groupDataByTimeInterval(data.reverse(), 5);
-            } else {
-                // PC端：显示全部数据点
-                console.log('PC端一小时数据：显示全部数据点，不进行采样');
-                groupedData = data.reverse().map(item => ({
-                    temperature: parseFloat(item.temperature.toFixed(1)),
-                    humidity: parseFloat(item.humidity.toFixed(1)),
-                    timestamp: new Date(item.timestamp)
-                }));
+        this.series.temperature = temperatures;
+        this.series.humidity = humidities;
+        this.updateChart();
+    }
+
+    // 加载设备列表
+    async loadDevices() {
+        try {
+            const response = await fetch('/api/devices');
+            if (response.ok) {
+                this.renderDeviceGrid(await response.json());
             }
-        } else if (isMobile) {
-            // 其他时间范围：小型设备使用智能采样算法
-            groupedData = this.smartSampleForMobile(data.reverse());
-        } else {
-            // 其他时间范围：PC大屏按十分钟间隔对数据进行分组和平均
-            groupedData = this.groupDataByTimeInterval(data.reverse(), 10);
+        } catch (error) {
+            console.error(window.i18n.t('console.load_devices_failed'), error);
         }
+    }
 
-        const labels = [];
-        const temperatures = [];
-        const humidities = [];
+    // 渲染设备网格，只有一个设备时隐藏
+    renderDeviceGrid(devices) {
+        const card = document.getElementById('device-grid-card');
+        const grid = document.getElementById('device-grid');
+        if (!card || !grid) return;
+
+        card.classList.toggle('d-none', devices.length <= 1);
+        grid.innerHTML = '';
+
+        devices.forEach(device => {
+            const col = document.createElement('div');
+            col.className = 'col-6 col-md-4 col-lg-3';
+            col.innerHTML = `
+                <div class="device-tile">
+                    <div class="device-tile-name"><i class="bi bi-broadcast"></i> <span></span></div>
+                    <div class="device-tile-values">
+                        <span class="device-tile-temperature">--°C</span>
+                        <span class="device-tile-humidity">--%</span>
+                    </div>
+                    <div class="device-tile-time"></div>
+                </div>
+            `;
+            const tile = col.querySelector('.device-tile');
+            tile.dataset.address = device.device_address;
+            tile.classList.toggle('active', device.device_address === this.selectedDevice);
+            tile.querySelector('.device-tile-name span').textContent = device.device_name || device.device_address;
+            tile.addEventListener('click', () => this.selectDevice(device.device_address));
+            grid.appendChild(col);
+
+            this.updateDeviceTile(Object.assign({ device_address: device.device_address }, device.latest));
+        });
+    }
 
-        groupedData.forEach(item => {
-            const date = new Date(item.timestamp);
-            let timeLabel;
+    // 更新设备网格中对应设备的读数
+    updateDeviceTile(data) {
+        if (!data.device_address || typeof data.temperature !== 'number') return;
+        const tile = Array.from(document.querySelectorAll('.device-tile'))
+            .find(element => element.dataset.address === data.device_address);
+        if (!tile) return;
+
+        tile.querySelector('.device-tile-temperature').textContent = `${data.temperature.toFixed(1)}°C`;
+        tile.querySelector('.device-tile-humidity').textContent = `${data.humidity.toFixed(1)}%`;
+        if (data.timestamp) {
+            tile.querySelector('.device-tile-time').textContent = new Date(data.timestamp).toLocaleString();
+        }
+    }
 
-            if (isMobile) {
-                // 移动端显示简化的时间格式
-                timeLabel = date.toLocaleTimeString('zh-CN', {
-                    hour: '2-digit',
-                    minute: '2-digit'
-                });
-            } else {
-                // 桌面端显示完整时间
-                timeLabel = date.toLocaleTimeString('zh-CN', {
-                    hour: '2-digit',
-                    minute: '2-digit',
-                    second: '2-digit'
+    // 切换查看的设备，只订阅该设备的实时数据；address为null时查看全部设备
+    selectDevice(address) {
+        this.selectedDevice = address;
+        this.socket.emit('subscribe', { devices: address ? [address] : [] });
+
+        document.querySelectorAll('.device-tile').forEach(tile => {
+            tile.classList.toggle('active', tile.dataset.address === address);
+        });
+        const allButton = document.getElementById('device-all-button');
+        if (allButton) {
+            allButton.classList.toggle('active', !address);
+        }
+
+        // 切换设备后趋势从头计算
+        this.lastTemperature = null;
+        this.lastHumidity = null;
+        this.loadLatest();
+        this.loadHistory(this.currentTimeRange);
+        this.loadProfileView();
+    }
+
+    // 解析 /api/coverage 返回的缺口区间
+    setGaps(coverage) {
+        const gaps = [];
+        if (coverage && coverage.devices) {
+            coverage.devices.forEach(device => {
+                device.gaps.forEach(gap => {
+                    gaps.push({ start: Date.parse(gap.start), end: Date.parse(gap.end) });
                 });
-            }
+            });
+        }
+        this.gaps = gaps;
+    }
+
+    // 追加实时数据点，并原地裁剪超出当前时间范围的旧数据
+    appendLivePoint(data) {
+        const x = data.timestamp ? Date.parse(data.timestamp) : Date.now();
+        const temperatures = this.series.temperature;
+        const humidities = this.series.humidity;
 
-            labels.push(timeLabel);
-            temperatures.push(item.temperature);
-            humidities.push(item.humidity);
+        // 忽略乱序或重复的数据点
+        if (temperatures.length > 0 && x <= temperatures[temperatures.length - 1].x) {
+            return;
+        }
+
+        temperatures.push({ x: x, y: data.temperature });
+        humidities.push({ x: x, y: data.humidity });
+
+        const cutoff = x - this.currentTimeRange * 3600 * 1000;
+        let expired = 0;
+        while (expired < temperatures.length && temperatures[expired].x < cutoff) {
+            expired++;
+        }
+        if (expired > 0) {
+            temperatures.splice(0, expired);
+            humidities.splice(0, expired);
+        }
+
+        this.updateStatistics();
+        this.scheduleChartUpdate();
+    }
+
+    // 合并同一帧内的多次刷新请求
+    scheduleChartUpdate() {
+        if (this.chartUpdatePending) return;
+        this.chartUpdatePending = true;
+        window.requestAnimationFrame(() => {
+            this.chartUpdatePending = false;
+            this.updateChart();
         });
+    }
 
-        this.chart.data.labels = labels;
+    // 更新图表
+    updateChart() {
+        const isMobile = window.innerWidth <= 768;
+        const temperatures = this.series.temperature;
+        const pointCount = temperatures.length;
+
+        // 数据集引用本身保持不变，重新赋值只会让抽稀插件重新读取原始数据
         this.chart.data.datasets[0].data = temperatures;
-        this.chart.data.datasets[1].data = humidities;
+        this.chart.data.datasets[1].data = this.series.humidity;
+
+        // 根据绘图区宽度确定LTTB抽稀的目标点数：移动端每6像素一个点，PC端每3像素一个点
+        const chartWidth = this.chart.chartArea ? this.chart.chartArea.right - this.chart.chartArea.left : this.chart.width;
+        const samples = Math.max(12, Math.round(chartWidth / (isMobile ? 6 : 3)));
+        this.chart.options.plugins.decimation.samples = samples;
+        const renderedPoints = Math.min(pointCount, samples);
+
+        if (pointCount > samples) {
+            console.log(window.i18n.t('console.chart_decimation', {
+                original: pointCount,
+                target: samples
+            }));
+        }
 
         // 根据设备类型调整曲线平滑度和点的显示
         this.chart.data.datasets.forEach(dataset => {
             if (isMobile) {
                 // 移动设备：更高的平滑度，更小的点，更细的线条
                 dataset.tension = 0.6;
-                dataset.pointRadius = 2;
+                dataset.pointRadius = renderedPoints > 60 ? 0 : 2;
                 dataset.pointHoverRadius = 4;
                 dataset.borderWidth = 2;
             } else {
-                // PC设备：标准设置
+                // PC设备：标准设置，点过密时隐藏数据点以减少绘制开销
                 dataset.tension = 0.4;
-                dataset.pointRadius = 4;
+                dataset.pointRadius = renderedPoints > 150 ? 0 : 4;
                 dataset.pointHoverRadius = 6;
                 dataset.borderWidth = 3;
             }
         });
 
+        // 固定X轴为当前时间范围，实时数据追加时坐标轴随之滚动
+        const xScale = this.chart.options.scales.x;
+        const latest = pointCount > 0 ? temperatures[pointCount - 1].x : Date.now();
+        xScale.max = Math.max(latest, Date.now());
+        xScale.min = xScale.max - this.currentTimeRange * 3600 * 1000;
+
         // 根据屏幕大小调整图表配置
         if (isMobile) {
             // 移动设备优化配置
-            this.chart.options.scales.x.ticks.maxTicksLimit = Math.min(6, Math.max(3, Math.floor(labels.length / 4)));
+            xScale.ticks.maxTicksLimit = Math.min(6, Math.max(3, Math.floor(renderedPoints / 4)));
             this.chart.options.plugins.legend.labels.padding = 15;
             this.chart.options.plugins.legend.labels.font.size = 12;
 
             // 优化移动设备上的网格线显示
-            this.chart.options.scales.x.grid.display = false; // 隐藏垂直网格线
+            xScale.grid.display = false; // 隐藏垂直网格线
             this.chart.options.scales.y.grid.lineWidth = 0.5; // 更细的水平网格线
             this.chart.options.scales.y1.grid.display = false; // 隐藏右侧网格线
         } else {
             // PC设备标准配置
-            this.chart.options.scales.x.ticks.maxTicksLimit = 8;
+            xScale.ticks.maxTicksLimit = 8;
             this.chart.options.plugins.legend.labels.padding = 20;
             this.chart.options.plugins.legend.labels.font.size = 13;
 
             // 恢复PC设备的网格线显示
-            this.chart.options.scales.x.grid.display = true;
+            xScale.grid.display = true;
             this.chart.options.scales.y.grid.lineWidth = 1;
             this.chart.options.scales.y1.grid.display = false;
         }
 
         // 添加00:00时刻的竖虚线分割
-        this.addMidnightLines(groupedData);
+        this.addMidnightLines(xScale.min, xScale.max);
 
         // 确保图表标签正确显示（防止被数据更新覆盖）
         this.chart.data.datasets[0].label = window.i18n.t('chart.axes.temperature');
@@ -871,221 +1108,75 @@ class TemperatureMonitor {
         this.chart.update('none'); // 使用 'none' 模式提高性能
     }
 
-    // 添加00:00时刻的竖虚线分割
-    addMidnightLines(data) {
-        if (!data || data.length === 0) return;
+    // 格式化X轴时间刻度：一天以内只显示时分，更长范围附带日期
+    formatTimeTick(value, withSeconds = false) {
+        const date = new Date(value);
+        const options = { hour: '2-digit', minute: '2-digit' };
+        if (withSeconds) {
+            options.second = '2-digit';
+        }
+        const time = date.toLocaleTimeString('zh-CN', options);
+        if (this.currentTimeRange > 24 || withSeconds) {
+            return `${date.getMonth() + 1}/${date.getDate()} ${time}`;
+        }
+        return time;
+    }
 
+    // 添加00:00时刻的竖虚线分割，直接按时间范围计算，无需遍历数据
+    addMidnightLines(minTime, maxTime) {
         const annotations = {};
-        const processedDates = new Set();
-
-        data.forEach((item, index) => {
-            const date = new Date(item.timestamp);
-            const dateKey = date.toDateString();
-
-            // 检查是否是00:00时刻（允许一些误差，比如00:00-00:10之间）
-            if (date.getHours() === 0 && date.getMinutes() <= 10 && !processedDates.has(dateKey)) {
-                processedDates.add(dateKey);
-
-                const annotationId = `midnight-${dateKey}`;
-                annotations[annotationId] = {
-                    type: 'line',
-                    xMin: index,
-                    xMax: index,
-                    borderColor: 'rgba(128, 128, 128, 0.6)',
-                    borderWidth: 2,
-                    borderDash: [5, 5],
-                    label: {
-                        content: '00:00',
-                        enabled: true,
-                        position: 'top',
-                        backgroundColor: 'rgba(128, 128, 128, 0.8)',
-                        color: 'white',
-                        font: {
-                            size: 10
-                        }
+        const midnight = new Date(minTime);
+        midnight.setHours(24, 0, 0, 0);
+
+        while (midnight.getTime() <= maxTime) {
+            const annotationId = `midnight-${midnight.toDateString()}`;
+            annotations[annotationId] = {
+                type: 'line',
+                xMin: midnight.getTime(),
+                xMax: midnight.getTime(),
+                borderColor: 'rgba(128, 128, 128, 0.6)',
+                borderWidth: 2,
+                borderDash: [5, 5],
+                label: {
+                    content: '00:00',
+                    enabled: true,
+                    position: 'top',
+                    backgroundColor: 'rgba(128, 128, 128, 0.8)',
+                    color: 'white',
+                    font: {
+                        size: 10
                     }
-                };
-            }
-        });
+                }
+            };
+            midnight.setDate(midnight.getDate() + 1);
+        }
 
         // 更新图表的注释配置
         this.chart.options.plugins.annotation.annotations = annotations;
     }
 
-    // 小型设备智能采样算法
-    smartSampleForMobile(data) {
-        if (!data || data.length === 0) return [];
-
-        // 计算时间范围（小时）
-        const sortedData = data.sort((a, b) => new Date(a.timestamp) - new Date(b.timestamp));
-        const startTime = new Date(sortedData[0].timestamp);
-        const endTime = new Date(sortedData[sortedData.length - 1].timestamp);
-        const timeRangeHours = (endTime - startTime) / (1000 * 60 * 60);
-
-        // 根据屏幕宽度计算合适的点数
-        const screenWidth = window.innerWidth;
-        let targetPoints;
-
-        if (screenWidth <= 480) {
-            // 小屏手机：每小时1-2个点
-            targetPoints = Math.max(Math.ceil(timeRangeHours * 1.5), 12);
-        } else if (screenWidth <= 768) {
-            // 大屏手机/小平板：每小时2-3个点
-            targetPoints = Math.max(Math.ceil(timeRangeHours * 2.5), 18);
-        } else {
-            // 平板：每小时3-4个点
-            targetPoints = Math.max(Math.ceil(timeRangeHours * 3.5), 24);
-        }
-
-        // 确保每两小时不少于3个点
-        const minPointsFor2Hours = Math.ceil(timeRangeHours / 2) * 3;
-        targetPoints = Math.max(targetPoints, minPointsFor2Hours);
-
-        // 调试信息
-        console.log(window.i18n.t('console.chart_optimization', {
-            width: screenWidth,
-            hours: timeRangeHours.toFixed(1),
-            original: sortedData.length,
-            target: targetPoints
-        }));
-
-        // 如果原始数据点数少于目标点数，直接返回所有数据
-        if (sortedData.length <= targetPoints) {
-            console.log(window.i18n.t('console.data_insufficient', {
-                actual: sortedData.length,
-                target: targetPoints
-            }));
-            return sortedData.map(item => ({
-                temperature: parseFloat(item.temperature.toFixed(1)),
-                humidity: parseFloat(item.humidity.toFixed(1)),
-                timestamp: new Date(item.timestamp)
-            }));
-        }
-
-        // 使用均匀采样算法
-        const sampledData = this.uniformSample(sortedData, targetPoints);
-        console.log(window.i18n.t('console.sampling_complete', {
-            original: sortedData.length,
-            sampled: sampledData.length
-        }));
-        return sampledData;
-    }
-
-    // 均匀采样算法
-    uniformSample(data, targetPoints) {
-        const result = [];
-        const step = (data.length - 1) / (targetPoints - 1);
-
-        for (let i = 0; i < targetPoints; i++) {
-            const index = Math.round(i * step);
-            const actualIndex = Math.min(index, data.length - 1);
-
-            // 智能采样：根据数据密度调整采样窗口
-            let item;
-            if (i === 0 || i === targetPoints - 1) {
-                // 保留首尾点的原始值
-                item = data[actualIndex];
-            } else {
-                // 中间点使用自适应窗口进行平滑
-                const windowSize = Math.max(1, Math.floor(data.length / targetPoints / 2));
-                const startIdx = Math.max(0, actualIndex - windowSize);
-                const endIdx = Math.min(data.length - 1, actualIndex + windowSize);
-                const samples = data.slice(startIdx, endIdx + 1);
-
-                // 使用加权平均，中心点权重更高
-                let totalWeight = 0;
-                let weightedTemp = 0;
-                let weightedHumidity = 0;
-
-                samples.forEach((sample, idx) => {
-                    const centerIdx = Math.floor(samples.length / 2);
-                    const distance = Math.abs(idx - centerIdx);
-                    const weight = Math.max(0.1, 1 - distance * 0.3); // 距离越远权重越小
-
-                    weightedTemp += sample.temperature * weight;
-                    weightedHumidity += sample.humidity * weight;
-                    totalWeight += weight;
-                });
-
-                item = {
-                    temperature: weightedTemp / totalWeight,
-                    humidity: weightedHumidity / totalWeight,
-                    timestamp: data[actualIndex].timestamp
-                };
-            }
-
-            result.push({
-                temperature: parseFloat(item.temperature.toFixed(1)),
-                humidity: parseFloat(item.humidity.toFixed(1)),
-                timestamp: new Date(item.timestamp)
-            });
+    // 更新统计信息（单次遍历，避免对大数组使用展开运算符）
+    updateStatistics() {
+        const temperatures = this.series.temperature;
+        const humidities = this.series.humidity;
+        const count = temperatures.length;
+        if (count === 0) return;
+
+        let minTemp = Infinity;
+        let maxTemp = -Infinity;
+        let humiditySum = 0;
+        for (let i = 0; i < count; i++) {
+            const temperature = temperatures[i].y;
+            if (temperature < minTemp) minTemp = temperature;
+            if (temperature > maxTemp) maxTemp = temperature;
+            humiditySum += humidities[i].y;
         }
-
-        return result;
-    }
-
-    // 按时间间隔分组数据并计算平均值
-    groupDataByTimeInterval(data, intervalMinutes) {
-        if (!data || data.length === 0) return [];
-        
-        // 按照时间间隔对数据进行分组
-        const groupedData = {};
-        
-        data.forEach(item => {
-            const date = new Date(item.timestamp);
-            // 计算时间间隔组的标识符（年-月-日-小时-十分钟区间）
-            const minutes = date.getMinutes();
-            const intervalGroup = Math.floor(minutes / intervalMinutes);
-            const timeKey = `${date.getFullYear()}-${date.getMonth()}-${date.getDate()}-${date.getHours()}-${intervalGroup}`;
-            
-            if (!groupedData[timeKey]) {
-                groupedData[timeKey] = {
-                    temperatures: [],
-                    humidities: [],
-                    timestamps: []
-                };
-            }
-            
-            groupedData[timeKey].temperatures.push(item.temperature);
-            groupedData[timeKey].humidities.push(item.humidity);
-            groupedData[timeKey].timestamps.push(new Date(item.timestamp).getTime());
-        });
-        
-        // 计算每个组的平均值
-        const result = [];
-        Object.keys(groupedData).forEach(key => {
-            const group = groupedData[key];
-            const avgTemperature = group.temperatures.reduce((a, b) => a + b, 0) / group.temperatures.length;
-            const avgHumidity = group.humidities.reduce((a, b) => a + b, 0) / group.humidities.length;
-            // 使用组内的平均时间戳
-            const avgTimestamp = new Date(group.timestamps.reduce((a, b) => a + b, 0) / group.timestamps.length);
-            
-            result.push({
-                temperature: parseFloat(avgTemperature.toFixed(1)),
-                humidity: parseFloat(avgHumidity.toFixed(1)),
-                timestamp: avgTimestamp
-            });
-        });
-        
-        // 按时间升序排序
-        return result.sort((a, b) => new Date(a.timestamp) - new Date(b.timestamp));
-    }
-
-    // 更新统计信息
-    updateStatistics(data) {
-        if (data.length === 0) return;
-
-        const temperatures = data.map(item => item.temperature);
-        const humidities = data.map(item => item.humidity);
-
-        const minTemp = Math.min(...temperatures);
-        const maxTemp = Math.max(...temperatures);
-        const avgHumidity = humidities.reduce((a, b) => a + b, 0) / humidities.length;
+        const avgHumidity = humiditySum / count;
 
         const minTempText = `${minTemp.toFixed(1)}°C`;
         const maxTempText = `${maxTemp.toFixed(1)}°C`;
         const avgHumidityText = `${avgHumidity.toFixed(1)}%`;
-        const dataCountText = data.length.toString();
+        const dataCountText = count.toString();
 
         // 更新桌面端
         const minTempElement = document.getElementById('min-temp');
@@ -1110,16 +1201,228 @@ class TemperatureMonitor {
         if (dataCountMobileElement) dataCountMobileElement.textContent = dataCountText;
     }
 
+    // 切换图表模式，热力图和周对比不使用时间范围按钮，改为选择指标
+    setChartMode(mode) {
+        this.chartMode = mode;
+        document.querySelectorAll('#chart-mode-buttons .btn').forEach(button => {
+            button.classList.toggle('active', button.dataset.mode === mode);
+        });
+        document.getElementById('time-range-buttons').classList.toggle('d-none', mode !== 'trend');
+        document.getElementById('chart-metric-buttons').classList.toggle('d-none', mode === 'trend');
+        document.getElementById('temperatureChart').classList.toggle('d-none', mode !== 'trend');
+        document.getElementById('heatmap').classList.toggle('d-none', mode !== 'heatmap');
+        document.getElementById('comparisonChart').classList.toggle('d-none', mode !== 'compare');
+
+        if (mode === 'trend') {
+            this.updateChart();
+        } else {
+            this.profileData = null;
+            this.loadProfileView();
+        }
+    }
+
+    // 切换热力图/周对比的指标
+    setChartMetric(metric) {
+        this.chartMetric = metric;
+        document.querySelectorAll('#chart-metric-buttons .btn').forEach(button => {
+            button.classList.toggle('active', button.dataset.metric === metric);
+        });
+        this.loadProfileView();
+    }
+
+    // 加载热力图或周对比数据（固定大小的聚合矩阵，与历史数据量无关）
+    async loadProfileView() {
+        if (this.chartMode === 'trend') return;
+        const mode = this.chartMode;
+        const endpoint = mode === 'heatmap' ? '/api/heatmap' : '/api/week-compare';
+        try {
+            const response = await fetch(`${endpoint}?metric=${this.chartMetric}${this.deviceQuery()}`);
+            // 请求期间切换了模式时丢弃结果
+            if (response.ok && mode === this.chartMode) {
+                this.profileData = await response.json();
+                this.renderProfileView();
+            }
+        } catch (error) {
+            console.error(window.i18n.t('console.load_profile_failed'), error);
+        }
+    }
+
+    renderProfileView() {
+        if (!this.profileData) return;
+        if (this.chartMode === 'heatmap') {
+            this.renderHeatmap(this.profileData);
+        } else if (this.chartMode === 'compare') {
+            this.renderWeekComparison(this.profileData);
+        }
+    }
+
+    // 指标的单位
+    metricUnit(metric) {
+        return window.i18n.t(metric === 'humidity' ? 'chart.tooltip.humidity_unit' : 'chart.tooltip.temperature_unit');
+    }
+
+    // 以表格渲染 星期×小时 热力图，颜色按矩阵中的最小/最大值从蓝到红插值
+    renderHeatmap(data) {
+        const container = document.getElementById('heatmap');
+        let min = Infinity;
+        let max = -Infinity;
+        data.values.forEach(row => row.forEach(value => {
+            if (value === null) return;
+            if (value < min) min = value;
+            if (value > max) max = value;
+        }));
+        if (min === Infinity) {
+            container.innerHTML = `<div class="text-muted text-center py-5">${window.i18n.t('chart.heatmap.empty')}</div>`;
+            return;
+        }
+
+        const unit = this.metricUnit(data.metric);
+        const table = document.createElement('table');
+        const header = table.insertRow();
+        header.insertCell();
+        for (let hour = 0; hour < 24; hour++) {
+            const cell = header.insertCell();
+            cell.className = 'heatmap-hour';
+            cell.textContent = hour % 3 === 0 ? `${hour}${window.i18n.t('chart.heatmap.hour')}` : '';
+        }
+        data.values.forEach((values, weekday) => {
+            const weekdayName = window.i18n.t(`chart.weekdays.${weekday}`);
+            const row = table.insertRow();
+            const label = row.insertCell();
+            label.className = 'heatmap-weekday';
+            label.textContent = weekdayName;
+            values.forEach((value, hour) => {
+                const cell = row.insertCell();
+                cell.className = 'heatmap-cell';
+                if (value === null) return;
+                const ratio = max > min ? (value - min) / (max - min) : 0.5;
+                // 色相从蓝色（240）到红色（0）
+                cell.style.backgroundColor = `hsl(${Math.round(240 * (1 - ratio))}, 70%, 60%)`;
+                cell.title = window.i18n.t('chart.heatmap.cell', {
+                    weekday: weekdayName,
+                    hour: hour,
+                    value: value.toFixed(1),
+                    unit: unit,
+                    count: data.counts[weekday][hour]
+                });
+            });
+        });
+
+        const legend = document.createElement('div');
+        legend.className = 'heatmap-legend';
+        legend.innerHTML = '<span></span><span class="heatmap-legend-bar"></span><span></span>';
+        legend.children[0].textContent = `${min.toFixed(1)}${unit}`;
+        legend.children[2].textContent = `${max.toFixed(1)}${unit}`;
+
+        container.replaceChildren(table, legend);
+    }
+
+    // 以折线叠加各周的逐小时平均值，横轴为周一 00:00 起的小时数
+    renderWeekComparison(data) {
+        const colors = ['#ff6b6b', '#74b9ff', '#a29bfe', '#55efc4', '#fdcb6e', '#b2bec3', '#fab1a0', '#81ecec'];
+        const datasets = data.weeks.map((week, index) => {
+            let label = week.week;
+            if (index === 0) {
+                label = `${window.i18n.t('chart.compare.this_week')} (${week.week})`;
+            } else if (index === 1) {
+                label = `${window.i18n.t('chart.compare.last_week')} (${week.week})`;
+            } else {
+                label = `${window.i18n.t('chart.compare.weeks_ago', { count: index })} (${week.week})`;
+            }
+            return {
+                label: label,
+                data: week.values.map((value, hour) => ({ x: hour, y: value })),
+                borderColor: colors[index % colors.length],
+                backgroundColor: colors[index % colors.length],
+                borderWidth: index === 0 ? 3 : 2,
+                borderDash: index === 0 ? [] : [6, 4],
+                pointRadius: 0,
+                tension: 0.3,
+                spanGaps: false
+            };
+        });
+        const weekdayName = (hour) => window.i18n.t(`chart.weekdays.${Math.floor(hour / 24)}`);
+
+        if (this.comparisonChart) {
+            this.comparisonChart.data.datasets = datasets;
+            this.comparisonChart.options.scales.y.title.text = window.i18n.t(`chart.axes.${data.metric}`);
+            this.comparisonChart.update('none');
+            return;
+        }
+
+        // 画布在首次显示后才有尺寸，图表延迟到此时创建
+        this.comparisonChart = new Chart(document.getElementById('comparisonChart').getContext('2d'), {
+            type: 'line',
+            data: { datasets: datasets },
+            options: {
+                responsive: true,
+                maintainAspectRatio: false,
+                parsing: false,
+                normalized: true,
+                animation: false,
+                interaction: {
+                    mode: 'index',
+                    intersect: false
+                },
+                scales: {
+                    x: {
+                        type: 'linear',
+                        min: 0,
+                        max: 167,
+                        ticks: {
+                            stepSize: 24,
+                            color: '#666',
+                            // 刻度位于每天 00:00，标签显示星期
+                            callback: (value) => value % 24 === 0 ? weekdayName(value) : ''
+                        },
+                        grid: {
+                            color: (context) => context.tick && context.tick.value % 24 === 0
+                                ? 'rgba(0, 0, 0, 0.15)' : 'transparent'
+                        }
+                    },
+                    y: {
+                        title: {
+                            display: true,
+                            text: window.i18n.t(`chart.axes.${data.metric}`),
+                            color: '#666'
+                        },
+                        ticks: {
+                            color: '#666'
+                        }
+                    }
+                },
+                plugins: {
+                    legend: {
+                        position: 'top',
+                        labels: {
+                            usePointStyle: true,
+                            pointStyle: 'line'
+                        }
+                    },
+                    tooltip: {
+                        callbacks: {
+                            title: (context) => {
+                                const hour = context[0].parsed.x;
+                                return `${weekdayName(hour)} ${hour % 24}:00`;
+                            },
+                            label: (context) => `${context.dataset.label}: ${context.parsed.y.toFixed(1)}${this.metricUnit(this.profileData.metric)}`
+                        }
+                    }
+                }
+            }
+        });
+    }
+
     // 设置响应式图表
     setupResponsiveChart() {
         let resizeTimeout;
         window.addEventListener('resize', () => {
             clearTimeout(resizeTimeout);
             resizeTimeout = setTimeout(() => {
-                if (this.chart && this.historyData.length > 0) {
-                    // 重新更新图表以适应新的屏幕尺寸
+                if (this.chart && this.series.temperature.length > 0) {
+                    // 已解析的数据无需重新处理，只需按新的绘图区宽度重新抽稀
                     console.log(`响应式更新图表，当前时间范围: ${this.currentTimeRange} 小时`);
-                    this.updateChart(this.historyData);
+                    this.updateChart();
                 }
             }, 250);
         });
@@ -1139,6 +1442,36 @@ function loadHistory(hours) {
     }
 }
 
+/**
+ * 切换图表模式
+ * @param {string} mode - trend、heatmap 或 compare
+ */
+function setChartMode(mode) {
+    if (window.temperatureMonitor) {
+        window.temperatureMonitor.setChartMode(mode);
+    }
+}
+
+/**
+ * 切换热力图/周对比的指标
+ * @param {string} metric - temperature 或 humidity
+ */
+function setChartMetric(metric) {
+    if (window.temperatureMonitor) {
+        window.temperatureMonitor.setChartMetric(metric);
+    }
+}
+
+/**
+ * 切换查看的设备
+ * @param {string|null} address - 设备地址，null表示全部设备
+ */
+function selectDevice(address) {
+    if (window.temperatureMonitor) {
+        window.temperatureMonitor.selectDevice(address);
+    }
+}
+
 
 
 function showNotification(message, type = 'info') {
@@ -1219,8 +1552,8 @@ async function initializeDownloadModal() {
                 const oneWeekAgo = new Date();
                 oneWeekAgo.setDate(now.getDate() - 7);
 
-                modalStartDate.value = oneWeekAgo.toISOString().slice(0, 16);
-                modalEndDate.value = now.toISOString().slice(0, 16);
+                modalStartDate.value = toLocalInputValue(oneWeekAgo);
+                modalEndDate.value = toLocalInputValue(now);
             }
         } catch (error) {
             console.error('初始化下载弹窗失败:', error);
@@ -1229,6 +1562,14 @@ async function initializeDownloadModal() {
     });
 }
 
+/**
+ * 将时间格式化为 datetime-local 输入框使用的本地时间字符串 (YYYY-MM-DDTHH:mm)
+ */
+function toLocalInputValue(date) {
+    const local = new Date(date.getTime() - date.getTimezoneOffset() * 60000);
+    return local.toISOString().slice(0, 16);
+}
+
 /**
  * 从弹窗下载Excel数据
  */
@@ -1262,55 +1603,141 @@ function downloadExcelFromModal() {
 
 /**
  * 使用指定日期下载Excel数据
+ * 在服务端创建后台导出任务，通过 Socket.IO 接收进度，完成后以链接方式下载（浏览器可断点续传）
  */
-function downloadExcelWithDates(startDate, endDate) {
-    // 修正时区
-    startDate = new Date(startDate.setHours(startDate.getHours() + 8));
-    endDate = new Date(endDate.setHours(endDate.getHours() + 8));
-    // 构建API URL
-    const url = `/api/export-excel?start_time=${startDate.toISOString()}&end_time=${endDate.toISOString()}`;
+async function downloadExcelWithDates(startDate, endDate) {
+    // toISOString() 生成带Z的UTC时间，服务端按时区换算，无需手动修正
+    const monitor = window.temperatureMonitor;
+    const devices = monitor && monitor.selectedDevice ? [monitor.selectedDevice] : [];
 
     // 显示下载中通知
     showNotification(window.i18n.t('export.notifications.preparing'), 'info');
 
-    // 创建一个隐藏的a标签进行下载
-    fetch(url)
-        .then(response => {
-            if (!response.ok) {
-                return response.json().then(data => {
-                    throw new Error(data.error || '下载失败');
-                });
-            }
-            return response.blob();
-        })
-        .then(blob => {
-            // 创建下载链接
-            const url = window.URL.createObjectURL(blob);
-            const a = document.createElement('a');
-            a.style.display = 'none';
-            a.href = url;
-
-            // 生成文件名
-            const filename = `DUT温湿度数据_${startDate.toISOString().slice(0, 16).replace(/[:-]/g, '')}_${endDate.toISOString().slice(0, 16).replace(/[:-]/g, '')}.xlsx`;
-            a.download = filename;
-
-            document.body.appendChild(a);
-            a.click();
-            window.URL.revokeObjectURL(url);
-            document.body.removeChild(a);
-
-            showNotification(window.i18n.t('export.notifications.success'), 'success');
-        })
-        .catch(error => {
-            console.error('下载Excel失败:', error);
-            showNotification(window.i18n.t('export.notifications.error', { error: error.message }), 'error');
+    try {
+        const response = await fetch('/api/export-jobs', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                start_time: startDate.toISOString(),
+                end_time: endDate.toISOString(),
+                devices: devices,
+                format: 'xlsx',
+                sid: monitor ? monitor.socket.id : null
+            })
         });
+        let job = await response.json();
+        if (!response.ok) {
+            throw new Error(job.error || '下载失败');
+        }
+
+        job = await waitForExportJob(job);
+        hideExportProgress();
+        if (job.status !== 'done') {
+            throw new Error(job.error || '下载失败');
+        }
+
+        // 创建一个隐藏的a标签进行下载
+        const a = document.createElement('a');
+        a.style.display = 'none';
+        a.href = job.download_url;
+        a.download = job.filename;
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+
+        showNotification(window.i18n.t('export.notifications.success'), 'success');
+    } catch (error) {
+        hideExportProgress();
+        console.error('下载Excel失败:', error);
+        showNotification(window.i18n.t('export.notifications.error', { error: error.message }), 'error');
+    }
+}
+
+/**
+ * 等待导出任务结束：优先使用 Socket.IO 推送的进度，并定期轮询作为兜底
+ */
+function waitForExportJob(job) {
+    return new Promise(resolve => {
+        if (job.status === 'done' || job.status === 'failed') {
+            resolve(job);
+            return;
+        }
+
+        const socket = window.temperatureMonitor ? window.temperatureMonitor.socket : null;
+        let finished = false;
+        let pollTimer = null;
+
+        const onProgress = (update) => {
+            if (finished || update.id !== job.id) return;
+            showExportProgress(update);
+            if (update.status === 'done' || update.status === 'failed') {
+                finished = true;
+                clearInterval(pollTimer);
+                if (socket) socket.off('export_progress', onProgress);
+                resolve(update);
+            }
+        };
+
+        showExportProgress(job);
+        if (socket) socket.on('export_progress', onProgress);
+        pollTimer = setInterval(async () => {
+            try {
+                const response = await fetch(`/api/export-jobs/${job.id}`);
+                if (response.ok) {
+                    onProgress(await response.json());
+                }
+            } catch (error) {
+                console.error('查询导出任务失败:', error);
+            }
+        }, 3000);
+    });
+}
+
+/**
+ * 显示导出进度
+ */
+function showExportProgress(job) {
+    let container = document.getElementById('export-progress');
+    if (!container) {
+        container = document.createElement('div');
+        container.id = 'export-progress';
+        container.className = 'alert alert-info position-fixed';
+        container.style.cssText = 'bottom: 20px; right: 20px; z-index: 9999; min-width: 300px;';
+        container.innerHTML = `
+            <div class="export-progress-text mb-2"></div>
+            <div class="progress">
+                <div class="progress-bar progress-bar-striped progress-bar-animated" role="progressbar"></div>
+            </div>
+        `;
+        document.body.appendChild(container);
+    }
+
+    container.querySelector('.export-progress-text').textContent =
+        window.i18n.t('export.notifications.progress', { progress: job.progress });
+    container.querySelector('.progress-bar').style.width = `${job.progress}%`;
+}
+
+/**
+ * 隐藏导出进度
+ */
+function hideExportProgress() {
+    const container = document.getElementById('export-progress');
+    if (container && container.parentNode) {
+        container.parentNode.removeChild(container);
+    }
 }
 
 // 页面加载完成后初始化
 document.addEventListener('DOMContentLoaded', function() {
     window.temperatureMonitor = new TemperatureMonitor();
 
+    // 注册Service Worker缓存第三方静态资源（使用构建后的资源时由长期缓存的HTTP头负责）
+    if ('serviceWorker' in navigator && !window.ASSET_URLS) {
+        navigator.serviceWorker.register('/sw.js').catch(error => {
+            console.warn('Service Worker注册失败:', error);
+        });
+    }
+
     // 等待i18n初始化完成后显示初始化消息
     const checkI18n = () => {
         if (window.i18n && window.i18n.currentLanguage) {
@@ -0,0 +1,215 @@
+// 历史数据浏览器缓存（IndexedDB）
+// 按设备和日期分桶保存已下载的历史数据，重复打开页面时只向服务端请求缓存高水位之后的新数据
+
+class HistoryCache {
+    constructor(maxAgeDays = 8) {
+        this.dbName = 'temperature-history';
+        this.maxAge = maxAgeDays * 86400000;
+        this.dbPromise = null;
+    }
+
+    // 打开数据库，不支持IndexedDB或打开失败时返回null（此时所有操作退化为不缓存）
+    open() {
+        if (this.dbPromise) return this.dbPromise;
+
+        this.dbPromise = new Promise(resolve => {
+            if (!window.indexedDB) {
+                resolve(null);
+                return;
+            }
+            const request = indexedDB.open(this.dbName, 1);
+            request.onupgradeneeded = () => {
+                const db = request.result;
+                // 数据桶: {device, day, rows}，rows 按时间升序
+                db.createObjectStore('buckets', { keyPath: ['device', 'day'] });
+                // 缓存元数据: {device, from, hwm, hwmX, revision}
+                // from 之后到高水位 hwm 之间的数据是完整的；revision 为服务端的历史回填版本
+                db.createObjectStore('meta', { keyPath: 'device' });
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => {
+                console.warn('历史数据缓存不可用:', request.error);
+                resolve(null);
+            };
+        });
+        return this.dbPromise;
+    }
+
+    static dayOf(x) {
+        return Math.floor(x / 86400000);
+    }
+
+    static promisify(request) {
+        return new Promise((resolve, reject) => {
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    static transactionDone(tx) {
+        return new Promise((resolve, reject) => {
+            tx.oncomplete = () => resolve();
+            tx.onerror = () => reject(tx.error);
+            tx.onabort = () => reject(tx.error);
+        });
+    }
+
+    /**
+     * 读取 from（毫秒时间戳）之后的缓存数据
+     * 缓存未完整覆盖该时间范围时返回null，调用方应重新完整加载
+     * @returns {{rows: Array, meta: Object}|null} rows 按时间升序
+     */
+    async load(device, from) {
+        const db = await this.open();
+        if (!db) return null;
+
+        try {
+            const tx = db.transaction(['meta', 'buckets'], 'readonly');
+            const meta = await HistoryCache.promisify(tx.objectStore('meta').get(device));
+            if (!meta || !meta.hwm || meta.from > from || meta.hwmX < from) {
+                return null;
+            }
+
+            const range = IDBKeyRange.bound([device, HistoryCache.dayOf(from)], [device, Infinity]);
+            const buckets = await HistoryCache.promisify(tx.objectStore('buckets').getAll(range));
+
+            const rows = [];
+            buckets.forEach(bucket => {
+                bucket.rows.forEach(row => {
+                    if (Date.parse(row.timestamp) >= from) {
+                        rows.push(row);
+                    }
+                });
+            });
+            return { rows: rows, meta: meta };
+        } catch (error) {
+            console.warn('读取历史数据缓存失败:', error);
+            return null;
+        }
+    }
+
+    /**
+     * 用完整加载的数据替换设备的缓存
+     * @param {Array} rows 按时间升序的数据
+     * @param {number} from 数据覆盖的起始时间（毫秒时间戳）
+     * @param {string} revision 服务端的历史回填版本
+     */
+    async replace(device, rows, from, revision) {
+        const db = await this.open();
+        if (!db) return;
+
+        try {
+            const tx = db.transaction(['meta', 'buckets'], 'readwrite');
+            tx.objectStore('buckets').delete(IDBKeyRange.bound([device, -Infinity], [device, Infinity]));
+            this.writeRows(tx, device, rows, new Map());
+            tx.objectStore('meta').put(this.makeMeta(device, from, rows, revision));
+            await HistoryCache.transactionDone(tx);
+        } catch (error) {
+            console.warn('写入历史数据缓存失败:', error);
+        }
+    }
+
+    /**
+     * 追加高水位之后的新数据
+     * @param {Array} rows 按时间升序、均晚于当前高水位的数据
+     */
+    async append(device, rows) {
+        if (!rows.length) return;
+        const db = await this.open();
+        if (!db) return;
+
+        try {
+            const tx = db.transaction(['meta', 'buckets'], 'readwrite');
+            const metaStore = tx.objectStore('meta');
+            const meta = await HistoryCache.promisify(metaStore.get(device));
+            if (!meta) return;
+
+            // 先读出需要追加的日期桶，再整体写回
+            const bucketStore = tx.objectStore('buckets');
+            const existing = new Map();
+            const days = new Set(rows.map(row => HistoryCache.dayOf(Date.parse(row.timestamp))));
+            for (const day of days) {
+                const bucket = await HistoryCache.promisify(bucketStore.get([device, day]));
+                if (bucket) existing.set(day, bucket.rows);
+            }
+
+            this.writeRows(tx, device, rows, existing);
+            metaStore.put(this.makeMeta(device, meta.from, rows, meta.revision));
+            await HistoryCache.transactionDone(tx);
+        } catch (error) {
+            console.warn('追加历史数据缓存失败:', error);
+        }
+    }
+
+    // 将数据按日期分桶写入（existing 为已有桶的数据，新数据追加在其后）
+    writeRows(tx, device, rows, existing) {
+        const buckets = existing;
+        rows.forEach(row => {
+            const day = HistoryCache.dayOf(Date.parse(row.timestamp));
+            if (!buckets.has(day)) buckets.set(day, []);
+            buckets.get(day).push(row);
+        });
+
+        const store = tx.objectStore('buckets');
+        buckets.forEach((bucketRows, day) => {
+            store.put({ device: device, day: day, rows: bucketRows });
+        });
+    }
+
+    makeMeta(device, from, rows, revision) {
+        const last = rows.length ? rows[rows.length - 1] : null;
+        return {
+            device: device,
+            from: from,
+            hwm: last ? last.timestamp : null,
+            hwmX: last ? Date.parse(last.timestamp) : null,
+            revision: revision
+        };
+    }
+
+    // 使所有设备的缓存失效（数据被回填后调用），下次加载时重新完整请求
+    async invalidate() {
+        const db = await this.open();
+        if (!db) return;
+
+        try {
+            const tx = db.transaction(['meta'], 'readwrite');
+            tx.objectStore('meta').clear();
+            await HistoryCache.transactionDone(tx);
+        } catch (error) {
+            console.warn('清除历史数据缓存失败:', error);
+        }
+    }
+
+    // 删除超过保留期的数据桶，并相应推后各设备的覆盖起点
+    async prune() {
+        const db = await this.open();
+        if (!db) return;
+
+        try {
+            const cutoff = Date.now() - this.maxAge;
+            const cutoffDay = HistoryCache.dayOf(cutoff);
+            const tx = db.transaction(['meta', 'buckets'], 'readwrite');
+
+            const keys = await HistoryCache.promisify(tx.objectStore('buckets').getAllKeys());
+            keys.forEach(key => {
+                if (key[1] < cutoffDay) {
+                    tx.objectStore('buckets').delete(key);
+                }
+            });
+
+            const metas = await HistoryCache.promisify(tx.objectStore('meta').getAll());
+            metas.forEach(meta => {
+                if (meta.from < cutoffDay * 86400000) {
+                    meta.from = cutoffDay * 86400000;
+                    tx.objectStore('meta').put(meta);
+                }
+            });
+            await HistoryCache.transactionDone(tx);
+        } catch (error) {
+            console.warn('清理历史数据缓存失败:', error);
+        }
+    }
+}
+
+window.historyCache = new HistoryCache();
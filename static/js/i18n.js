@@ -81,7 +81,9 @@ class I18nManager {
 
     async loadLanguage(language) {
         try {
-            const response = await fetch(`/static/js/i18n/${language}.json`);
+            // 使用构建后的资源时，语言文件地址带内容哈希
+            const assetUrls = window.ASSET_URLS || {};
+            const response = await fetch(assetUrls[`js/i18n/${language}.json`] || `/static/js/i18n/${language}.json`);
             if (!response.ok) {
                 throw new Error(`Failed to load language ${language}: ${response.status}`);
             }
@@ -0,0 +1,53 @@
+// Service Worker：缓存第三方静态资源（Chart.js、Bootstrap、Socket.IO等）
+// 由 Flask 通过 /sw.js 提供，作用域为整个站点；仅拦截 /static/vendor/ 下的请求，其余请求直接走网络
+
+const VENDOR_CACHE = 'vendor-v1';
+const VENDOR_ASSETS = [
+    '/static/vendor/bootstrap/css/bootstrap.min.css',
+    '/static/vendor/bootstrap/js/bootstrap.bundle.min.js',
+    '/static/vendor/bootstrap-icons/bootstrap-icons.css',
+    '/static/vendor/chartjs/chart.min.js',
+    '/static/vendor/socketio/socket.io.min.js'
+];
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(VENDOR_CACHE)
+            .then(cache => cache.addAll(VENDOR_ASSETS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+// 删除旧版本的缓存
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => key !== VENDOR_CACHE).map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+// 第三方资源缓存优先，未命中时从网络获取并写入缓存（如图标字体）
+self.addEventListener('fetch', event => {
+    const url = new URL(event.request.url);
+    if (event.request.method !== 'GET' || url.origin !== self.location.origin ||
+        !url.pathname.startsWith('/static/vendor/')) {
+        return;
+    }
+
+    event.respondWith(
+        caches.open(VENDOR_CACHE).then(cache =>
+            cache.match(event.request).then(cached => {
+                if (cached) return cached;
+                return fetch(event.request).then(response => {
+                    if (response.ok) {
+                        cache.put(event.request, response.clone());
+                    }
+                    return response;
+                });
+            })
+        )
+    );
+});
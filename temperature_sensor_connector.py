@@ -6,21 +6,22 @@
 """
 
 import asyncio
+import queue
 import struct
 import logging
 import json
 import sqlite3
-from typing import Dict, Optional, Tuple, Callable
-from dataclasses import dataclass, asdict
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Dict, Iterator, List, Optional, Sequence, Tuple, Callable, Union
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-try:
-    from bleak import BleakClient, BleakScanner
-    from bleak.backends.characteristic import BleakGATTCharacteristic
-except ImportError:
-    print("请安装bleak库: pip install bleak")
-    exit(1)
+import fast_json
+from comfort_metrics import COMFORT_COLUMNS, backfill_database, compute_rows
+from offload import NUMERIC_COLUMNS, ColumnarData
+from ble_transport import BleTransport, create_transport
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
@@ -30,17 +31,63 @@ logger = logging.getLogger(__name__)
 with open('./static/config.json', 'r', encoding='utf-8') as f:
     data = json.load(f)
     device_name = data['server']['device_name']
+    server_config = data['server']  # 服务端配置（告警规则等）
+
+def to_epoch(value: datetime) -> float:
+    """
+    将时间换算为UTC epoch秒
+
+    带时区的时间按其自身时区换算；不带时区的时间视为本地时间（与 datetime.now() 写入的数据一致）
+    """
+    return value.timestamp()
+
+
+def profile_bucket(ts: float) -> Tuple[int, int, int, int]:
+    """
+    读数所属的聚合分桶（按服务器本地时间划分）
+
+    Args:
+        ts: 读数时间（epoch秒）
+
+    Returns:
+        (ISO年, ISO周, 星期（0为周一）, 小时)
+    """
+    local = datetime.fromtimestamp(ts)
+    iso_year, iso_week, iso_weekday = local.isocalendar()
+    return iso_year, iso_week, iso_weekday - 1, local.hour
+
 
-@dataclass
 class TemperatureData:
-    """温度湿度数据结构"""
-    temperature: float  # 温度 (°C)
-    humidity: float     # 湿度 (%)
-    battery: Optional[int] = None  # 电池电量 (%)
-    voltage: Optional[int] = None  # 电压 (mV)
-    timestamp: Optional[datetime] = None
-    device_name: Optional[str] = None  # 设备名称
-    device_address: Optional[str] = None  # 设备地址
+    """
+    温度湿度数据结构
+
+    每条通知都会创建一个实例，使用 __slots__ 避免实例字典；序列化结果在第一次使用时缓存，
+    推送、最新数据接口和落盘缓冲区共用同一份JSON。实例创建后不应再修改字段。
+    """
+
+    FIELDS = ('temperature', 'humidity', 'battery', 'voltage', 'timestamp', 'device_name', 'device_address')
+    __slots__ = FIELDS + ('_json',)
+
+    def __init__(self, temperature: float, humidity: float, battery: Optional[int] = None,
+                 voltage: Optional[int] = None, timestamp: Optional[datetime] = None,
+                 device_name: Optional[str] = None, device_address: Optional[str] = None):
+        self.temperature = temperature  # 温度 (°C)
+        self.humidity = humidity        # 湿度 (%)
+        self.battery = battery          # 电池电量 (%)
+        self.voltage = voltage          # 电压 (mV)
+        self.timestamp = timestamp
+        self.device_name = device_name  # 设备名称
+        self.device_address = device_address  # 设备地址
+        self._json = None
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"TemperatureData({fields})"
+
+    def __eq__(self, other):
+        if not isinstance(other, TemperatureData):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.FIELDS)
 
     def __str__(self):
         result = f"温度: {self.temperature:.2f}°C, 湿度: {self.humidity:.2f}%"
@@ -54,12 +101,27 @@ class TemperatureData:
             result += f", 设备: {self.device_name}"
         return result
 
-    def to_dict(self):
+    def to_dict(self) -> dict:
         """转换为字典格式"""
-        data = asdict(self)
-        if self.timestamp:
-            data['timestamp'] = self.timestamp.isoformat()
-        return data
+        return {
+            'temperature': self.temperature,
+            'humidity': self.humidity,
+            'battery': self.battery,
+            'voltage': self.voltage,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'device_name': self.device_name,
+            'device_address': self.device_address,
+        }
+
+    def to_json(self) -> str:
+        """转换为JSON字符串（只序列化一次）"""
+        if self._json is None:
+            self._json = fast_json.dumps(self.to_dict(), ensure_ascii=False, separators=(',', ':'))
+        return self._json
+
+    def json_payload(self) -> fast_json.PreEncoded:
+        """作为 Socket.IO 事件参数的预序列化数据"""
+        return fast_json.PreEncoded(self.to_json())
 
 class TemperatureSensorConnector:
     """温度计连接器类"""
@@ -78,25 +140,59 @@ class TemperatureSensorConnector:
         'CUSTOM_WRITE': '0000fffe-0000-1000-8000-00805f9b34fb',   # 自定义写入
         'QINGPING_NOTIFY': '00000100-0000-0000-0000-000000000000'  # 青萍通知
     }
+
+    # 自定义固件（pvvx）的历史记录命令：写入 [0x35, 条数(u16), 跳过最新的条数(u16)]，
+    # 设备按从新到旧逐条通知 [0x35, 序号(u16), 时间(u32), 温度(s16, 0.01°C), 湿度(u16, 0.01%), 电压(u16, mV)]，
+    # 最后以不足一条记录长度的数据包结束
+    HISTORY_COMMAND = 0x35
+    HISTORY_RECORD = struct.Struct('<BHIhHH')
+
+    # 传感器量程，超出量程的读数视为畸形数据包
+    TEMPERATURE_RANGE = (-40.0, 85.0)
+    HUMIDITY_RANGE = (0.0, 100.0)
     
-    def __init__(self, device_name_filter: Optional[str] = None, auto_reconnect: bool = True):
+    def __init__(self, device_name_filter: Optional[str] = None, auto_reconnect: bool = True,
+                 transport: Optional[BleTransport] = None, preferred_name: Optional[str] = None,
+                 adapter: Optional[str] = None, placer=None, match_preferred_only: bool = False):
         """
         初始化温度计连接器
 
         Args:
             device_name_filter: 设备名称过滤器，用于筛选特定设备
             auto_reconnect: 是否自动重连
+            transport: 蓝牙传输，默认按配置文件 server.ble 创建（bleak 或模拟设备）
+            preferred_name: 持续扫描时优先连接的设备名称（或地址），默认为配置文件中的 device_name
+            adapter: 使用的蓝牙适配器（如 hci1），默认为配置文件中的 server.ble.adapter，为空时使用系统默认适配器
+            placer: 连接分配器（adapter_placement.ConnectionPlacer），指定时由分配器选择适配器，忽略 adapter
+            match_preferred_only: 为 True 时只连接 preferred_name 指定的设备，未发现时不连接其他设备
         """
         self.device_name_filter = device_name_filter
         self.auto_reconnect = auto_reconnect
-        self.client: Optional[BleakClient] = None
+        ble_config = server_config.get('ble', {})
+        self.transport = transport or create_transport(ble_config)
+        self.preferred_name = preferred_name if preferred_name is not None else device_name
+        self.adapter = adapter if adapter is not None else ble_config.get('adapter')
+        self.placer = placer
+        self.match_preferred_only = match_preferred_only
+        self.current_adapter: Optional[str] = None  # 当前连接使用的适配器
+        self.client = None
         self.is_connected = False
-        self.data_callback: Optional[Callable[[TemperatureData], None]] = None
+        self.data_callback: Optional[Callable[[TemperatureData], Union[None, Awaitable[None]]]] = None
+        self._callback_tasks = set()  # 异步回调任务的引用，防止被提前回收
+        self.connect_callback: Optional[Callable[[str], Awaitable[None]]] = None
+        self._notify_uuid: Optional[str] = None  # 当前用于接收实时数据的特征
+        self._history_queue: Optional[asyncio.Queue] = None  # 下载历史记录期间接收记录数据包
         self.current_device_address: Optional[str] = None
         self.current_device_name: Optional[str] = None
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 10
+        self._reconnect_task: Optional[asyncio.Task] = None
         self.is_scanning = False
+        # 扫描与重连的时间参数（秒）
+        self.scan_timeout = 10
+        self.reconnect_delay = 5
+        self.retry_delay = 10
+        self.check_interval = 10
         
     async def scan_devices(self, timeout: int = 10) -> list:
         """
@@ -109,8 +205,11 @@ class TemperatureSensorConnector:
             设备列表
         """
         logger.info(f"开始扫描蓝牙设备，超时时间: {timeout}秒")
-        
-        devices = await BleakScanner.discover(timeout=timeout)
+
+        if self.placer:
+            devices = await self.placer.discover(self.transport, timeout)
+        else:
+            devices = await self.transport.discover(timeout, adapter=self.adapter)
         temperature_devices = []
         
         for device in devices:
@@ -121,7 +220,7 @@ class TemperatureSensorConnector:
                     temperature_devices.append({
                         'name': device.name,
                         'address': device.address,
-                        'rssi': device.rssi if hasattr(device, 'rssi') else None
+                        'rssi': device.rssi
                     })
                     logger.info(f"发现温度计设备: {device.name} ({device.address})")
         
@@ -138,55 +237,101 @@ class TemperatureSensorConnector:
         Returns:
             连接是否成功
         """
+        placed = False  # 是否占用了分配器中的连接数，失败时需要释放
         try:
-            logger.info(f"正在连接设备: {device_address}")
-            self.client = BleakClient(device_address, disconnected_callback=self._on_disconnect)
-            await self.client.connect()
+            # 由分配器选择负载最低、信号足够好的适配器；设备已由其他连接器连接时放弃
+            if self.placer:
+                adapter = self.placer.acquire(device_address)
+                placed = True
+            else:
+                adapter = self.adapter
+            logger.info(f"正在连接设备: {device_address}" + (f" (适配器 {adapter})" if adapter else ""))
+            self.client = self.transport.create_client(device_address, self._on_disconnect, adapter)
+            try:
+                await self.client.connect()
+            except Exception:
+                self.client = None
+                if placed:
+                    placed = False
+                    self.placer.report_failure(device_address)
+                raise
+            if self.placer:
+                self.placer.report_success(adapter)
             self.is_connected = True
             self.current_device_address = device_address
             self.current_device_name = device_name
+            self.current_adapter = adapter
             self.reconnect_attempts = 0
             logger.info("设备连接成功")
 
             # 启动数据监听
             await self._setup_notifications()
+
+            # 连接（包括重连）后的处理，如下载设备中的历史记录，不阻塞实时数据
+            if self.connect_callback:
+                self._track_task(asyncio.ensure_future(self.connect_callback(device_address)))
             return True
 
         except Exception as e:
             logger.error(f"连接设备失败: {e}")
             self.is_connected = False
+            # 已建立连接但设置通知失败时断开，释放适配器的连接数
+            client, self.client = self.client, None
+            if client is not None:
+                try:
+                    await client.disconnect()
+                except Exception:
+                    pass
+            if placed:
+                self.placer.release(device_address)
             return False
 
-    def _on_disconnect(self, client: BleakClient):
+    @property
+    def is_reconnecting(self) -> bool:
+        """是否有正在进行的自动重连"""
+        return self._reconnect_task is not None and not self._reconnect_task.done()
+
+    def _on_disconnect(self, client):
         """设备断开连接回调"""
+        # 已被替换或主动断开的客户端的回调不处理，避免重复重连
+        if client is not self.client:
+            return
+
         logger.warning("设备连接断开")
         self.is_connected = False
+        self._notify_uuid = None
+        if self.placer and self.current_device_address:
+            # 重连时重新分配适配器，故障适配器上的设备会分散到其他适配器
+            self.placer.release(self.current_device_address, unexpected=True)
 
-        if self.auto_reconnect and self.reconnect_attempts < self.max_reconnect_attempts:
-            self.reconnect_attempts += 1
-            logger.info(f"尝试重连 ({self.reconnect_attempts}/{self.max_reconnect_attempts})")
-            asyncio.create_task(self._reconnect())
+        # 同一时间只保留一个重连任务
+        if self.auto_reconnect and not self.is_reconnecting:
+            self._reconnect_task = asyncio.ensure_future(self._reconnect())
 
     async def _reconnect(self):
-        """自动重连"""
-        if not self.current_device_address:
-            return
-
-        await asyncio.sleep(5)  # 等待5秒后重连
+        """自动重连，失败后间隔重试，直到成功或达到最大重连次数"""
+        delay = self.reconnect_delay
+        while self.current_device_address and not self.is_connected \
+                and self.reconnect_attempts < self.max_reconnect_attempts:
+            self.reconnect_attempts += 1
+            logger.info(f"尝试重连 ({self.reconnect_attempts}/{self.max_reconnect_attempts})")
+            await asyncio.sleep(delay)
+            if self.is_connected:
+                return
+            if await self.connect(self.current_device_address, self.current_device_name):
+                return
+            delay = self.retry_delay  # 失败后等待更长时间
 
-        try:
-            await self.connect(self.current_device_address, self.current_device_name)
-        except Exception as e:
-            logger.error(f"重连失败: {e}")
-            if self.reconnect_attempts < self.max_reconnect_attempts:
-                await asyncio.sleep(10)  # 失败后等待更长时间
-                await self._reconnect()
-    
     async def disconnect(self):
         """断开设备连接"""
         if self.client and self.is_connected:
-            await self.client.disconnect()
+            # 先解除引用，主动断开触发的断开回调不会再发起重连
+            client, self.client = self.client, None
             self.is_connected = False
+            self._notify_uuid = None
+            if self.placer and self.current_device_address:
+                self.placer.release(self.current_device_address)
+            await client.disconnect()
             logger.info("设备已断开连接")
     
     async def _setup_notifications(self):
@@ -204,13 +349,14 @@ class TemperatureSensorConnector:
         for char_uuid in characteristics_to_try:
             try:
                 await self.client.start_notify(char_uuid, self._notification_handler)
+                self._notify_uuid = char_uuid
                 logger.info(f"成功启动通知监听: {char_uuid}")
                 break
             except Exception as e:
                 logger.debug(f"无法启动通知 {char_uuid}: {e}")
                 continue
     
-    def _notification_handler(self, characteristic: BleakGATTCharacteristic, data: bytearray):
+    def _notification_handler(self, characteristic, data: bytearray):
         """
         处理接收到的数据通知
         
@@ -219,15 +365,54 @@ class TemperatureSensorConnector:
             data: 接收到的数据
         """
         try:
+            # 下载历史记录期间，历史记录数据包交给下载流程处理
+            if self._history_queue is not None and data[:1] == bytes([self.HISTORY_COMMAND]) \
+                    and characteristic.uuid.lower() == self.CHARACTERISTICS['CUSTOM_NOTIFY']:
+                self._history_queue.put_nowait(bytes(data))
+                return
+
             temp_data = self._parse_temperature_data(data)
             if temp_data and self.data_callback:
-                self.data_callback(temp_data)
+                result = self.data_callback(temp_data)
+                # 异步回调在事件循环中以任务方式运行，不阻塞后续通知的处理
+                if asyncio.iscoroutine(result):
+                    self._track_task(asyncio.ensure_future(result))
         except Exception as e:
             logger.error(f"解析数据失败: {e}")
+
+    def _track_task(self, task: asyncio.Future):
+        """保存异步回调任务的引用，完成后记录异常"""
+        self._callback_tasks.add(task)
+        task.add_done_callback(self._on_callback_done)
+
+    def _on_callback_done(self, task: asyncio.Task):
+        """异步数据回调完成"""
+        self._callback_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"数据回调出错: {task.exception()}")
     
     def _parse_temperature_data(self, data: bytearray) -> Optional[TemperatureData]:
         """
-        解析温度湿度数据 (基于网页代码中的解析逻辑)
+        解析温度湿度数据，丢弃超出传感器量程的读数
+
+        Args:
+            data: 原始数据
+
+        Returns:
+            解析后的温度数据，无法解析或超出量程时返回None
+        """
+        parsed = self._decode_temperature_data(data)
+        if parsed is None:
+            return None
+        if not (self.TEMPERATURE_RANGE[0] <= parsed.temperature <= self.TEMPERATURE_RANGE[1]
+                and self.HUMIDITY_RANGE[0] <= parsed.humidity <= self.HUMIDITY_RANGE[1]):
+            logger.debug(f"丢弃超出量程的数据: {bytes(data).hex()}")
+            return None
+        return parsed
+
+    def _decode_temperature_data(self, data: bytearray) -> Optional[TemperatureData]:
+        """
+        解码温度湿度数据 (基于网页代码中的解析逻辑)
         
         Args:
             data: 原始数据
@@ -289,12 +474,119 @@ class TemperatureSensorConnector:
         
         return None
     
-    def set_data_callback(self, callback: Callable[[TemperatureData], None]):
+    async def download_history(self, since: Optional[float] = None, until: Optional[float] = None,
+                               max_records: int = 2000, chunk_size: int = 100,
+                               device_time_utc: bool = False, timeout: float = 5.0) -> List[TemperatureData]:
+        """
+        从设备存储中下载历史记录（需要支持历史记录命令的自定义固件）
+
+        设备从新到旧返回记录，按块请求，遇到不晚于 since 的记录即停止
+
+        Args:
+            since: 只返回晚于该时间（epoch秒）的记录，为空则返回全部
+            until: 只返回早于该时间（epoch秒）的记录，避免与连接后的实时数据重复
+            max_records: 最多读取的记录数
+            chunk_size: 每次请求的记录数
+            device_time_utc: 设备时钟为UTC时间；为False时视为本地时间（固件刷写工具默认按本地时间设置时钟）
+            timeout: 等待单条记录的超时时间（秒）
+
+        Returns:
+            按时间升序排列的历史读数，设备不支持时返回空列表
+        """
+        if not self.client or not self.is_connected:
+            return []
+
+        char_uuid = self.CHARACTERISTICS['CUSTOM_NOTIFY']
+        started_notify = False
+        if self._notify_uuid != char_uuid:
+            try:
+                await self.client.start_notify(char_uuid, self._notification_handler)
+                started_notify = True
+            except Exception as e:
+                logger.debug(f"设备不支持历史记录下载: {e}")
+                return []
+
+        queue: asyncio.Queue = asyncio.Queue()
+        self._history_queue = queue
+        records = []
+        try:
+            offset = 0
+            while offset < max_records:
+                count = min(chunk_size, max_records - offset)
+                await self.client.write_gatt_char(
+                    char_uuid, struct.pack('<BHH', self.HISTORY_COMMAND, count, offset), response=True
+                )
+
+                received = 0
+                reached_since = False
+                while received < count:
+                    packet = await asyncio.wait_for(queue.get(), timeout)
+                    if len(packet) < self.HISTORY_RECORD.size:
+                        break  # 结束标记
+                    received += 1
+
+                    _, _, device_time, temp, humidity, voltage = self.HISTORY_RECORD.unpack_from(packet)
+                    if device_time_utc:
+                        timestamp = datetime.fromtimestamp(device_time)
+                    else:
+                        # 设备时钟保存的是本地时间，按UTC解析得到的即为本地时间
+                        timestamp = datetime.fromtimestamp(device_time, timezone.utc).replace(tzinfo=None)
+                    ts = to_epoch(timestamp)
+
+                    if since is not None and ts <= since:
+                        reached_since = True
+                        continue
+                    if until is not None and ts >= until:
+                        continue
+                    records.append(TemperatureData(
+                        temperature=temp / 100.0,
+                        humidity=humidity / 100.0,
+                        voltage=voltage,
+                        timestamp=timestamp,
+                        device_name=self.current_device_name,
+                        device_address=self.current_device_address
+                    ))
+
+                offset += received
+                if reached_since or received < count:
+                    break
+
+                # 读满一块后设备仍会发送结束标记，读掉后再请求下一块
+                try:
+                    await asyncio.wait_for(queue.get(), 0.5)
+                except asyncio.TimeoutError:
+                    pass
+
+        except asyncio.TimeoutError:
+            logger.warning(f"等待历史记录超时，已读取 {len(records)} 条")
+        except Exception as e:
+            logger.error(f"下载历史记录失败: {e}")
+        finally:
+            self._history_queue = None
+            if started_notify:
+                try:
+                    await self.client.stop_notify(char_uuid)
+                except Exception as e:
+                    logger.debug(f"停止历史记录通知失败: {e}")
+
+        records.sort(key=lambda data: data.timestamp)
+        return records
+
+    def set_connect_callback(self, callback: Callable[[str], Awaitable[None]]):
+        """
+        设置连接成功后的回调（每次连接和重连后调用）
+
+        Args:
+            callback: 协程函数，参数为设备地址
+        """
+        self.connect_callback = callback
+
+    def set_data_callback(self, callback: Callable[[TemperatureData], Union[None, Awaitable[None]]]):
         """
         设置数据回调函数
         
         Args:
-            callback: 当接收到新数据时调用的回调函数
+            callback: 当接收到新数据时调用的回调函数，可以是协程函数
         """
         self.data_callback = callback
     
@@ -335,30 +627,40 @@ class TemperatureSensorConnector:
 
         while self.is_scanning:
             try:
-                if not self.is_connected:
+                if not self.is_connected and not self.is_reconnecting:
                     logger.info("扫描温度计设备...")
-                    devices = await self.scan_devices(timeout=10)
-
-                    if devices:
-                        device = devices[0]
-                        # 尝试连接指定设备号设备
-                        for de in devices:
-                            if de['name'] == device_name:
-                                device = de
-                                print("找到指定设备:", device_name)
-                        # 尝试连接第一个设备                    
+                    devices = await self.scan_devices(timeout=self.scan_timeout)
+
+                    # 只连接指定设备时，其他设备由各自的连接器负责，不能退回第一个设备，否则会重复连接
+                    device = None if self.match_preferred_only or not devices else devices[0]
+                    # 尝试连接指定设备号设备（名称或地址）
+                    for de in devices:
+                        if self._is_preferred(de):
+                            device = de
+                            logger.info(f"找到指定设备: {self.preferred_name}")
+                            break
+
+                    if device:
                         logger.info(f"尝试连接设备: {device['name']}")
-                        await self.connect(device['address'], device['name'])
+                        if not await self.connect(device['address'], device['name']) and self.placer:
+                            # 分配失败（适配器已满或设备已由其他连接器连接）时等待后再扫描
+                            await asyncio.sleep(self.reconnect_delay)
                     else:
-                        logger.info("未发现设备，5秒后重新扫描...")
-                        await asyncio.sleep(5)
+                        logger.info(f"未发现设备，{self.reconnect_delay}秒后重新扫描...")
+                        await asyncio.sleep(self.reconnect_delay)
                 else:
-                    # 已连接，等待一段时间后检查连接状态
-                    await asyncio.sleep(10)
+                    # 已连接或正在自动重连，等待一段时间后检查连接状态
+                    await asyncio.sleep(self.check_interval)
 
             except Exception as e:
                 logger.error(f"扫描过程出错: {e}")
-                await asyncio.sleep(5)
+                await asyncio.sleep(self.reconnect_delay)
+
+    def _is_preferred(self, device: dict) -> bool:
+        """扫描结果是否为指定设备"""
+        if not self.preferred_name:
+            return False
+        return device['name'] == self.preferred_name or device['address'].upper() == self.preferred_name.upper()
 
     def stop_scanning(self):
         """停止持续扫描"""
@@ -402,24 +704,145 @@ async def main():
     else:
         print("连接失败")
 
+
+class ReadConnectionPool:
+    """
+    SQLite只读连接池
+
+    连接以 mode=ro 打开并启用 query_only，在WAL模式下读取不会与写入互相阻塞。
+    连接在请求之间复用（保留已解析的表结构和预编译语句缓存），
+    同一线程优先取回自己上次使用的连接，池大小限制同时进行的读取数量。
+    """
+
+    def __init__(self, db_path: str, size: int = 4, cached_statements: int = 64):
+        """
+        初始化只读连接池
+
+        Args:
+            db_path: 数据库文件路径
+            size: 最大连接数（同时进行的读取数）
+            cached_statements: 每个连接的预编译语句缓存数量
+        """
+        self.uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+        self.size = size
+        self.cached_statements = cached_statements
+        self._semaphore = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle: List[sqlite3.Connection] = []
+        self._local = threading.local()
+        self._opened = 0
+        self._acquisitions = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _open(self) -> sqlite3.Connection:
+        """创建一个只读连接"""
+        conn = sqlite3.connect(
+            self.uri,
+            uri=True,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.execute('PRAGMA query_only = ON')
+        with self._lock:
+            self._opened += 1
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """借出一个只读连接，同一线程内嵌套调用复用同一连接"""
+        conn = getattr(self._local, 'active', None)
+        if conn is not None:
+            yield conn
+            return
+
+        start = time.perf_counter()
+        waited = not self._semaphore.acquire(blocking=False)
+        if waited:
+            self._semaphore.acquire()
+        wait = time.perf_counter() - start
+
+        with self._lock:
+            self._acquisitions += 1
+            if waited:
+                self._waits += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+
+            preferred = getattr(self._local, 'preferred', None)
+            if preferred is not None and preferred in self._idle:
+                self._idle.remove(preferred)
+                conn = preferred
+            elif self._idle:
+                conn = self._idle.pop()
+
+        try:
+            if conn is None:
+                conn = self._open()
+            self._local.active = conn
+            self._local.preferred = conn
+            yield conn
+        finally:
+            self._local.active = None
+            if conn is not None:
+                with self._lock:
+                    self._idle.append(conn)
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        """连接池统计信息"""
+        with self._lock:
+            return {
+                'size': self.size,
+                'open_connections': self._opened,
+                'idle_connections': len(self._idle),
+                'acquisitions': self._acquisitions,
+                'waits': self._waits,
+                'total_wait_ms': round(self._total_wait * 1000, 3),
+                'max_wait_ms': round(self._max_wait * 1000, 3)
+            }
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._opened -= len(self._idle)
+            self._idle.clear()
+
 class TemperatureDataStorage:
     """温度数据存储类"""
 
-    def __init__(self, db_path: str = "temperature_data.db"):
+    # 热力图和周对比支持的指标及其在聚合表中的累加列
+    PROFILE_METRICS = {'temperature': 'temperature_sum', 'humidity': 'humidity_sum'}
+
+    def __init__(self, db_path: str = "temperature_data.db", gap_threshold: float = 300,
+                 read_pool_size: int = 4):
         """
         初始化数据存储
 
         Args:
             db_path: 数据库文件路径
+            gap_threshold: 相邻读数间隔超过该秒数即视为数据缺口
+            read_pool_size: 只读连接池大小
         """
         self.db_path = db_path
+        self.gap_threshold = gap_threshold
+        # 每个设备当前覆盖区间的缓存: device_address -> (区间id, 结束时间)
+        self._open_intervals: Dict[Optional[str], Tuple[int, float]] = {}
+        self._coverage_lock = threading.Lock()
         self._init_database()
+        self._read_pool = ReadConnectionPool(db_path, size=read_pool_size)
 
     def _init_database(self):
         """初始化数据库"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
+        # WAL模式：只读连接池的读取不会阻塞写入，写入也不会阻塞读取
+        cursor.execute('PRAGMA journal_mode=WAL')
+
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS temperature_data (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -430,61 +853,825 @@ class TemperatureDataStorage:
                 voltage INTEGER,
                 device_name TEXT,
                 device_address TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                ts_epoch REAL,
+                dew_point REAL,
+                absolute_humidity REAL,
+                heat_index REAL
             )
         ''')
 
-        # 创建索引
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON temperature_data(timestamp)')
+        # 旧版本数据库没有 ts_epoch 列，补充并回填
+        self._migrate_epoch_column(conn)
+        # 旧版本数据库没有舒适度指标列，补充后由 backfill_comfort_metrics 在后台回填
+        self._migrate_comfort_columns(conn)
+
+        # 创建索引：时间范围查询统一使用 ts_epoch（UTC epoch秒）的数值索引
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ts_epoch ON temperature_data(ts_epoch)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_device ON temperature_data(device_address)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_device_ts_epoch ON temperature_data(device_address, ts_epoch)')
+        # 缺少舒适度指标的读数（升级前写入或湿度无效）很少，部分索引使回填检查和分块读取不必扫描全表
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_comfort_missing ON temperature_data(id) WHERE dew_point IS NULL')
+        # 基于字符串时间戳的旧索引已不再使用
+        cursor.execute('DROP INDEX IF EXISTS idx_timestamp')
+        cursor.execute('DROP INDEX IF EXISTS idx_device_timestamp')
+
+        # 数据覆盖区间索引：每行代表一段连续采集的时间区间（epoch秒）
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS coverage_intervals (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                device_address TEXT,
+                start_ts REAL NOT NULL,
+                end_ts REAL NOT NULL,
+                reading_count INTEGER NOT NULL DEFAULT 1
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_coverage_device_end ON coverage_intervals(device_address, end_ts)')
+
+        # 历史记录回填日志：回填会在已有数据之前插入读数，客户端据此判断缓存是否需要重新加载
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS backfill_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                device_address TEXT,
+                start_ts REAL NOT NULL,
+                end_ts REAL NOT NULL,
+                inserted INTEGER NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # 汇聚模式下各采集主机的同步进度：已合并的采集主机本地数据库 id 高水位
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sync_hosts (
+                host_id TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL DEFAULT 0,
+                received INTEGER NOT NULL DEFAULT 0,
+                inserted INTEGER NOT NULL DEFAULT 0,
+                last_sync_at DATETIME
+            )
+        ''')
+
+        # 按 (设备, 星期, 小时) 与 (设备, ISO周, 星期, 小时) 累计的聚合表，随读数写入增量更新，
+        # 热力图和周对比只读取固定数量的聚合行，不扫描原始数据；没有设备地址的读数以空字符串记录
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hourly_profile (
+                device_address TEXT NOT NULL,
+                weekday INTEGER NOT NULL,
+                hour INTEGER NOT NULL,
+                reading_count INTEGER NOT NULL,
+                temperature_sum REAL NOT NULL,
+                humidity_sum REAL NOT NULL,
+                PRIMARY KEY (device_address, weekday, hour)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS weekly_profile (
+                device_address TEXT NOT NULL,
+                iso_year INTEGER NOT NULL,
+                iso_week INTEGER NOT NULL,
+                weekday INTEGER NOT NULL,
+                hour INTEGER NOT NULL,
+                reading_count INTEGER NOT NULL,
+                temperature_sum REAL NOT NULL,
+                humidity_sum REAL NOT NULL,
+                PRIMARY KEY (device_address, iso_year, iso_week, weekday, hour)
+            ) WITHOUT ROWID
+        ''')
 
         conn.commit()
+
+        # 已有数据但尚未建立覆盖索引或聚合表时（旧版本数据库），一次性重建
+        cursor.execute('SELECT EXISTS(SELECT 1 FROM coverage_intervals)')
+        has_coverage = cursor.fetchone()[0]
+        cursor.execute('SELECT EXISTS(SELECT 1 FROM hourly_profile)')
+        has_profiles = cursor.fetchone()[0]
+        cursor.execute('SELECT EXISTS(SELECT 1 FROM temperature_data)')
+        has_data = cursor.fetchone()[0]
         conn.close()
+
+        if has_data and not has_coverage:
+            self.rebuild_coverage()
+        if has_data and not has_profiles:
+            self.rebuild_profiles()
+
         logger.info(f"数据库初始化完成: {self.db_path}")
 
-    def save_data(self, data: TemperatureData):
-        """保存温度数据"""
+    @staticmethod
+    def _migrate_epoch_column(conn: sqlite3.Connection):
+        """
+        为旧版本数据库添加 ts_epoch 列并回填
+
+        旧数据的 timestamp 是 datetime.now().isoformat() 生成的本地时间字符串，
+        按本地时区换算为epoch秒；带时区的字符串按其自身时区换算
+        """
+        cursor = conn.cursor()
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(temperature_data)')]
+        if 'ts_epoch' not in columns:
+            try:
+                cursor.execute('ALTER TABLE temperature_data ADD COLUMN ts_epoch REAL')
+            except sqlite3.OperationalError as e:
+                # 采集服务和Web服务同时启动时可能已被另一进程添加
+                if 'duplicate column' not in str(e):
+                    raise
+
+        rows = cursor.execute('SELECT id, timestamp FROM temperature_data WHERE ts_epoch IS NULL').fetchall()
+        if not rows:
+            return
+
+        updates = []
+        for row_id, timestamp in rows:
+            try:
+                updates.append((to_epoch(datetime.fromisoformat(timestamp)), row_id))
+            except ValueError:
+                logger.warning(f"无法解析的时间戳，跳过: id={row_id}, timestamp={timestamp}")
+        cursor.executemany('UPDATE temperature_data SET ts_epoch = ? WHERE id = ?', updates)
+        conn.commit()
+        logger.info(f"已为 {len(updates)} 条历史数据回填 ts_epoch")
+
+    @staticmethod
+    def _migrate_comfort_columns(conn: sqlite3.Connection):
+        """为旧版本数据库添加舒适度指标列（露点、绝对湿度、体感温度）"""
+        cursor = conn.cursor()
+        columns = [row[1] for row in cursor.execute('PRAGMA table_info(temperature_data)')]
+        for column in COMFORT_COLUMNS:
+            if column in columns:
+                continue
+            try:
+                cursor.execute(f'ALTER TABLE temperature_data ADD COLUMN {column} REAL')
+            except sqlite3.OperationalError as e:
+                # 采集服务和Web服务同时启动时可能已被另一进程添加
+                if 'duplicate column' not in str(e):
+                    raise
+        conn.commit()
+
+    def backfill_comfort_metrics(self, chunk_size: int = 20000) -> int:
+        """
+        为尚未计算舒适度指标的读数（升级前写入的数据）回填露点、绝对湿度和体感温度
+
+        没有需要回填的读数时立即返回；否则按 id 顺序分块回填，每块在单独的事务中写回，
+        可在后台线程中运行，与采集写入并行。Web进程通过 OffloadExecutor 直接执行 backfill_database
+
+        Args:
+            chunk_size: 每块的读数条数
+
+        Returns:
+            回填的条数
+        """
+        started = time.perf_counter()
+        try:
+            updated = backfill_database(self.db_path, chunk_size)
+        except Exception as e:
+            logger.error(f"回填舒适度指标失败: {e}")
+            return 0
+
+        if updated:
+            logger.info(f"已为 {updated} 条历史数据回填舒适度指标，用时 {time.perf_counter() - started:.1f} 秒")
+        return updated
+
+    def _update_coverage(self, cursor: sqlite3.Cursor, device_address: Optional[str], ts: float):
+        """
+        将一条读数并入设备的覆盖区间（与数据写入处于同一事务中）
+
+        Args:
+            cursor: 数据库游标
+            device_address: 设备地址
+            ts: 读数时间（epoch秒）
+        """
+        with self._coverage_lock:
+            interval = self._open_intervals.get(device_address)
+            if interval is None:
+                cursor.execute('''
+                    SELECT id, end_ts FROM coverage_intervals
+                    WHERE device_address IS ?
+                    ORDER BY end_ts DESC
+                    LIMIT 1
+                ''', (device_address,))
+                interval = cursor.fetchone()
+
+            if interval and interval[1] <= ts <= interval[1] + self.gap_threshold:
+                interval_id, end_ts = interval
+                cursor.execute('''
+                    UPDATE coverage_intervals
+                    SET end_ts = MAX(end_ts, ?), reading_count = reading_count + 1
+                    WHERE id = ?
+                ''', (ts, interval_id))
+                self._open_intervals[device_address] = (interval_id, max(end_ts, ts))
+            elif interval is None or ts > interval[1]:
+                cursor.execute('''
+                    INSERT INTO coverage_intervals (device_address, start_ts, end_ts, reading_count)
+                    VALUES (?, ?, ?, 1)
+                ''', (device_address, ts, ts))
+                self._open_intervals[device_address] = (cursor.lastrowid, ts)
+            else:
+                # 早于最新区间结束时间的乱序读数并入其所在时间段的区间
+                self._merge_coverage(cursor, device_address, ts, ts, 1)
+
+    def _merge_coverage_window(self, cursor: sqlite3.Cursor, device_address: Optional[str],
+                               timestamps: List[float]):
+        """
+        将回填写入的一批读数并入设备的覆盖区间（与数据写入处于同一事务中）
+
+        读数按间隔阈值分段，每段只与相邻的已有区间合并，不扫描原始数据
+
+        Args:
+            cursor: 数据库游标
+            device_address: 设备地址
+            timestamps: 实际写入的读数时间（epoch秒）
+        """
+        runs = []
+        for ts in sorted(timestamps):
+            if runs and ts - runs[-1][1] <= self.gap_threshold:
+                runs[-1][1] = ts
+                runs[-1][2] += 1
+            else:
+                runs.append([ts, ts, 1])
+        with self._coverage_lock:
+            for start_ts, end_ts, count in runs:
+                self._merge_coverage(cursor, device_address, start_ts, end_ts, count)
+
+    def _merge_coverage(self, cursor: sqlite3.Cursor, device_address: Optional[str],
+                        start_ts: float, end_ts: float, count: int):
+        """
+        将 [start_ts, end_ts] 内的 count 条读数与间隔阈值内的已有区间合并为一个区间（调用方需持有 _coverage_lock）
+        """
+        low = start_ts - self.gap_threshold
+        high = end_ts + self.gap_threshold
+        # 区间互不重叠，与 [low, high] 相交的区间为结束时间落在其中的区间，加上结束时间之后第一个开始不晚于 high 的区间，
+        # 两次查询都在 (device_address, end_ts) 索引上定位
+        rows = cursor.execute('''
+            SELECT id, start_ts, end_ts, reading_count FROM coverage_intervals
+            WHERE device_address IS ? AND end_ts BETWEEN ? AND ?
+        ''', (device_address, low, high)).fetchall()
+        following = cursor.execute('''
+            SELECT id, start_ts, end_ts, reading_count FROM coverage_intervals
+            WHERE device_address IS ? AND end_ts > ?
+            ORDER BY end_ts
+            LIMIT 1
+        ''', (device_address, high)).fetchone()
+        if following and following[1] <= high:
+            rows.append(following)
+        cached = self._open_intervals.get(device_address)
+
+        if not rows:
+            cursor.execute('''
+                INSERT INTO coverage_intervals (device_address, start_ts, end_ts, reading_count)
+                VALUES (?, ?, ?, ?)
+            ''', (device_address, start_ts, end_ts, count))
+            interval_id = cursor.lastrowid
+        else:
+            # 保留缓存中的最新区间的 id，其余合并的区间删除
+            keep = next((row for row in rows if cached and row[0] == cached[0]), rows[0])
+            interval_id = keep[0]
+            start_ts = min(start_ts, *(row[1] for row in rows))
+            end_ts = max(end_ts, *(row[2] for row in rows))
+            count += sum(row[3] for row in rows)
+            cursor.execute('''
+                UPDATE coverage_intervals SET start_ts = ?, end_ts = ?, reading_count = ?
+                WHERE id = ?
+            ''', (start_ts, end_ts, count, interval_id))
+            cursor.executemany('DELETE FROM coverage_intervals WHERE id = ?',
+                               [(row[0],) for row in rows if row[0] != interval_id])
+
+        if cached and (cached[0] == interval_id or end_ts >= cached[1]):
+            self._open_intervals[device_address] = (interval_id, end_ts)
+
+    def rebuild_coverage(self, device_address: Optional[str] = None):
+        """
+        根据历史数据重建覆盖区间索引
+
+        Args:
+            device_address: 只重建指定设备的区间，为空则重建全部设备
+        """
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
 
+            if device_address:
+                rows = cursor.execute('''
+                    SELECT device_address, ts_epoch FROM temperature_data
+                    WHERE device_address = ? AND ts_epoch IS NOT NULL
+                    ORDER BY ts_epoch
+                ''', (device_address,)).fetchall()
+            else:
+                rows = cursor.execute('''
+                    SELECT device_address, ts_epoch FROM temperature_data
+                    WHERE ts_epoch IS NOT NULL
+                    ORDER BY device_address, ts_epoch
+                ''').fetchall()
+
+            intervals = []
+            current = None
+            for device, ts in rows:
+                if current and current[0] == device and ts - current[2] <= self.gap_threshold:
+                    current[2] = ts
+                    current[3] += 1
+                else:
+                    if current:
+                        intervals.append(tuple(current))
+                    current = [device, ts, ts, 1]
+            if current:
+                intervals.append(tuple(current))
+
+            if device_address:
+                cursor.execute('DELETE FROM coverage_intervals WHERE device_address = ?', (device_address,))
+            else:
+                cursor.execute('DELETE FROM coverage_intervals')
+            cursor.executemany('''
+                INSERT INTO coverage_intervals (device_address, start_ts, end_ts, reading_count)
+                VALUES (?, ?, ?, ?)
+            ''', intervals)
+            conn.commit()
+            conn.close()
+
+            with self._coverage_lock:
+                if device_address:
+                    self._open_intervals.pop(device_address, None)
+                else:
+                    self._open_intervals.clear()
+            logger.info(f"覆盖区间索引重建完成，共 {len(intervals)} 个区间")
+
+        except Exception as e:
+            logger.error(f"重建覆盖区间索引失败: {e}")
+
+    @staticmethod
+    def _update_profiles(cursor: sqlite3.Cursor, device_address: Optional[str], ts: float,
+                         temperature: float, humidity: float):
+        """
+        将一条读数累加到热力图和周对比的聚合表（与数据写入处于同一事务中）
+
+        Args:
+            cursor: 数据库游标
+            device_address: 设备地址
+            ts: 读数时间（epoch秒）
+            temperature: 温度
+            humidity: 湿度
+        """
+        iso_year, iso_week, weekday, hour = profile_bucket(ts)
+        device_address = device_address or ''
+        cursor.execute('''
+            INSERT INTO hourly_profile (device_address, weekday, hour, reading_count, temperature_sum, humidity_sum)
+            VALUES (?, ?, ?, 1, ?, ?)
+            ON CONFLICT (device_address, weekday, hour) DO UPDATE SET
+                reading_count = reading_count + 1,
+                temperature_sum = temperature_sum + excluded.temperature_sum,
+                humidity_sum = humidity_sum + excluded.humidity_sum
+        ''', (device_address, weekday, hour, temperature, humidity))
+        cursor.execute('''
+            INSERT INTO weekly_profile
+            (device_address, iso_year, iso_week, weekday, hour, reading_count, temperature_sum, humidity_sum)
+            VALUES (?, ?, ?, ?, ?, 1, ?, ?)
+            ON CONFLICT (device_address, iso_year, iso_week, weekday, hour) DO UPDATE SET
+                reading_count = reading_count + 1,
+                temperature_sum = temperature_sum + excluded.temperature_sum,
+                humidity_sum = humidity_sum + excluded.humidity_sum
+        ''', (device_address, iso_year, iso_week, weekday, hour, temperature, humidity))
+
+    def rebuild_profiles(self):
+        """
+        根据历史数据重建热力图和周对比的聚合表
+
+        周分桶在一条 INSERT … SELECT … GROUP BY 中由 SQLite 汇总，不在Python中逐条遍历读数：
+        先按 (设备, 15分钟) 汇总，时区偏移都是15分钟的整数倍，同一个15分钟内的读数属于同一个分桶，
+        再按本地时间换算与 profile_bucket 一致的 ISO年、ISO周（所在周周四的年份和序号）、星期和小时；
+        小时分桶由周分桶再汇总一次
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM hourly_profile')
+            cursor.execute('DELETE FROM weekly_profile')
+            cursor.execute('''
+                INSERT INTO weekly_profile
+                (device_address, iso_year, iso_week, weekday, hour, reading_count, temperature_sum, humidity_sum)
+                WITH quarters AS (
+                    SELECT COALESCE(device_address, '') AS device_address,
+                           CAST(ts_epoch / 900 AS INTEGER) AS quarter,
+                           COUNT(*) AS reading_count,
+                           SUM(temperature) AS temperature_sum,
+                           SUM(humidity) AS humidity_sum
+                    FROM temperature_data
+                    WHERE ts_epoch IS NOT NULL
+                    GROUP BY 1, 2
+                ), local AS (
+                    SELECT device_address, reading_count, temperature_sum, humidity_sum,
+                           datetime(quarter * 900, 'unixepoch', 'localtime') AS local_time
+                    FROM quarters
+                ), buckets AS (
+                    SELECT *,
+                           (CAST(strftime('%w', local_time) AS INTEGER) + 6) % 7 AS weekday,
+                           CAST(strftime('%H', local_time) AS INTEGER) AS hour
+                    FROM local
+                ), weeks AS (
+                    SELECT *, date(local_time, '-' || weekday || ' days', '+3 days') AS thursday
+                    FROM buckets
+                )
+                SELECT device_address,
+                       CAST(strftime('%Y', thursday) AS INTEGER),
+                       (CAST(strftime('%j', thursday) AS INTEGER) - 1) / 7 + 1,
+                       weekday, hour,
+                       SUM(reading_count), SUM(temperature_sum), SUM(humidity_sum)
+                FROM weeks
+                GROUP BY 1, 2, 3, 4, 5
+            ''')
+            weeks = cursor.rowcount
+            cursor.execute('''
+                INSERT INTO hourly_profile (device_address, weekday, hour, reading_count, temperature_sum, humidity_sum)
+                SELECT device_address, weekday, hour, SUM(reading_count), SUM(temperature_sum), SUM(humidity_sum)
+                FROM weekly_profile
+                GROUP BY device_address, weekday, hour
+            ''')
+            conn.commit()
+            conn.close()
+            logger.info(f"聚合表重建完成，共 {weeks} 个周分桶")
+
+        except Exception as e:
+            logger.error(f"重建聚合表失败: {e}")
+
+    def _insert_reading(self, cursor: sqlite3.Cursor, data: TemperatureData, skip_existing: bool = False,
+                        ts_epoch: Optional[float] = None, comfort: Optional[tuple] = None,
+                        update_coverage: bool = True) -> bool:
+        """
+        写入一条读数并更新覆盖区间（不提交事务）
+
+        Args:
+            skip_existing: 为True时相同设备、相同时间的读数已存在则不写入
+            ts_epoch: 读数时间（epoch秒），为空时由 timestamp 换算
+            comfort: 按 COMFORT_COLUMNS 顺序的舒适度指标，为空时单独计算（批量写入时应整批预先计算）
+            update_coverage: 为False时不更新覆盖区间（回填的读数由调用方整批合并）
+
+        Returns:
+            是否写入
+        """
+        timestamp = data.timestamp or datetime.now()
+        if ts_epoch is None:
+            ts_epoch = to_epoch(timestamp)
+        if comfort is None:
+            comfort = compute_rows([data.temperature], [data.humidity])[0]
+        values = (
+            timestamp.isoformat(),
+            data.temperature,
+            data.humidity,
+            data.battery,
+            data.voltage,
+            data.device_name,
+            data.device_address,
+            ts_epoch
+        ) + tuple(comfort)
+        if skip_existing:
             cursor.execute('''
                 INSERT INTO temperature_data
-                (timestamp, temperature, humidity, battery, voltage, device_name, device_address)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                data.timestamp.isoformat() if data.timestamp else datetime.now().isoformat(),
-                data.temperature,
-                data.humidity,
-                data.battery,
-                data.voltage,
-                data.device_name,
-                data.device_address
-            ))
+                (timestamp, temperature, humidity, battery, voltage, device_name, device_address, ts_epoch,
+                 dew_point, absolute_humidity, heat_index)
+                SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM temperature_data WHERE device_address IS ? AND ts_epoch = ?
+                )
+            ''', values + (data.device_address, ts_epoch))
+            if cursor.rowcount == 0:
+                return False
+        else:
+            cursor.execute('''
+                INSERT INTO temperature_data
+                (timestamp, temperature, humidity, battery, voltage, device_name, device_address, ts_epoch,
+                 dew_point, absolute_humidity, heat_index)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', values)
+        if update_coverage:
+            self._update_coverage(cursor, data.device_address, ts_epoch)
+        self._update_profiles(cursor, data.device_address, ts_epoch, data.temperature, data.humidity)
+        return True
+
+    def save_data(self, data: TemperatureData) -> bool:
+        """保存温度数据"""
+        return self.save_batch([data])
+
+    def save_batch(self, batch: List[TemperatureData], skip_existing: bool = False) -> bool:
+        """
+        在同一个事务中保存多条温度数据
+
+        Args:
+            batch: 温度数据列表
+            skip_existing: 跳过数据库中已存在的读数（重放缓冲区数据时使用）
+
+        Returns:
+            是否保存成功
+        """
+        try:
+            self.write_batch(batch, skip_existing)
+            return True
+        except Exception as e:
+            logger.error(f"保存数据失败: {e}")
+            return False
+
+    def write_batch(self, batch: List[TemperatureData], skip_existing: bool = False):
+        """
+        与 save_batch 相同，写入失败时回滚事务并抛出异常，由调用方区分错误类型
+
+        Raises:
+            sqlite3.Error: 数据库错误
+            ValueError, TypeError: 读数字段无效
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+
+            # 整批一次计算舒适度指标
+            comfort = compute_rows([data.temperature for data in batch], [data.humidity for data in batch])
+            for data, metrics in zip(batch, comfort):
+                self._insert_reading(cursor, data, skip_existing, comfort=metrics)
 
             conn.commit()
+        except Exception:
+            # 事务未提交，丢弃可能已失效的覆盖区间缓存
+            with self._coverage_lock:
+                self._open_intervals.clear()
+            raise
+        finally:
             conn.close()
-            logger.debug(f"数据已保存: {data}")
+        logger.debug(f"数据已保存: {len(batch)} 条")
+
+    def save_history(self, records: List[TemperatureData]) -> int:
+        """
+        批量写入从设备存储中下载的历史读数（单个事务）
+
+        按 (device_address, ts_epoch) 去重，已存在的读数不会重复写入；
+        历史读数可能落在已有覆盖区间之间，在同一事务中与相邻的覆盖区间合并
+
+        Returns:
+            实际写入的条数
+        """
+        if not records:
+            return 0
+
+        conn = sqlite3.connect(self.db_path)
+        # 按设备记录实际写入的读数时间，用于 backfill_log 和覆盖区间
+        inserted_by_device: Dict[Optional[str], List[float]] = {}
+        try:
+            cursor = conn.cursor()
+            comfort = compute_rows([data.temperature for data in records], [data.humidity for data in records])
+            for data, metrics in zip(records, comfort):
+                ts_epoch = to_epoch(data.timestamp)
+                cursor.execute('''
+                    INSERT INTO temperature_data
+                    (timestamp, temperature, humidity, battery, voltage, device_name, device_address, ts_epoch,
+                     dew_point, absolute_humidity, heat_index)
+                    SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM temperature_data WHERE device_address IS ? AND ts_epoch = ?
+                    )
+                ''', (
+                    data.timestamp.isoformat(),
+                    data.temperature,
+                    data.humidity,
+                    data.battery,
+                    data.voltage,
+                    data.device_name,
+                    data.device_address,
+                    ts_epoch,
+                    *metrics,
+                    data.device_address,
+                    ts_epoch
+                ))
+                if cursor.rowcount:
+                    inserted_by_device.setdefault(data.device_address, []).append(ts_epoch)
+                    self._update_profiles(cursor, data.device_address, ts_epoch, data.temperature, data.humidity)
+
+            if inserted_by_device:
+                groups = self._group_timestamps(records)
+                cursor.executemany('''
+                    INSERT INTO backfill_log (device_address, start_ts, end_ts, inserted)
+                    VALUES (?, ?, ?, ?)
+                ''', [
+                    (device_address, to_epoch(min(groups[device_address])), to_epoch(max(groups[device_address])),
+                     len(times))
+                    for device_address, times in inserted_by_device.items()
+                ])
+                for device_address, times in inserted_by_device.items():
+                    self._merge_coverage_window(cursor, device_address, times)
+            conn.commit()
 
         except Exception as e:
-            logger.error(f"保存数据失败: {e}")
+            conn.rollback()
+            # 事务未提交，丢弃可能已失效的覆盖区间缓存
+            with self._coverage_lock:
+                self._open_intervals.clear()
+            logger.error(f"保存历史数据失败: {e}")
+            return 0
+        finally:
+            conn.close()
+
+        return sum(len(times) for times in inserted_by_device.values())
 
-    def get_latest_data(self, limit: int = 1) -> list:
-        """获取最新的温度数据"""
+    @staticmethod
+    def _group_timestamps(records: List[TemperatureData]) -> Dict[Optional[str], List[datetime]]:
+        """按设备分组读数时间"""
+        groups: Dict[Optional[str], List[datetime]] = {}
+        for data in records:
+            groups.setdefault(data.device_address, []).append(data.timestamp)
+        return groups
+
+    def get_backfill_revision(self) -> int:
+        """历史记录回填的版本号（每次回填递增），没有回填过时为0"""
+        try:
+            with self._read_pool.connection() as conn:
+                return conn.execute('SELECT COALESCE(MAX(id), 0) FROM backfill_log').fetchone()[0]
+        except Exception as e:
+            logger.error(f"获取回填版本失败: {e}")
+            return 0
+
+    def get_last_epoch(self, device_address: str, before: Optional[float] = None) -> Optional[float]:
+        """
+        获取设备最后一条读数的时间（epoch秒）
+
+        Args:
+            device_address: 设备地址
+            before: 只考虑早于该时间的读数
+        """
+        try:
+            with self._read_pool.connection() as conn:
+                cursor = conn.cursor()
+                if before is None:
+                    cursor.execute(
+                        'SELECT MAX(ts_epoch) FROM temperature_data WHERE device_address = ?',
+                        (device_address,)
+                    )
+                else:
+                    cursor.execute(
+                        'SELECT MAX(ts_epoch) FROM temperature_data WHERE device_address = ? AND ts_epoch < ?',
+                        (device_address, before)
+                    )
+                return cursor.fetchone()[0]
+
+        except Exception as e:
+            logger.error(f"获取最后读数时间失败: {e}")
+            return None
+
+    def get_rows_after_id(self, after_id: int, limit: int = 2000) -> Tuple[list, int]:
+        """
+        按本地 id 顺序读取 after_id 之后的读数（联邦同步的增量数据，包括回填的历史记录）
+
+        Args:
+            after_id: 已同步的最大 id
+            limit: 最多返回的条数
+
+        Returns:
+            (读数列表, 其中最大的 id)，每条读数的列顺序为 federation_sync.SYNC_COLUMNS
+        """
+        try:
+            with self._read_pool.connection() as conn:
+                rows = conn.execute('''
+                    SELECT id, timestamp, temperature, humidity, battery, voltage, device_name, device_address, ts_epoch
+                    FROM temperature_data
+                    WHERE id > ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (after_id, limit)).fetchall()
+        except Exception as e:
+            logger.error(f"读取待同步数据失败: {e}")
+            return [], after_id
+
+        if not rows:
+            return [], after_id
+        return [list(row[1:]) for row in rows], rows[-1][0]
+
+    def get_sync_hosts(self) -> list:
+        """汇聚模式下各采集主机的同步进度"""
+        try:
+            with self._read_pool.connection() as conn:
+                rows = conn.execute('''
+                    SELECT host_id, last_id, received, inserted, last_sync_at FROM sync_hosts ORDER BY host_id
+                ''').fetchall()
+        except Exception as e:
+            logger.error(f"获取同步主机列表失败: {e}")
+            return []
+        return [
+            {'host_id': row[0], 'last_id': row[1], 'received': row[2], 'inserted': row[3], 'last_sync_at': row[4]}
+            for row in rows
+        ]
+
+    def get_sync_last_id(self, host_id: str) -> int:
+        """采集主机已合并的 id 高水位，未同步过时为0"""
+        with self._read_pool.connection() as conn:
+            row = conn.execute('SELECT last_id FROM sync_hosts WHERE host_id = ?', (host_id,)).fetchone()
+        return row[0] if row else 0
+
+    def merge_remote_batch(self, host_id: str, after_id: int, last_id: int, rows: list) -> dict:
+        """
+        合并采集主机推送的一批读数（单个事务），按 (device_address, ts_epoch) 去重，重复推送不会重复写入
+
+        Args:
+            host_id: 采集主机标识
+            after_id: 这批数据之前的高水位，必须不大于已合并的高水位，否则说明中间有数据缺失
+            last_id: 这批数据中最大的本地 id
+            rows: 列顺序为 federation_sync.SYNC_COLUMNS 的读数列表
+
+        Returns:
+            {'last_id': 合并后的高水位, 'inserted': 新写入的条数, 'accepted': 是否合并}
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
         try:
-            conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            row = cursor.execute('SELECT last_id FROM sync_hosts WHERE host_id = ?', (host_id,)).fetchone()
+            current = row[0] if row else 0
+            if after_id > current:
+                # 采集主机认为已同步的数据汇聚端没有（如汇聚端数据库被替换），由采集主机从汇聚端的高水位重新推送
+                conn.rollback()
+                return {'last_id': current, 'inserted': 0, 'accepted': False}
+
+            # 汇聚端已有更新读数的设备，写入的读数早于最新读数时记录回填，浏览器缓存据此重新加载
+            latest = {}
+            for device_address in {row[6] for row in rows}:
+                latest[device_address] = cursor.execute(
+                    'SELECT MAX(ts_epoch) FROM temperature_data WHERE device_address IS ?', (device_address,)
+                ).fetchone()[0]
+
+            inserted = 0
+            backfilled: Dict[Optional[str], List[float]] = {}
+            # 舒适度指标不随同步传输，由汇聚端整批重新计算
+            comfort = compute_rows([row[1] for row in rows], [row[2] for row in rows])
+            for row, metrics in zip(rows, comfort):
+                timestamp, temperature, humidity, battery, voltage, name, device_address, ts_epoch = row
+                data = TemperatureData(
+                    temperature=temperature, humidity=humidity, battery=battery, voltage=voltage,
+                    timestamp=datetime.fromisoformat(timestamp), device_name=name, device_address=device_address
+                )
+                is_backfill = latest[device_address] is not None and ts_epoch < latest[device_address]
+                if self._insert_reading(cursor, data, skip_existing=True, ts_epoch=ts_epoch, comfort=metrics,
+                                        update_coverage=not is_backfill):
+                    inserted += 1
+                    if is_backfill:
+                        backfilled.setdefault(device_address, []).append(ts_epoch)
 
+            if backfilled:
+                cursor.executemany('''
+                    INSERT INTO backfill_log (device_address, start_ts, end_ts, inserted)
+                    VALUES (?, ?, ?, ?)
+                ''', [(device_address, min(times), max(times), len(times))
+                      for device_address, times in backfilled.items()])
+                # 早于最新读数的读数可能落在已有覆盖区间之间，整批与相邻的覆盖区间合并
+                for device_address, times in backfilled.items():
+                    self._merge_coverage_window(cursor, device_address, times)
+
+            last_id = max(current, last_id)
             cursor.execute('''
-                SELECT timestamp, temperature, humidity, battery, voltage, device_name, device_address
-                FROM temperature_data
-                ORDER BY created_at DESC
-                LIMIT ?
-            ''', (limit,))
+                INSERT INTO sync_hosts (host_id, last_id, received, inserted, last_sync_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(host_id) DO UPDATE SET
+                    last_id = excluded.last_id,
+                    received = received + excluded.received,
+                    inserted = inserted + excluded.inserted,
+                    last_sync_at = excluded.last_sync_at
+            ''', (host_id, last_id, len(rows), inserted))
+            conn.commit()
 
-            rows = cursor.fetchall()
+        except Exception:
+            conn.rollback()
+            # 事务未提交，丢弃可能已失效的覆盖区间缓存
+            with self._coverage_lock:
+                self._open_intervals.clear()
+            raise
+        finally:
             conn.close()
 
+        return {'last_id': last_id, 'inserted': inserted, 'accepted': True}
+
+    def get_pool_stats(self) -> dict:
+        """获取只读连接池的统计信息（含等待次数和等待时间）"""
+        return self._read_pool.stats()
+
+    def get_latest_data(self, limit: int = 1, device_address: Optional[str] = None) -> list:
+        """
+        获取最新的温度数据
+
+        Args:
+            limit: 返回条数
+            device_address: 仅返回指定设备的数据，为空则不区分设备
+        """
+        try:
+            with self._read_pool.connection() as conn:
+                cursor = conn.cursor()
+
+                if device_address:
+                    # 使用 (device_address, ts_epoch) 复合索引倒序扫描
+                    cursor.execute('''
+                        SELECT timestamp, temperature, humidity, battery, voltage, device_name, device_address
+                        FROM temperature_data
+                        WHERE device_address = ?
+                        ORDER BY ts_epoch DESC
+                        LIMIT ?
+                    ''', (device_address, limit))
+                else:
+                    # 回填和联邦同步会以新的 id 写入较早的读数，按 ts_epoch 索引倒序扫描取读数时间最新的数据
+                    cursor.execute('''
+                        SELECT timestamp, temperature, humidity, battery, voltage, device_name, device_address
+                        FROM temperature_data
+                        ORDER BY ts_epoch DESC
+                        LIMIT ?
+                    ''', (limit,))
+
+                rows = cursor.fetchall()
+
             result = []
             for row in rows:
                 result.append({
@@ -503,25 +1690,26 @@ class TemperatureDataStorage:
             logger.error(f"获取数据失败: {e}")
             return []
 
-    def get_data_by_time_range(self, start_time: datetime, end_time: datetime) -> list:
-        """根据时间范围获取数据"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                SELECT timestamp, temperature, humidity, battery, voltage, device_name, device_address
-                FROM temperature_data
-                WHERE timestamp BETWEEN ? AND ?
-                ORDER BY timestamp DESC
-            ''', (start_time.isoformat(), end_time.isoformat()))
+    def get_data_by_time_range(self, start_time: datetime, end_time: datetime,
+                               device_address: Optional[str] = None, comfort: bool = False) -> list:
+        """
+        根据时间范围获取数据
 
-            rows = cursor.fetchall()
-            conn.close()
+        Args:
+            start_time: 开始时间
+            end_time: 结束时间
+            device_address: 仅返回指定设备的数据，为空则返回所有设备
+            comfort: 是否包含舒适度指标（dew_point、absolute_humidity、heat_index）
+        """
+        try:
+            with self._read_pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute_time_range(cursor, start_time, end_time, device_address)
+                rows = cursor.fetchall()
 
             result = []
             for row in rows:
-                result.append({
+                item = {
                     'timestamp': row[0],
                     'temperature': row[1],
                     'humidity': row[2],
@@ -529,7 +1717,10 @@ class TemperatureDataStorage:
                     'voltage': row[4],
                     'device_name': row[5],
                     'device_address': row[6]
-                })
+                }
+                if comfort:
+                    item.update(zip(COMFORT_COLUMNS, row[7:]))
+                result.append(item)
 
             return result
 
@@ -537,24 +1728,125 @@ class TemperatureDataStorage:
             logger.error(f"获取数据失败: {e}")
             return []
 
-    def get_data_time_range(self) -> dict:
-        """获取数据库中数据的时间范围"""
+    def get_columns_by_time_range(self, start_time: datetime, end_time: datetime,
+                                  device_address: Optional[str] = None) -> ColumnarData:
+        """
+        根据时间范围获取列式数据，不构造逐行字典，用于导出等需要交给工作进程处理的大批量数据
+
+        Args:
+            start_time: 开始时间
+            end_time: 结束时间
+            device_address: 仅返回指定设备的数据，为空则返回所有设备
+        """
+        columns = ColumnarData()
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self._read_pool.connection() as conn:
+                cursor = conn.cursor()
+                self._execute_time_range(cursor, start_time, end_time, device_address)
+                while True:
+                    rows = cursor.fetchmany(5000)
+                    if not rows:
+                        break
+                    columns.extend_rows(rows)
 
-            cursor.execute('''
-                SELECT MIN(timestamp), MAX(timestamp), COUNT(*)
+        except Exception as e:
+            logger.error(f"获取数据失败: {e}")
+            return ColumnarData()
+
+        return columns
+
+    @staticmethod
+    def _execute_time_range(cursor: sqlite3.Cursor, start_time: datetime, end_time: datetime,
+                            device_address: Optional[str] = None):
+        """
+        执行时间范围查询，结果列顺序为 offload.COLUMNS + offload.DERIVED_COLUMNS
+
+        时间参数统一换算为epoch秒后在 ts_epoch 索引上做范围扫描，带时区与不带时区（本地时间）的参数均可
+        """
+        cursor.execute(*TemperatureDataStorage._time_range_query(start_time, end_time, device_address))
+
+    @staticmethod
+    def _time_range_query(start_time: datetime, end_time: datetime,
+                          device_address: Optional[str] = None) -> Tuple[str, tuple]:
+        """生成时间范围查询的SQL和参数"""
+        if device_address:
+            return '''
+                SELECT timestamp, temperature, humidity, battery, voltage, device_name, device_address,
+                       dew_point, absolute_humidity, heat_index
                 FROM temperature_data
-            ''')
+                WHERE device_address = ? AND ts_epoch BETWEEN ? AND ?
+                ORDER BY ts_epoch DESC
+            ''', (device_address, to_epoch(start_time), to_epoch(end_time))
+        return '''
+                SELECT timestamp, temperature, humidity, battery, voltage, device_name, device_address,
+                       dew_point, absolute_humidity, heat_index
+                FROM temperature_data
+                WHERE ts_epoch BETWEEN ? AND ?
+                ORDER BY ts_epoch DESC
+            ''', (to_epoch(start_time), to_epoch(end_time))
 
-            row = cursor.fetchone()
-            conn.close()
+    def get_history_json(self, start_time: datetime, end_time: datetime,
+                         device_address: Optional[str] = None, comfort: bool = False) -> bytes:
+        """
+        根据时间范围获取数据，直接返回JSON数组（UTF-8编码）
 
-            if row and row[0] and row[1]:
+        由 SQLite 的 JSON1 函数在查询中拼接JSON，不在Python中逐行构造字典；
+        SQLite 未编译 JSON1 时退回 get_data_by_time_range + 序列化。结果与 get_data_by_time_range 相同
+
+        Args:
+            start_time: 开始时间
+            end_time: 结束时间
+            device_address: 仅返回指定设备的数据，为空则返回所有设备
+            comfort: 是否包含舒适度指标（dew_point、absolute_humidity、heat_index）
+        """
+        sql, params = self._time_range_query(start_time, end_time, device_address)
+        comfort_fields = ''.join(f", '{column}', {column}" for column in COMFORT_COLUMNS) if comfort else ''
+        try:
+            with self._read_pool.connection() as conn:
+                row = conn.execute(f'''
+                    SELECT json_group_array(json_object(
+                        'timestamp', timestamp, 'temperature', temperature, 'humidity', humidity,
+                        'battery', battery, 'voltage', voltage,
+                        'device_name', device_name, 'device_address', device_address{comfort_fields}
+                    )) FROM ({sql})
+                ''', params).fetchone()
+            return row[0].encode('utf-8')
+        except sqlite3.OperationalError as e:
+            logger.debug(f"SQLite JSON1 不可用，使用Python序列化: {e}")
+        except Exception as e:
+            logger.error(f"获取数据失败: {e}")
+            return b'[]'
+        return fast_json.dumps_bytes(self.get_data_by_time_range(start_time, end_time, device_address, comfort))
+
+    def get_data_time_range(self, device_address: Optional[str] = None) -> dict:
+        """
+        获取数据库中数据的时间范围
+
+        Args:
+            device_address: 仅统计指定设备，为空则统计所有设备
+        """
+        try:
+            with self._read_pool.connection() as conn:
+                cursor = conn.cursor()
+
+                if device_address:
+                    cursor.execute('''
+                        SELECT MIN(ts_epoch), MAX(ts_epoch), COUNT(*)
+                        FROM temperature_data
+                        WHERE device_address = ?
+                    ''', (device_address,))
+                else:
+                    cursor.execute('''
+                        SELECT MIN(ts_epoch), MAX(ts_epoch), COUNT(*)
+                        FROM temperature_data
+                    ''')
+
+                row = cursor.fetchone()
+
+            if row and row[0] is not None and row[1] is not None:
                 return {
-                    'earliest': row[0],
-                    'latest': row[1],
+                    'earliest': datetime.fromtimestamp(row[0]).isoformat(),
+                    'latest': datetime.fromtimestamp(row[1]).isoformat(),
                     'count': row[2]
                 }
             else:
@@ -572,5 +1864,471 @@ class TemperatureDataStorage:
                 'count': 0
             }
 
+    def get_devices(self) -> list:
+        """
+        获取所有设备及其最新读数
+
+        设备列表来自覆盖区间表（每个设备只有少量区间行），
+        每个设备的最新读数通过 (device_address, ts_epoch) 复合索引定位
+        """
+        try:
+            with self._read_pool.connection() as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    SELECT device_address, SUM(reading_count)
+                    FROM coverage_intervals
+                    GROUP BY device_address
+                ''')
+                devices = cursor.fetchall()
+
+                result = []
+                for device_address, reading_count in devices:
+                    if device_address is None:
+                        continue
+                    cursor.execute('''
+                        SELECT timestamp, temperature, humidity, battery, voltage, device_name
+                        FROM temperature_data
+                        WHERE device_address = ?
+                        ORDER BY ts_epoch DESC
+                        LIMIT 1
+                    ''', (device_address,))
+                    row = cursor.fetchone()
+                    if not row:
+                        continue
+                    result.append({
+                        'device_address': device_address,
+                        'device_name': row[5],
+                        'reading_count': reading_count,
+                        'latest': {
+                            'timestamp': row[0],
+                            'temperature': row[1],
+                            'humidity': row[2],
+                            'battery': row[3],
+                            'voltage': row[4]
+                        }
+                    })
+
+            return result
+
+        except Exception as e:
+            logger.error(f"获取设备列表失败: {e}")
+            return []
+
+    def get_coverage(self, start_time: datetime, end_time: datetime, device_address: Optional[str] = None) -> list:
+        """
+        获取时间范围内各设备的数据覆盖区间、缺口和完整度
+
+        只读取与范围重叠的覆盖区间行，不扫描原始数据
+
+        Args:
+            start_time: 开始时间
+            end_time: 结束时间
+            device_address: 仅统计指定设备，为空则统计所有设备
+
+        Returns:
+            每个设备一项的覆盖信息列表
+        """
+        range_start = to_epoch(start_time)
+        range_end = to_epoch(end_time)
+        try:
+            with self._read_pool.connection() as conn:
+                cursor = conn.cursor()
+
+                query = '''
+                    SELECT device_address, start_ts, end_ts, reading_count
+                    FROM coverage_intervals
+                    WHERE end_ts >= ? AND start_ts <= ?
+                '''
+                params = [range_start, range_end]
+                if device_address:
+                    query += ' AND device_address = ?'
+                    params.append(device_address)
+                query += ' ORDER BY device_address, start_ts'
+
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+
+            devices: Dict[Optional[str], list] = {}
+            for address, start_ts, end_ts, count in rows:
+                devices.setdefault(address, []).append((max(start_ts, range_start), min(end_ts, range_end), count))
+
+            def to_iso(ts: float) -> str:
+                return datetime.fromtimestamp(ts).isoformat()
+
+            result = []
+            for address, intervals in devices.items():
+                gaps = []
+                covered = 0.0
+                cursor_ts = range_start
+                for start_ts, end_ts, _ in intervals:
+                    if start_ts - cursor_ts > self.gap_threshold:
+                        gaps.append((cursor_ts, start_ts))
+                    # 区间按开始时间排序，只累加超出已统计部分的时长，重叠的区间（如实时区间与回填区间）不会重复计算
+                    covered += max(0.0, end_ts - max(start_ts, cursor_ts))
+                    cursor_ts = max(cursor_ts, end_ts)
+                if range_end - cursor_ts > self.gap_threshold:
+                    gaps.append((cursor_ts, range_end))
+
+                result.append({
+                    'device_address': address,
+                    'intervals': [
+                        {'start': to_iso(start_ts), 'end': to_iso(end_ts), 'count': count}
+                        for start_ts, end_ts, count in intervals
+                    ],
+                    'gaps': [
+                        {'start': to_iso(start_ts), 'end': to_iso(end_ts), 'duration': round(end_ts - start_ts)}
+                        for start_ts, end_ts in gaps
+                    ],
+                    'covered_seconds': round(covered),
+                    'completeness': round(covered / (range_end - range_start), 4) if range_end > range_start else 0
+                })
+
+            return result
+
+        except Exception as e:
+            logger.error(f"获取数据覆盖信息失败: {e}")
+            return []
+
+    def get_downsampled(self, start_ts: float, end_ts: float, bucket: float, metrics: Sequence[str],
+                        device_address: Optional[str] = None) -> dict:
+        """
+        按固定时间桶在SQL中聚合（平均值）时间范围内的读数，返回列式数据
+
+        时间桶按epoch对齐（不随查询起点变化），轮询时相同的桶得到相同的结果；
+        查询只返回每个桶一行，结果行数约为 (end_ts - start_ts) / bucket
+
+        Args:
+            start_ts: 开始时间（epoch秒，含）
+            end_ts: 结束时间（epoch秒，不含）
+            bucket: 时间桶长度（秒）
+            metrics: 指标列，offload.NUMERIC_COLUMNS 中的若干个
+            device_address: 仅统计指定设备，为空则统计所有设备
+
+        Returns:
+            {'time': 各桶起始时间（epoch毫秒）, 指标: 各桶平均值（无数据为None）}
+        """
+        metrics = [metric for metric in metrics if metric in NUMERIC_COLUMNS]
+        result = {'time': []}
+        result.update((metric, []) for metric in metrics)
+        averages = ''.join(f', AVG({metric})' for metric in metrics)
+        query = f'''
+            SELECT CAST(ts_epoch / ? AS INTEGER) AS bucket{averages}
+            FROM temperature_data
+            WHERE ts_epoch >= ? AND ts_epoch < ?
+        '''
+        params = [bucket, start_ts, end_ts]
+        if device_address:
+            query += ' AND device_address = ?'
+            params.append(device_address)
+        query += ' GROUP BY bucket ORDER BY bucket'
+
+        try:
+            with self._read_pool.connection() as conn:
+                rows = conn.execute(query, params).fetchall()
+        except Exception as e:
+            logger.error(f"获取降采样数据失败: {e}")
+            return result
+
+        bucket_ms = bucket * 1000
+        times = result['time']
+        columns = [result[metric] for metric in metrics]
+        for row in rows:
+            times.append(int(row[0] * bucket_ms))
+            for column, value in zip(columns, row[1:]):
+                column.append(value if value is None else round(value, 3))
+        return result
+
+    def get_heatmap(self, metric: str = 'temperature', device_address: Optional[str] = None,
+                    weeks: Optional[int] = None) -> dict:
+        """
+        获取 星期 × 小时 的平均值矩阵（7×24，星期从周一开始），无论历史数据有多少，结果大小固定
+
+        Args:
+            metric: 指标，PROFILE_METRICS 中的一个
+            device_address: 仅统计指定设备，为空则统计所有设备（按读数条数加权）
+            weeks: 只统计最近若干个ISO周（含本周），为空则统计全部历史
+
+        Returns:
+            {'metric', 'weeks', 'values': 7×24 平均值（无数据为None）, 'counts': 7×24 读数条数}
+        """
+        column = self.PROFILE_METRICS[metric]
+        values = [[None] * 24 for _ in range(7)]
+        counts = [[0] * 24 for _ in range(7)]
+        try:
+            if weeks:
+                first_year, first_week, _ = (datetime.now() - timedelta(weeks=weeks - 1)).isocalendar()
+                query = f'''
+                    SELECT weekday, hour, SUM(reading_count), SUM({column})
+                    FROM weekly_profile
+                    WHERE (iso_year, iso_week) >= (?, ?)
+                '''
+                params = [first_year, first_week]
+            else:
+                query = f'''
+                    SELECT weekday, hour, SUM(reading_count), SUM({column})
+                    FROM hourly_profile
+                    WHERE 1
+                '''
+                params = []
+            if device_address:
+                query += ' AND device_address = ?'
+                params.append(device_address)
+            query += ' GROUP BY weekday, hour'
+
+            with self._read_pool.connection() as conn:
+                rows = conn.execute(query, params).fetchall()
+
+            for weekday, hour, count, total in rows:
+                counts[weekday][hour] = count
+                values[weekday][hour] = round(total / count, 2) if count else None
+
+        except Exception as e:
+            logger.error(f"获取热力图数据失败: {e}")
+
+        return {'metric': metric, 'weeks': weeks, 'values': values, 'counts': counts}
+
+    def get_week_comparison(self, metric: str = 'temperature', device_address: Optional[str] = None,
+                            reference: Optional[datetime] = None, weeks: int = 2) -> dict:
+        """
+        获取连续若干个ISO周的逐小时平均值（每周 7×24=168 个点），用于本周与前几周的叠加对比
+
+        Args:
+            metric: 指标，PROFILE_METRICS 中的一个
+            device_address: 仅统计指定设备，为空则统计所有设备（按读数条数加权）
+            reference: 最近一周所在的时间，默认为当前时间
+            weeks: 周数（含最近一周）
+
+        Returns:
+            {'metric', 'weeks': [{'week': '2026-W42', 'start': 周一日期, 'values': 168个平均值（无数据为None）}]}，
+            最近一周在前；第 i 个值为周一 00:00 起的第 i 个小时
+        """
+        column = self.PROFILE_METRICS[metric]
+        reference = reference or datetime.now()
+        monday = (reference - timedelta(days=reference.weekday())).date()
+        result = []
+        index = {}
+        for offset in range(weeks):
+            start = monday - timedelta(weeks=offset)
+            iso_year, iso_week, _ = start.isocalendar()
+            index[(iso_year, iso_week)] = len(result)
+            result.append({'week': f'{iso_year}-W{iso_week:02d}', 'start': start.isoformat(), 'values': [None] * 168})
+
+        last_year, last_week = next(iter(index))
+        first_year, first_week = list(index)[-1]
+        try:
+            query = f'''
+                SELECT iso_year, iso_week, weekday, hour, SUM(reading_count), SUM({column})
+                FROM weekly_profile
+                WHERE (iso_year, iso_week) BETWEEN (?, ?) AND (?, ?)
+            '''
+            params = [first_year, first_week, last_year, last_week]
+            if device_address:
+                query += ' AND device_address = ?'
+                params.append(device_address)
+            query += ' GROUP BY iso_year, iso_week, weekday, hour'
+
+            with self._read_pool.connection() as conn:
+                rows = conn.execute(query, params).fetchall()
+
+            for iso_year, iso_week, weekday, hour, count, total in rows:
+                if count:
+                    result[index[(iso_year, iso_week)]]['values'][weekday * 24 + hour] = round(total / count, 2)
+
+        except Exception as e:
+            logger.error(f"获取周对比数据失败: {e}")
+
+        return {'metric': metric, 'weeks': result}
+
+class AsyncTemperatureDataStorage:
+    """
+    异步温度数据存储
+
+    写入由专用写线程串行执行，事件循环只需将数据放入队列并等待结果，
+    不会因数据库写入阻塞蓝牙通知的处理。Flask线程继续使用同步的 TemperatureDataStorage。
+
+    配置了落盘缓冲区（IngestionSpool）时，读数追加到缓冲区后立即返回，写线程从缓冲区读出数据写入数据库，
+    写入失败时保留数据并重试，进程重启后继续写入未确认的数据。
+    """
+
+    # 由读数本身导致、重试也不会成功的错误；其他错误（数据库锁定、不可用、磁盘错误等）一直重试
+    READING_ERRORS = (sqlite3.IntegrityError, sqlite3.InterfaceError, ValueError, TypeError)
+
+    def __init__(self, storage: TemperatureDataStorage, batch_size: int = 100, spool=None,
+                 retry_interval: float = 1.0, max_retry_interval: float = 30.0):
+        """
+        初始化异步数据存储
+
+        Args:
+            storage: 同步数据存储
+            batch_size: 写线程单个事务最多合并的数据条数
+            spool: 落盘缓冲区（IngestionSpool），为空时使用内存队列
+            retry_interval: 使用缓冲区时数据库写入失败后的首次重试间隔（秒），之后逐次加倍
+            max_retry_interval: 最长重试间隔（秒）
+        """
+        self.storage = storage
+        self.batch_size = batch_size
+        self.spool = spool
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._stopping = threading.Event()
+        target = self._spool_writer_loop if spool is not None else self._writer_loop
+        self._thread = threading.Thread(target=target, name='storage-writer', daemon=True)
+        self._thread.start()
+
+    async def save_data(self, data: TemperatureData) -> bool:
+        """
+        保存温度数据，在写线程完成提交后返回（使用缓冲区时在追加到缓冲区后返回）
+
+        Returns:
+            是否保存成功
+        """
+        if self.spool is not None:
+            return self._append_to_spool(data)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((data, loop, future))
+        return await future
+
+    def save_data_nowait(self, data: TemperatureData):
+        """将温度数据放入写队列后立即返回，不等待写入结果"""
+        if self.spool is not None:
+            self._append_to_spool(data)
+            return
+        self._queue.put((data, None, None))
+
+    def _append_to_spool(self, data: TemperatureData) -> bool:
+        try:
+            self.spool.append(data)
+            return True
+        except Exception as e:
+            logger.error(f"写入缓冲区失败: {e}")
+            return False
+
+    async def get_latest_data(self, limit: int = 1) -> list:
+        """在线程池中获取最新的温度数据"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.storage.get_latest_data, limit)
+
+    def pending(self) -> int:
+        """写队列中尚未处理的数据条数"""
+        if self.spool is not None:
+            return self.spool.pending()
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        """写入统计"""
+        if self.spool is not None:
+            return self.spool.stats()
+        return {'pending': self._queue.qsize()}
+
+    def close(self, timeout: Optional[float] = None):
+        """写完队列中剩余的数据后停止写线程（缓冲区中未能写入的数据保留到下次启动）"""
+        self._stopping.set()
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self.spool is not None:
+            self.spool.close()
+
+    def _spool_writer_loop(self):
+        """
+        写线程：从缓冲区读出数据写入数据库，成功后确认，失败时保留数据并重试
+
+        只有读数本身导致的错误（READING_ERRORS，如字段无效）累计 spool.max_attempts 次后才逐条写入该批读数，
+        仍无法写入的读数移入死信文件，不再阻塞后续数据；数据库锁定、无法打开、磁盘错误或已满等
+        其他错误按退避间隔一直重试，读数保留在缓冲区中不会丢失
+        """
+        delay = self.retry_interval
+        failures = 0  # 当前批次因读数错误失败的次数
+        dead_lettered: set = set()  # 当前批次中已移入死信文件的读数序号，重试时不会重复写入死信文件
+        while True:
+            replaying = self.spool.replaying
+            batch, position = self.spool.read_batch(self.batch_size, timeout=0.5)
+            if not batch:
+                if self._stopping.is_set():
+                    return
+                continue
+
+            try:
+                if failures >= self.spool.max_attempts:
+                    self._isolate_poison(batch, dead_lettered)
+                else:
+                    self.storage.write_batch(batch, skip_existing=replaying)
+            except Exception as e:
+                # 数据仍在缓冲区中，稍后从确认位置重新读取（读出的仍是同一批读数，序号不变）
+                self.spool.rewind()
+                if self._stopping.is_set():
+                    logger.warning(f"数据库不可用，{self.spool.pending()} 条数据保留在缓冲区中，下次启动时写入")
+                    return
+                if isinstance(e, self.READING_ERRORS):
+                    failures += 1
+                    logger.error(f"数据库写入失败（第 {failures} 次），{delay:g}秒后重试: {e}")
+                else:
+                    logger.warning(f"数据库不可用，{delay:g}秒后重试（{self.spool.pending()} 条数据在缓冲区中等待）: {e}")
+                self._stopping.wait(delay)
+                delay = min(delay * 2, self.max_retry_interval)
+                continue
+
+            self.spool.ack(position, len(batch))
+            failures = 0
+            dead_lettered.clear()
+            delay = self.retry_interval
+
+    def _isolate_poison(self, batch: List[TemperatureData], dead_lettered: set):
+        """
+        逐条写入多次失败的一批读数，因读数错误无法写入的读数移入死信文件
+
+        逐条写入时跳过已存在的读数，已移入死信文件的读数记录在 dead_lettered 中，
+        中途遇到其他错误重试时不会重复写入数据库或死信文件
+        """
+        for index, data in enumerate(batch):
+            if index in dead_lettered:
+                continue
+            try:
+                self.storage.write_batch([data], skip_existing=True)
+            except self.READING_ERRORS as e:
+                self.spool.dead_letter(data, e)
+                dead_lettered.add(index)
+
+    def _writer_loop(self):
+        """写线程：将队列中积压的数据合并为一个事务写入"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            batch = [item]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    next_item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if next_item is None:
+                    stop = True
+                    break
+                batch.append(next_item)
+
+            success = self.storage.save_batch([data for data, _, _ in batch])
+
+            for _, loop, future in batch:
+                if future is not None:
+                    try:
+                        loop.call_soon_threadsafe(self._resolve, future, success)
+                    except RuntimeError:
+                        # 等待结果的事件循环已关闭
+                        pass
+
+            if stop:
+                return
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, success: bool):
+        """在事件循环线程中设置写入结果"""
+        if not future.done():
+            future.set_result(success)
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共夹具
+temperature_sensor_connector 在导入时读取 ./static/config.json，测试统一在项目根目录下运行
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """使用临时数据库的 TemperatureDataStorage"""
+    from temperature_sensor_connector import TemperatureDataStorage
+
+    storage = TemperatureDataStorage(str(tmp_path / 'test.db'))
+    yield storage
+    storage._read_pool.close()
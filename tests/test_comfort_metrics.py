@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""舒适度指标：标量与向量计算结果一致，无效读数为空；回填只处理能计算出指标的读数"""
+
+import math
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import pytest
+
+from comfort_metrics import VECTORIZE_MIN_ROWS, backfill_database, compute, compute_rows
+
+READINGS = [(21.5, 48.0), (-5.0, 80.0), (35.0, 10.0), (29.0, 90.0), (40.0, 60.0)]
+INVALID = [(math.nan, 50.0), (math.inf, 50.0), (-math.inf, 50.0), (21.5, math.nan), (21.5, math.inf),
+           (21.5, 0.0), (21.5, 120.0), (None, 50.0), (21.5, None)]
+
+
+def vector_rows(readings):
+    """重复读数使条数达到向量计算的阈值，返回前 len(readings) 条的结果"""
+    padded = (readings * VECTORIZE_MIN_ROWS)[:max(VECTORIZE_MIN_ROWS, len(readings))]
+    temperature = [math.nan if t is None else t for t, _ in padded]
+    humidity = [math.nan if rh is None else rh for _, rh in padded]
+    return compute_rows(temperature, humidity)[:len(readings)]
+
+
+@pytest.mark.parametrize('temperature, humidity', INVALID)
+def test_invalid_reading_is_empty(temperature, humidity):
+    assert compute(temperature, humidity) == (None, None, None)
+    assert vector_rows([(temperature, humidity)]) == [(None, None, None)]
+
+
+def test_scalar_and_vector_results_match():
+    scalar = compute_rows([t for t, _ in READINGS], [rh for _, rh in READINGS])
+    vector = vector_rows(READINGS)
+    for expected, actual in zip(scalar, vector):
+        assert actual == pytest.approx(expected, abs=0.011)
+
+
+def test_backfill_skips_invalid_and_returns_early(storage):
+    from temperature_sensor_connector import TemperatureData
+
+    start = datetime(2024, 1, 1, 8, 0)
+    readings = READINGS + [(21.5, 0.0)]
+    storage.save_batch([TemperatureData(t, rh, 90, 3000, start + timedelta(minutes=minute), 'Sensor',
+                                        'A4:C1:38:00:00:01')
+                        for minute, (t, rh) in enumerate(readings)])
+    with closing(sqlite3.connect(storage.db_path)) as conn:
+        # 模拟升级前写入的读数
+        conn.execute('UPDATE temperature_data SET dew_point = NULL, absolute_humidity = NULL, heat_index = NULL')
+        conn.commit()
+
+    assert backfill_database(storage.db_path, chunk_size=2) == len(READINGS)
+    # 湿度无效的读数结果仍为NULL，不会在下次启动时再次处理
+    assert backfill_database(storage.db_path, chunk_size=2) == 0
+
+    with closing(sqlite3.connect(storage.db_path)) as conn:
+        rows = conn.execute('''
+            SELECT dew_point, absolute_humidity, heat_index FROM temperature_data ORDER BY id
+        ''').fetchall()
+    assert rows[:-1] == [pytest.approx(compute(t, rh), abs=0.011) for t, rh in READINGS]
+    assert rows[-1] == (None, None, None)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""数据覆盖区间：重叠区间的覆盖时长不重复计算"""
+
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+
+DEVICE = 'A4:C1:38:00:00:01'
+START = datetime(2024, 1, 1, 8, 0)
+
+
+def add_intervals(storage, intervals):
+    start_ts = START.timestamp()
+    with closing(sqlite3.connect(storage.db_path)) as conn:
+        conn.executemany('''
+            INSERT INTO coverage_intervals (device_address, start_ts, end_ts, reading_count)
+            VALUES (?, ?, ?, ?)
+        ''', [(DEVICE, start_ts + start, start_ts + end, 1) for start, end in intervals])
+        conn.commit()
+
+
+def test_overlapping_intervals_are_not_double_counted(storage):
+    # 实时区间 0~40 分钟，回填区间 20~60 分钟（部分重叠）和 30~35 分钟（被包含）
+    add_intervals(storage, [(0, 2400), (1200, 3600), (1800, 2100)])
+
+    [coverage] = storage.get_coverage(START, START + timedelta(hours=1), DEVICE)
+    assert coverage['covered_seconds'] == 3600
+    assert coverage['completeness'] == 1
+    assert coverage['gaps'] == []
+
+
+def test_gaps_between_overlapping_intervals(storage):
+    add_intervals(storage, [(0, 1200), (600, 1500), (2400, 3600)])
+
+    [coverage] = storage.get_coverage(START, START + timedelta(hours=1), DEVICE)
+    assert coverage['covered_seconds'] == 2700
+    assert coverage['completeness'] == 0.75
+    assert [gap['duration'] for gap in coverage['gaps']] == [900]
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""SSE事件广播：连接名额在 subscribe() 时占用，连接关闭时释放；发布事件只唤醒关注该设备的连接"""
+
+import threading
+import time
+
+import pytest
+
+import event_stream
+from event_stream import EventStream, StreamFull
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail("等待超时")
+        time.sleep(0.01)
+
+
+def test_subscribe_reserves_slot_before_iteration():
+    stream = EventStream(max_clients=1)
+    first = stream.subscribe()
+
+    assert stream.clients == 1
+    with pytest.raises(StreamFull):
+        stream.subscribe()
+
+    # 响应未开始发送就被关闭
+    first.close()
+    assert stream.clients == 0
+    stream.subscribe().close()
+
+
+def test_slot_released_once_after_iteration():
+    stream = EventStream(max_clients=2)
+    subscription = stream.subscribe()
+    assert next(subscription).startswith(b'retry:')
+
+    subscription.close()
+    subscription.close()
+    assert stream.clients == 0
+
+
+def test_slot_released_when_stream_closes():
+    stream = EventStream()
+    subscription = stream.subscribe()
+    stream.publish('temperature_update', '{}')
+    chunks = []
+    reader = threading.Thread(target=lambda: chunks.extend(subscription))
+    reader.start()
+
+    stream.close()
+    reader.join(timeout=5)
+    assert not reader.is_alive()
+    assert stream.clients == 0
+
+
+def test_concurrent_subscribes_respect_limit():
+    stream = EventStream(max_clients=5)
+    barrier = threading.Barrier(20)
+    accepted, rejected = [], []
+
+    def connect():
+        barrier.wait()
+        try:
+            accepted.append(stream.subscribe())
+        except StreamFull:
+            rejected.append(True)
+
+    threads = [threading.Thread(target=connect) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(accepted) == 5
+    assert len(rejected) == 15
+    assert stream.clients == 5
+    for subscription in accepted:
+        subscription.close()
+    assert stream.clients == 0
+
+
+def test_publish_wakes_only_subscribers_of_device(monkeypatch):
+    woken = []
+
+    class RecordingCondition(threading.Condition):
+        def notify(self, n=1):
+            woken.append(self)
+            super().notify(n)
+
+    monkeypatch.setattr(event_stream.threading, 'Condition', RecordingCondition)
+    stream = EventStream(heartbeat_interval=60)
+    subscriptions = {device: stream.subscribe([device]) for device in ('A', 'B')}
+    received = {device: [] for device in subscriptions}
+    readers = [threading.Thread(target=lambda d=device: received[d].extend(subscriptions[d]))
+               for device in subscriptions]
+    for reader in readers:
+        reader.start()
+    try:
+        wait_until(lambda: set(stream._waiters) == {'A', 'B'})
+        waiters = {device: list(stream._waiters[device]) for device in ('A', 'B')}
+        woken.clear()
+
+        stream.publish('temperature_update', '{"device": "A"}', 'A')
+        wait_until(lambda: len(received['A']) == 2)
+
+        assert waiters['A'][0] in woken
+        assert waiters['B'][0] not in woken
+    finally:
+        stream.close()
+        for reader in readers:
+            reader.join(timeout=5)
+    assert not any(reader.is_alive() for reader in readers)
+    assert received['B'] == [received['A'][0]]
+    assert stream.clients == 0
+
+
+def test_filtered_subscriber_not_reset_by_other_devices():
+    stream = EventStream(buffer_size=4)
+    filtered = stream.subscribe(['B'])
+    unfiltered = stream.subscribe()
+    next(filtered)
+    next(unfiltered)
+
+    # 其他设备的事件挤满缓冲区
+    for _ in range(10):
+        stream.publish('temperature_update', '{}', 'A')
+    stream.publish('temperature_update', '{"device": "B"}', 'B')
+
+    chunk = next(filtered)
+    assert stream.RESET not in chunk
+    assert chunk.count(b'event: temperature_update') == 1
+    assert b'"device": "B"' in chunk
+    assert next(unfiltered).startswith(stream.RESET)
+    filtered.close()
+    unfiltered.close()
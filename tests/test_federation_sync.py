@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""联邦同步汇聚端：共享密钥、重复推送去重与乱序读数的覆盖区间"""
+
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from federation_sync import create_blueprint, encode_batch
+from temperature_sensor_connector import TemperatureData
+
+TOKEN = 'test-token'
+DEVICE = 'A4:C1:38:00:00:01'
+START = datetime(2024, 1, 1, 8, 0)
+
+
+def sync_rows(minutes):
+    rows = []
+    for minute in minutes:
+        timestamp = START + timedelta(minutes=minute)
+        rows.append([timestamp.isoformat(), 21.5, 48.0, 90, 3000, 'Sensor', DEVICE, timestamp.timestamp()])
+    return rows
+
+
+def coverage(storage) -> list:
+    with closing(sqlite3.connect(storage.db_path)) as conn:
+        return conn.execute('''
+            SELECT start_ts, end_ts, reading_count FROM coverage_intervals
+            WHERE device_address = ? ORDER BY start_ts
+        ''', (DEVICE,)).fetchall()
+
+
+def stored_count(storage) -> int:
+    with closing(sqlite3.connect(storage.db_path)) as conn:
+        return conn.execute('SELECT COUNT(*) FROM temperature_data').fetchone()[0]
+
+
+@pytest.fixture
+def client(storage):
+    app = Flask(__name__)
+    app.register_blueprint(create_blueprint(storage, TOKEN))
+    return app.test_client()
+
+
+def push(client, after_id, last_id, rows, token=TOKEN):
+    return client.post('/api/federation/push', data=encode_batch('collector-1', after_id, last_id, rows),
+                       headers={'Content-Encoding': 'gzip', 'X-Federation-Token': token})
+
+
+@pytest.mark.parametrize('token', ['', None])
+def test_blueprint_requires_token(storage, token):
+    with pytest.raises(ValueError):
+        create_blueprint(storage, token)
+
+
+def test_push_rejected_without_token(client, storage):
+    assert push(client, 0, 3, sync_rows(range(3)), token='').status_code == 401
+    assert push(client, 0, 3, sync_rows(range(3)), token='wrong').status_code == 401
+    assert client.get('/api/federation/hosts').status_code == 401
+    assert stored_count(storage) == 0
+
+
+def test_replayed_push_is_not_duplicated(client, storage):
+    rows = sync_rows(range(10))
+    first = push(client, 0, 10, rows)
+    assert first.status_code == 200
+    assert first.get_json()['inserted'] == 10
+
+    replay = push(client, 0, 10, rows)
+    assert replay.status_code == 200
+    assert replay.get_json() == {'last_id': 10, 'inserted': 0, 'accepted': True}
+    assert stored_count(storage) == 10
+
+
+def test_out_of_order_push_rebuilds_coverage(client, storage):
+    # 先收到缺口两侧的读数（每分钟一条，20~40分钟缺失，超过间隔阈值）
+    assert push(client, 0, 42, sync_rows([*range(0, 21), *range(40, 61)])).status_code == 200
+    assert len(coverage(storage)) == 2
+
+    # 采集主机回填的缺口读数晚到，覆盖区间应合并为一个
+    assert push(client, 42, 61, sync_rows(range(21, 40))).status_code == 200
+    start_ts = START.timestamp()
+    assert coverage(storage) == [(start_ts, start_ts + 3600, 61)]
+
+
+def test_live_reading_older_than_gap_does_not_extend_latest_interval(storage):
+    def save(minute):
+        assert storage.save_batch([TemperatureData(21.5, 48.0, 90, 3000, START + timedelta(minutes=minute),
+                                                   'Sensor', DEVICE)])
+
+    save(60)
+    save(10)
+    save(61)
+
+    start_ts = START.timestamp()
+    assert coverage(storage) == [
+        (start_ts + 600, start_ts + 600, 1),
+        (start_ts + 3600, start_ts + 3660, 2),
+    ]
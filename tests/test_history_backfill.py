@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""历史数据回填：save_history 去重与 backfill_log 记录"""
+
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from temperature_sensor_connector import TemperatureData
+
+START = datetime(2024, 1, 1, 8, 0)
+
+
+def readings(device_address, minutes):
+    return [TemperatureData(21.5, 48.0, 90, 3000, START + timedelta(minutes=minute), 'Sensor', device_address)
+            for minute in minutes]
+
+
+def stored_count(storage, device_address) -> int:
+    with closing(sqlite3.connect(storage.db_path)) as conn:
+        return conn.execute('SELECT COUNT(*) FROM temperature_data WHERE device_address IS ?',
+                            (device_address,)).fetchone()[0]
+
+
+def backfill_log(storage) -> dict:
+    with closing(sqlite3.connect(storage.db_path)) as conn:
+        rows = conn.execute('SELECT device_address, start_ts, end_ts, inserted FROM backfill_log').fetchall()
+    return {row[0]: row[1:] for row in rows}
+
+
+def test_redownload_does_not_duplicate(storage):
+    records = readings('A4:C1:38:00:00:01', range(0, 30, 5))
+
+    assert storage.save_history(records) == 6
+    assert storage.save_history(records) == 0
+    assert stored_count(storage, 'A4:C1:38:00:00:01') == 6
+
+
+def test_redownload_without_address_does_not_duplicate(storage):
+    records = readings(None, range(0, 30, 5))
+
+    assert storage.save_history(records) == 6
+    assert storage.save_history(records) == 0
+    assert stored_count(storage, None) == 6
+
+
+def test_backfill_log_records_inserted_count_per_device(storage):
+    # 设备2已有其中两条读数，只应记为新写入1条
+    assert storage.save_history(readings('A4:C1:38:00:00:02', [0, 5])) == 2
+    revision = storage.get_backfill_revision()
+
+    batch = readings('A4:C1:38:00:00:01', [0, 5, 10]) + readings('A4:C1:38:00:00:02', [0, 5, 10])
+    assert storage.save_history(batch) == 4
+    assert storage.get_backfill_revision() > revision
+
+    log = backfill_log(storage)
+    start_ts = START.timestamp()
+    assert log['A4:C1:38:00:00:01'] == (start_ts, start_ts + 600, 3)
+    assert log['A4:C1:38:00:00:02'][2] == 1
+
+
+def test_nothing_logged_when_nothing_inserted(storage):
+    records = readings('A4:C1:38:00:00:01', [0, 5])
+    storage.save_history(records)
+    revision = storage.get_backfill_revision()
+
+    assert storage.save_history(records) == 0
+    assert storage.get_backfill_revision() == revision
+
+
+def coverage(storage, device_address) -> list:
+    with closing(sqlite3.connect(storage.db_path)) as conn:
+        return conn.execute('''
+            SELECT start_ts, end_ts, reading_count FROM coverage_intervals
+            WHERE device_address IS ? ORDER BY start_ts
+        ''', (device_address,)).fetchall()
+
+
+def test_backfill_merges_into_adjacent_coverage(storage):
+    device_address = 'A4:C1:38:00:00:01'
+    # 实时读数每分钟一条，11~29分钟断线
+    assert storage.save_batch(readings(device_address, [*range(0, 11), *range(30, 41)]))
+    assert len(coverage(storage, device_address)) == 2
+
+    assert storage.save_history(readings(device_address, range(11, 30))) == 19
+    # 之后的实时读数继续延长合并后的区间
+    assert storage.save_batch(readings(device_address, [41]))
+
+    start_ts = START.timestamp()
+    assert coverage(storage, device_address) == [(start_ts, start_ts + 41 * 60, 42)]
+
+
+def test_backfill_after_latest_reading_extends_open_interval(storage):
+    device_address = 'A4:C1:38:00:00:01'
+    assert storage.save_batch(readings(device_address, range(0, 11)))
+    # 设备存储中下载的读数晚于最新的实时读数，并与其间隔较大
+    assert storage.save_history(readings(device_address, range(30, 41))) == 11
+    assert storage.save_batch(readings(device_address, [41]))
+
+    start_ts = START.timestamp()
+    assert coverage(storage, device_address) == [
+        (start_ts, start_ts + 600, 11),
+        (start_ts + 1800, start_ts + 41 * 60, 12),
+    ]
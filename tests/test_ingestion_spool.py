@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""落盘缓冲区：跳过损坏的记录后待写入条数与实际积压一致"""
+
+import zlib
+from datetime import datetime, timedelta
+
+from ingestion_spool import RECORD_HEADER, IngestionSpool, encode_record
+from temperature_sensor_connector import TemperatureData
+
+START = datetime(2024, 1, 1, 8, 0)
+
+
+def reading(minute):
+    return TemperatureData(21.5, 48.0, 90, 3000, START + timedelta(minutes=minute), 'Sensor', 'A4:C1:38:00:00:01')
+
+
+def segment_path(spool):
+    [path] = spool.directory.glob('*.seg')
+    return path
+
+
+def test_corrupt_record_is_counted_as_skipped(tmp_path):
+    spool = IngestionSpool(str(tmp_path / 'spool'), fsync_interval=0)
+    try:
+        records = [encode_record(reading(minute)) for minute in range(5)]
+        for minute in range(5):
+            spool.append(reading(minute))
+
+        # 破坏第三条记录的内容，之后的三条记录都会被跳过
+        corrupt_at = len(records[0]) + len(records[1]) + RECORD_HEADER.size
+        with open(segment_path(spool), 'r+b') as f:
+            f.seek(corrupt_at)
+            f.write(b'#')
+
+        batch, position = spool.read_batch(10, timeout=0)
+        assert [data.timestamp for data in batch] == [START, START + timedelta(minutes=1)]
+        spool.ack(position, len(batch))
+
+        stats = spool.stats()
+        assert stats['pending'] == 0
+        assert stats['acked'] == 2
+        assert stats['skipped'] == 3
+
+        # 之后追加的读数正常读取
+        spool.append(reading(5))
+        batch, position = spool.read_batch(10, timeout=1)
+        assert [data.timestamp for data in batch] == [START + timedelta(minutes=5)]
+        spool.ack(position, len(batch))
+        assert spool.pending() == 0
+    finally:
+        spool.close()
+
+
+def test_undecodable_recovered_record_is_counted_as_skipped(tmp_path):
+    directory = str(tmp_path / 'spool')
+    spool = IngestionSpool(directory, fsync_interval=0)
+    spool.append(reading(0))
+    spool.close()
+
+    # 校验通过但无法解析的记录
+    payload = b'not json'
+    with open(segment_path(spool), 'ab') as f:
+        f.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        f.write(encode_record(reading(1)))
+
+    spool = IngestionSpool(directory, fsync_interval=0)
+    try:
+        assert spool.pending() == 3
+        batch, position = spool.read_batch(10, timeout=0)
+        assert len(batch) == 2
+        spool.ack(position, len(batch))
+        assert spool.pending() == 0
+        assert spool.stats()['skipped'] == 1
+    finally:
+        spool.close()
+
+
+def test_rewind_does_not_count_skipped_records_twice(tmp_path):
+    spool = IngestionSpool(str(tmp_path / 'spool'), fsync_interval=0)
+    try:
+        first = encode_record(reading(0))
+        for minute in range(3):
+            spool.append(reading(minute))
+        with open(segment_path(spool), 'r+b') as f:
+            f.seek(len(first) + RECORD_HEADER.size)
+            f.write(b'#')
+
+        spool.read_batch(10, timeout=0)
+        spool.rewind()
+        batch, position = spool.read_batch(10, timeout=0)
+        spool.ack(position, len(batch))
+
+        assert spool.stats()['skipped'] == 2
+        assert spool.pending() == 0
+    finally:
+        spool.close()
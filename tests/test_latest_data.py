@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""最新数据：按读数时间而不是写入顺序排序"""
+
+from datetime import datetime, timedelta
+
+from temperature_sensor_connector import TemperatureData
+
+START = datetime(2024, 1, 1, 8, 0)
+
+
+def reading(minute, device_address='A4:C1:38:00:00:01'):
+    return TemperatureData(21.5, 48.0, 90, 3000, START + timedelta(minutes=minute), 'Sensor', device_address)
+
+
+def test_backfilled_readings_are_not_reported_as_latest(storage):
+    assert storage.save_batch([reading(60), reading(61, 'A4:C1:38:00:00:02')])
+    # 回填的历史读数 id 更大但时间更早
+    assert storage.save_history([reading(minute) for minute in range(0, 30)]) == 30
+
+    latest = storage.get_latest_data(2)
+    assert [row['timestamp'] for row in latest] == [
+        (START + timedelta(minutes=61)).isoformat(),
+        (START + timedelta(minutes=60)).isoformat(),
+    ]
+
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""热力图和周对比聚合表：SQL 重建的结果与写入时增量更新的结果一致"""
+
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import pytest
+
+from temperature_sensor_connector import TemperatureData, TemperatureDataStorage
+
+
+@pytest.fixture
+def local_timezone(monkeypatch):
+    """使用有夏令时的时区，分桶按本地时间划分"""
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def profiles(storage):
+    with closing(sqlite3.connect(storage.db_path)) as conn:
+        hourly = conn.execute('SELECT * FROM hourly_profile ORDER BY 1, 2, 3').fetchall()
+        weekly = conn.execute('SELECT * FROM weekly_profile ORDER BY 1, 2, 3, 4, 5').fetchall()
+    return hourly, weekly
+
+
+def test_rebuild_matches_incremental_profiles(local_timezone, tmp_path):
+    storage = TemperatureDataStorage(str(tmp_path / 'test.db'))
+    readings = []
+    # 跨越ISO周与自然年不一致的年末（2020-12-28 属于 2020 年第53周，2024-12-30 属于 2025 年第1周）和夏令时切换
+    for start in (datetime(2020, 12, 26), datetime(2024, 12, 28), datetime(2024, 3, 9), datetime(2024, 11, 2)):
+        for step in range(0, 4 * 24 * 60, 37):
+            readings.append(TemperatureData(20 + step % 7, 40 + step % 11, 90, 3000,
+                                            start + timedelta(minutes=step), 'Sensor',
+                                            'A4:C1:38:00:00:01' if step % 2 else None))
+    try:
+        assert storage.save_batch(readings)
+        expected = profiles(storage)
+        assert {row[1:3] for row in expected[1]} >= {(2020, 53), (2025, 1)}
+
+        storage.rebuild_profiles()
+        hourly, weekly = profiles(storage)
+    finally:
+        storage._read_pool.close()
+
+    for actual, rows in ((hourly, expected[0]), (weekly, expected[1])):
+        assert [row[:-2] for row in actual] == [row[:-2] for row in rows]
+        assert [row[-2:] for row in actual] == [pytest.approx(row[-2:]) for row in rows]
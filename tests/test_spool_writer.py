@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""落盘缓冲区写线程：暂时性错误一直重试，无法写入的读数移入死信文件"""
+
+import json
+import sqlite3
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import pytest
+
+from ingestion_spool import DEAD_LETTER_FILE, IngestionSpool
+from temperature_sensor_connector import AsyncTemperatureDataStorage, TemperatureData
+
+START = datetime(2024, 1, 1, 8, 0)
+
+
+def reading(minute, temperature=21.5):
+    return TemperatureData(temperature, 48.0, 90, 3000, START + timedelta(minutes=minute),
+                           'Sensor', 'A4:C1:38:00:00:01')
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail("等待超时")
+        time.sleep(0.01)
+
+
+def stored_count(storage) -> int:
+    with closing(sqlite3.connect(storage.db_path)) as conn:
+        return conn.execute('SELECT COUNT(*) FROM temperature_data').fetchone()[0]
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return IngestionSpool(str(tmp_path / 'spool'), fsync_interval=0, max_attempts=2)
+
+
+def test_poison_reading_moves_to_dead_letter(storage, spool):
+    writer = AsyncTemperatureDataStorage(storage, spool=spool, retry_interval=0.01)
+    try:
+        # 温度为字符串的读数无法计算舒适度指标，整批写入一直失败
+        for data in (reading(0), reading(1, temperature='bad'), reading(2)):
+            spool.append(data)
+        wait_until(lambda: spool.pending() == 0)
+
+        # 之后的读数不再被阻塞
+        spool.append(reading(3))
+        wait_until(lambda: spool.pending() == 0)
+    finally:
+        writer.close(timeout=5)
+
+    assert stored_count(storage) == 3
+    assert spool.stats()['dead_lettered'] == 1
+    lines = (spool.directory / DEAD_LETTER_FILE).read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 1
+    entry = json.loads(lines[0])
+    assert entry['record']['temperature'] == 'bad'
+    assert entry['record']['timestamp'] == (START + timedelta(minutes=1)).isoformat()
+    assert entry['error']
+
+
+@pytest.mark.parametrize('error', [
+    sqlite3.OperationalError('database is locked'),
+    sqlite3.OperationalError('disk I/O error'),
+    sqlite3.OperationalError('database or disk is full'),
+    OSError(28, 'No space left on device'),
+], ids=['locked', 'io', 'full', 'oserror'])
+def test_database_errors_are_retried_without_dead_letter(storage, spool, monkeypatch, error):
+    write_batch = storage.write_batch
+    calls = []
+
+    def locked_then_ok(batch, skip_existing=False):
+        calls.append(len(batch))
+        if len(calls) <= spool.max_attempts + 2:
+            raise error
+        write_batch(batch, skip_existing)
+
+    monkeypatch.setattr(storage, 'write_batch', locked_then_ok)
+    for minute in range(3):
+        spool.append(reading(minute))
+    writer = AsyncTemperatureDataStorage(storage, spool=spool, retry_interval=0.01, max_retry_interval=0.02)
+    try:
+        wait_until(lambda: spool.pending() == 0)
+    finally:
+        writer.close(timeout=5)
+
+    assert stored_count(storage) == 3
+    assert spool.stats()['dead_lettered'] == 0
+    assert not (spool.directory / DEAD_LETTER_FILE).exists()
+    # 一直整批重试，没有改为逐条写入
+    assert calls == [3] * len(calls)
+
+
+def test_failed_batch_is_written_once_after_isolation(storage, spool, monkeypatch):
+    write_batch = storage.write_batch
+
+    def fail_batches(batch, skip_existing=False):
+        if len(batch) > 1:
+            raise sqlite3.IntegrityError('constraint failed')
+        write_batch(batch, skip_existing)
+
+    monkeypatch.setattr(storage, 'write_batch', fail_batches)
+    writer = AsyncTemperatureDataStorage(storage, spool=spool, retry_interval=0.01)
+    try:
+        for minute in range(4):
+            spool.append(reading(minute))
+        wait_until(lambda: spool.pending() == 0)
+    finally:
+        writer.close(timeout=5)
+
+    assert stored_count(storage) == 4
+    assert spool.stats()['dead_lettered'] == 0
+
+
+def test_unavailable_database_is_retried_without_dead_letter(storage, spool, monkeypatch, tmp_path):
+    db_path = storage.db_path
+    write_batch = storage.write_batch
+    calls = []
+
+    def count_calls(batch, skip_existing=False):
+        calls.append(len(batch))
+        if len(calls) > spool.max_attempts + 2:
+            # 存储恢复
+            storage.db_path = db_path
+        write_batch(batch, skip_existing)
+
+    # 数据库所在目录不存在：sqlite3.OperationalError: unable to open database file
+    storage.db_path = str(tmp_path / 'missing' / 'test.db')
+    monkeypatch.setattr(storage, 'write_batch', count_calls)
+    for minute in range(3):
+        spool.append(reading(minute))
+    writer = AsyncTemperatureDataStorage(storage, spool=spool, retry_interval=0.01, max_retry_interval=0.02)
+    try:
+        wait_until(lambda: spool.pending() == 0)
+    finally:
+        writer.close(timeout=5)
+
+    assert len(calls) > spool.max_attempts + 2
+    assert stored_count(storage) == 3
+    assert spool.stats()['dead_lettered'] == 0
+    assert not (spool.directory / DEAD_LETTER_FILE).exists()
+
+
+def test_retry_during_isolation_does_not_dead_letter_twice(storage, spool, monkeypatch):
+    write_batch = storage.write_batch
+    outages = []
+
+    def flaky(batch, skip_existing=False):
+        # 逐条写入到第三条读数时数据库暂时不可用一次
+        if len(batch) == 1 and batch[0].timestamp == START + timedelta(minutes=2) and not outages:
+            outages.append(True)
+            raise sqlite3.OperationalError('database is locked')
+        write_batch(batch, skip_existing)
+
+    monkeypatch.setattr(storage, 'write_batch', flaky)
+    for data in (reading(0, temperature='bad'), reading(1), reading(2), reading(3)):
+        spool.append(data)
+    writer = AsyncTemperatureDataStorage(storage, spool=spool, retry_interval=0.01)
+    try:
+        wait_until(lambda: spool.pending() == 0)
+    finally:
+        writer.close(timeout=5)
+
+    assert outages
+    assert stored_count(storage) == 3
+    assert spool.stats()['dead_lettered'] == 1
+    assert len((spool.directory / DEAD_LETTER_FILE).read_text(encoding='utf-8').splitlines()) == 1
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""时间范围查询：带时区与不带时区的参数结果一致，且在 ts_epoch 索引上做范围扫描"""
+
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from temperature_sensor_connector import TemperatureData, TemperatureDataStorage
+
+DEVICES = ['A4:C1:38:00:00:01', 'A4:C1:38:00:00:02']
+INTERVAL = timedelta(minutes=10)
+WINDOWS = {'1h': timedelta(hours=1), '24h': timedelta(hours=24), '30d': timedelta(days=30)}
+
+
+@pytest.fixture(scope='module')
+def populated(tmp_path_factory):
+    """两个设备40天、每10分钟一条的读数（模块内共用），返回 (storage, 最新读数时间)"""
+    storage = TemperatureDataStorage(str(tmp_path_factory.mktemp('time_range') / 'test.db'))
+    end = datetime.now().replace(second=0, microsecond=0)
+    steps = int(timedelta(days=40) / INTERVAL)
+    readings = [
+        TemperatureData(20 + step % 50 / 10, 50 + step % 20 / 2, 90, 3000, end - step * INTERVAL,
+                        f"Sensor-{address[-2:]}", address)
+        for step in range(steps)
+        for address in DEVICES
+    ]
+    assert storage.save_batch(readings)
+    yield storage, end
+    storage._read_pool.close()
+
+
+def expected_count(span: timedelta, device) -> int:
+    """窗口内（含两端）每个设备的读数条数"""
+    per_device = int(span / INTERVAL) + 1
+    return per_device if device else per_device * len(DEVICES)
+
+
+def query_plan(storage, start_time, end_time, device_address) -> list:
+    sql, params = storage._time_range_query(start_time, end_time, device_address)
+    with closing(sqlite3.connect(storage.db_path)) as conn:
+        return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+
+
+@pytest.mark.parametrize('device', [None, DEVICES[0]], ids=['all', 'device'])
+@pytest.mark.parametrize('window', WINDOWS)
+def test_aware_and_naive_ranges_return_same_rows(populated, window, device):
+    storage, end = populated
+    start = end - WINDOWS[window]
+
+    naive = storage.get_data_by_time_range(start, end, device)
+    utc = storage.get_data_by_time_range(start.astimezone(timezone.utc), end.astimezone(timezone.utc), device)
+    offset = timezone(timedelta(hours=-5, minutes=-30))
+    shifted = storage.get_data_by_time_range(start.astimezone(offset), end.astimezone(offset), device)
+
+    assert len(naive) == expected_count(WINDOWS[window], device)
+    assert utc == naive
+    assert shifted == naive
+
+
+@pytest.mark.parametrize('device', [None, DEVICES[0]], ids=['all', 'device'])
+@pytest.mark.parametrize('window', WINDOWS)
+def test_aware_and_naive_ranges_return_same_columns(populated, window, device):
+    storage, end = populated
+    start = end - WINDOWS[window]
+
+    naive = storage.get_columns_by_time_range(start, end, device)
+    aware = storage.get_columns_by_time_range(start.astimezone(timezone.utc), end.astimezone(timezone.utc), device)
+
+    assert len(naive) == expected_count(WINDOWS[window], device)
+    assert aware.timestamps == naive.timestamps
+    assert aware.temperature == naive.temperature
+
+
+@pytest.mark.parametrize('device', [None, DEVICES[0]], ids=['all', 'device'])
+@pytest.mark.parametrize('window', WINDOWS)
+def test_time_range_query_searches_ts_epoch_index(populated, window, device):
+    storage, end = populated
+    start = (end - WINDOWS[window]).astimezone(timezone.utc)
+
+    plan = query_plan(storage, start, end.astimezone(timezone.utc), device)
+
+    index = 'idx_device_ts_epoch' if device else 'idx_ts_epoch'
+    assert any(detail.startswith('SEARCH') and f'USING INDEX {index} ' in detail and 'ts_epoch>?' in detail
+               for detail in plan), plan
+    assert not any(detail.startswith('SCAN') for detail in plan), plan
+    # 排序由索引完成，不需要临时B树
+    assert not any('TEMP B-TREE' in detail for detail in plan), plan
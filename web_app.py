@@ -7,16 +7,30 @@ DLUT宿舍实时温度监控Web应用
 
 import asyncio
 import json
+import mimetypes
 import threading
 from datetime import datetime, timedelta
-import io
-import pandas as pd
-import xlsxwriter
-from flask import Flask, render_template, jsonify, request, send_file
-from flask_socketio import SocketIO, emit
+from pathlib import Path
+from flask import Flask, Response, render_template, jsonify, redirect, request, send_file, send_from_directory
+from flask_socketio import SocketIO, emit, join_room, leave_room, rooms
 import logging
 
-from temperature_sensor_connector import TemperatureSensorConnector, TemperatureDataStorage, TemperatureData
+from temperature_sensor_connector import (
+    TemperatureSensorConnector, TemperatureDataStorage, AsyncTemperatureDataStorage, TemperatureData, server_config
+)
+from alert_engine import AlertEngine, CallbackAlertSink
+from ingestion_policy import IngestionFilter
+from history_backfill import HistoryBackfill
+from ingestion_spool import IngestionSpool
+from excel_export import EXPORT_FORMATS
+from event_stream import EventStream, StreamFull
+from federation_sync import FederationSyncClient, create_blueprint as create_federation_blueprint
+from grafana_api import create_blueprint as create_grafana_blueprint
+from export_jobs import ExportCache, ExportJobManager
+from offload import OffloadExecutor
+from comfort_metrics import backfill_database
+from presence import CachedSnapshot, PresenceTracker
+import fast_json
 
 # 设置日志
 logging.basicConfig(level=logging.INFO)
@@ -37,39 +51,141 @@ socketio = SocketIO(
     async_mode='threading',  # 强制使用threading模式
     # 关键修复：完全禁用WebSocket，解决代理环境下的握手错误
     websocket=False,        # 禁用WebSocket传输
-    allow_upgrades=False    # 禁止协议升级
+    allow_upgrades=False,   # 禁止协议升级
+    json=fast_json          # 读数事件使用预序列化的JSON，避免每次推送重复序列化
 )
 
+def load_asset_manifest():
+    """
+    读取 build_assets.py 生成的资源清单
+
+    server.assets.mode 为 source 时始终使用源文件；为 auto（默认）时存在构建结果即使用；
+    为 build 时要求存在构建结果
+    """
+    mode = server_config.get('assets', {}).get('mode', 'auto')
+    if mode == 'source':
+        return None
+
+    manifest_path = ASSET_DIR / 'manifest.json'
+    if not manifest_path.exists():
+        if mode == 'build':
+            logger.warning("未找到静态资源构建结果，请先运行 python build_assets.py，当前使用源文件")
+        return None
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    logger.info(f"使用构建后的静态资源 ({len(manifest)} 个文件)")
+    return manifest
+
+ASSET_DIR = Path(app.static_folder) / 'dist'
+asset_manifest = load_asset_manifest()
+
+@app.context_processor
+def inject_asset_helpers():
+    """模板中通过 asset_url() 引用构建后的资源，assets_built 表示是否使用构建结果"""
+    def asset_url(path):
+        if asset_manifest and path in asset_manifest:
+            return f"/assets/{asset_manifest[path]}"
+        return f"/static/{path}"
+    return {'asset_url': asset_url, 'assets_built': asset_manifest is not None}
+
 # 全局变量
 connector = None
 storage = None
 latest_data = None
+latest_by_device = {}  # 各设备的最新数据: device_address -> TemperatureData
 is_monitoring = False
-online_users = 0  # 在线用户数统计
+
+# Socket.IO房间：未订阅特定设备的客户端接收所有设备的数据
+ALL_DEVICES_ROOM = 'devices:all'
+
+def device_room(device_address: str) -> str:
+    """设备对应的Socket.IO房间名"""
+    return f'device:{device_address}'
+
+# 只读展示屏通过 /api/stream (SSE) 接收与 temperature_update 相同的数据
+event_stream = EventStream.from_config(server_config.get('stream'))
+
+def publish_reading(data: TemperatureData):
+    """将数据推送给订阅了所有设备或该设备的客户端"""
+    payload = data.json_payload()  # 每条读数只序列化一次，所有房间共用
+    socketio.emit('temperature_update', payload, to=ALL_DEVICES_ROOM)
+    if data.device_address:
+        socketio.emit('temperature_update', payload, to=device_room(data.device_address))
+    event_stream.publish('temperature_update', payload.text, data.device_address)
 
 class TemperatureMonitor:
     """温度监控服务"""
     
     def __init__(self):
-        self.connector = TemperatureSensorConnector(auto_reconnect=True)
-        self.storage = TemperatureDataStorage()
+        self.storage = TemperatureDataStorage(**server_config.get('storage', {}))
+        # 采集组件（蓝牙连接、落盘缓冲区和写线程、告警、入库策略、联邦同步）在 start() 时才创建，
+        # 仅展示数据（start_web_display.py）或只导入本模块时不创建缓冲区文件和后台线程
+        self.connector = None
+        self.async_storage = None
+        self.alert_engine = None
+        self.ingestion = None
+        self.history_backfill = None
+        self.federation = None
         self.is_running = False
         self.loop = None
         self.thread = None
+
+    def build_pipeline(self):
+        """创建采集组件（重复调用不会重复创建）"""
+        if self.async_storage is not None:
+            return
+        self.connector = TemperatureSensorConnector(auto_reconnect=True)
+        # 读数先写入落盘缓冲区，数据库锁定或变慢时不丢数据、不阻塞采集
+        self.async_storage = AsyncTemperatureDataStorage(
+            self.storage, spool=IngestionSpool.from_config(server_config.get('spool'), 'web')
+        )
+        self.alert_engine = AlertEngine.from_config(server_config.get('alerts'))
+        self.alert_engine.add_sink(CallbackAlertSink(lambda alert: socketio.emit('alert', alert)))
+        self.ingestion = IngestionFilter.from_config(server_config.get('ingestion'))
+        # 连接后从设备存储中回填断线期间的读数，并通知前端重新加载历史数据
+        self.history_backfill = HistoryBackfill.attach(
+            self.connector, self.storage, server_config.get('history'),
+            on_backfilled=lambda device_address, count: socketio.emit(
+                'history_backfilled', {'device_address': device_address, 'count': count}
+            )
+        )
+        # collector 模式下把本机数据库的新读数推送到汇聚端
+        self.federation = FederationSyncClient.from_config(server_config.get('federation'), self.storage)
         
     def start(self):
         """启动监控服务"""
         if not self.is_running:
+            self.build_pipeline()
             self.is_running = True
+            if self.federation:
+                self.federation.start()
+            # 升级前写入的读数交给CPU任务进程分块回填舒适度指标，不占用Web进程的GIL
+            offload.submit(backfill_database, self.storage.db_path).add_done_callback(self._on_comfort_backfilled)
             self.thread = threading.Thread(target=self._run_monitor, daemon=True)
             self.thread.start()
             logger.info("温度监控服务已启动")
     
+    def _on_comfort_backfilled(self, future):
+        """舒适度指标回填完成（工作进程未配置日志，在Web进程中记录结果）"""
+        try:
+            updated = future.result()
+        except Exception as e:
+            logger.error(f"回填舒适度指标失败: {e}")
+            return
+        if updated:
+            logger.info(f"已为 {updated} 条历史数据回填舒适度指标")
+
     def stop(self):
         """停止监控服务"""
         self.is_running = False
         if self.connector:
             self.connector.stop_scanning()
+        if self.async_storage:
+            self.async_storage.close(timeout=10)
+        if self.federation:
+            self.federation.stop(timeout=5)
+        event_stream.close()
         logger.info("温度监控服务已停止")
     
     def _run_monitor(self):
@@ -77,17 +193,26 @@ class TemperatureMonitor:
         self.loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.loop)
         
-        # 设置数据回调
-        def on_data_received(data: TemperatureData):
+        # 设置数据回调（协程，由连接器作为任务调度，不阻塞蓝牙通知）
+        async def on_data_received(data: TemperatureData):
             global latest_data
             latest_data = data
+            if data.device_address:
+                latest_by_device[data.device_address] = data
             logger.info(f"接收到数据: {data}")
             
-            # 保存到数据库
-            self.storage.save_data(data)
-            
-            # 通过WebSocket发送给前端
-            socketio.emit('temperature_update', data.to_dict())
+            # 评估告警规则（告警需要看到每一条读数）
+            self.alert_engine.process(data)
+
+            # 数值无变化的重复通知不推送也不保存
+            if not self.ingestion.accept(data):
+                return
+
+            # 通过WebSocket发送给订阅该设备的前端
+            publish_reading(data)
+
+            # 保存到数据库（由写线程完成）
+            await self.async_storage.save_data(data)
         
         self.connector.set_data_callback(on_data_received)
         
@@ -100,167 +225,386 @@ class TemperatureMonitor:
 # 创建监控实例
 monitor = TemperatureMonitor()
 
+# aggregator 模式下接收各采集主机推送的读数，写入本机数据库
+federation_config = server_config.get('federation') or {}
+if federation_config.get('mode') == 'aggregator':
+    if federation_config.get('token'):
+        app.register_blueprint(create_federation_blueprint(monitor.storage, federation_config['token']))
+        logger.info("联邦同步汇聚端已启用: /api/federation/push")
+    else:
+        logger.error("联邦同步汇聚端未配置 token，不启用 /api/federation 接口")
+
+# Grafana 数据源接口（SimpleJSON / JSON 数据源），降采样在SQL中完成
+grafana_config = server_config.get('grafana') or {}
+if grafana_config.get('enabled', False):
+    if not grafana_config.get('token'):
+        logger.warning("Grafana 数据源接口未设置 token，/api/grafana 不需要认证即可访问")
+    app.register_blueprint(create_grafana_blueprint(
+        monitor.storage,
+        token=grafana_config.get('token') or None,
+        max_points=grafana_config.get('max_points', 10000),
+        min_interval=grafana_config.get('min_interval', 1)
+    ))
+
+# 在线人数统计：连接和断开不再逐个广播，每个间隔最多推送一次
+presence_config = server_config.get('presence', {})
+presence = PresenceTracker(
+    lambda count: socketio.emit('online_users_update', {'online_users': count}),
+    interval=presence_config.get('broadcast_interval', 2)
+)
+# build_status 在下方定义，通过lambda延迟引用
+status_snapshot = CachedSnapshot(lambda: build_status(), ttl=presence_config.get('status_ttl', 1))
+
+def push_export_progress(job):
+    """将导出任务进度推送给发起任务的客户端"""
+    if job.owner:
+        socketio.emit('export_progress', job.to_dict(), to=job.owner)
+
+# CPU密集任务（导出文件生成等）交给独立进程执行，避免阻塞实时推送
+offload = OffloadExecutor(**server_config.get('offload', {}))
+
+# 创建后台导出任务管理器
+export_config = server_config.get('export', {})
+export_jobs = ExportJobManager(
+    monitor.storage,
+    ExportCache(
+        export_config.get('cache_dir', 'export_cache'),
+        export_config.get('cache_max_mb', 200) * 1024 * 1024
+    ),
+    max_workers=export_config.get('max_workers', 2),
+    offload=offload,
+    progress_callback=push_export_progress,
+    closed_grace=export_config.get('closed_grace', 300)
+)
+
 @app.route('/')
 def index():
     """主页"""
     return render_template('index.html')
 
+@app.route('/kiosk')
+def kiosk():
+    """只读展示屏页面，通过SSE接收实时数据，可用 device 参数指定设备"""
+    return render_template('kiosk.html')
+
+@app.route('/assets/<path:filename>')
+def built_asset(filename):
+    """
+    提供构建后的静态资源
+
+    文件名带内容哈希，可以永久缓存；客户端支持时直接返回预压缩的brotli/gzip文件
+    """
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    response = None
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if encoding in accept_encoding and (ASSET_DIR / f"{filename}{suffix}").is_file():
+            response = send_from_directory(
+                ASSET_DIR, f"{filename}{suffix}",
+                mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            )
+            response.headers['Content-Encoding'] = encoding
+            break
+    if response is None:
+        response = send_from_directory(ASSET_DIR, filename)
+
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+@app.route('/sw.js')
+def service_worker():
+    """Service Worker脚本，需从站点根路径提供才能控制整个页面"""
+    response = send_from_directory(app.static_folder, 'js/sw.js', mimetype='application/javascript')
+    # 每次都向服务端确认，保证更新后的Service Worker能及时生效
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/devices')
+def get_devices():
+    """获取设备列表API - 包含每个设备的最新读数"""
+    devices = monitor.storage.get_devices()
+    connected = monitor.connector is not None and monitor.connector.is_connected
+    connected_address = monitor.connector.current_device_address if connected else None
+    for device in devices:
+        live = latest_by_device.get(device['device_address'])
+        if live:
+            device['latest'] = live.to_dict()
+        device['is_connected'] = device['device_address'] == connected_address
+    return jsonify(devices)
+
 @app.route('/api/latest')
-def get_latest_data():
-    """获取最新数据API"""
-    global latest_data
-    if latest_data:
-        return jsonify(latest_data.to_dict())
+@app.route('/api/devices/<device_address>/latest')
+def get_latest_data(device_address=None):
+    """获取最新数据API，可通过 device 参数或路径指定设备"""
+    device_address = device_address or request.args.get('device', None)
+    live = latest_by_device.get(device_address) if device_address else latest_data
+    if live:
+        return app.response_class(live.to_json(), mimetype='application/json')
     else:
         # 从数据库获取最新数据
-        data = monitor.storage.get_latest_data(1)
+        data = monitor.storage.get_latest_data(1, device_address)
         if data:
             return jsonify(data[0])
         else:
             return jsonify({'error': '暂无数据'})
 
 @app.route('/api/history')
-def get_history_data():
-    """获取历史数据API"""
+@app.route('/api/devices/<device_address>/history')
+def get_history_data(device_address=None):
+    """
+    获取历史数据API，可通过 device 参数或路径指定设备
+
+    since 参数（ISO时间，含）只返回该时间之后的数据，供浏览器缓存增量更新；
+    comfort=1 时每条数据附带露点、绝对湿度和体感温度
+    """
+    device_address = device_address or request.args.get('device', None)
     hours = request.args.get('hours', 24, type=int)
     end_time = datetime.now()
     start_time = end_time - timedelta(hours=hours)
+    try:
+        start_time = max(start_time, parse_time_param(request.args.get('since'), start_time))
+    except ValueError:
+        return jsonify({'error': 'since 参数格式错误'}), 400
     
-    data = monitor.storage.get_data_by_time_range(start_time, end_time)
-    return jsonify(data)
+    comfort = request.args.get('comfort', '') in ('1', 'true')
+    data = monitor.storage.get_history_json(start_time, end_time, device_address, comfort)
+    response = app.response_class(data, mimetype='application/json')
+    # 回填会插入早于缓存高水位的读数，版本号变化时浏览器缓存需要重新完整加载
+    response.headers['X-Backfill-Revision'] = str(monitor.storage.get_backfill_revision())
+    return response
 
-@app.route('/api/status')
-def get_status():
-    """获取系统状态API - 包含连接状态和在线用户数"""
-    return jsonify({
+@app.route('/api/stream')
+def stream_events():
+    """
+    SSE实时数据流，事件与 Socket.IO 的 temperature_update 相同
+
+    device 参数（可重复）只接收指定设备的数据；浏览器重连时通过 Last-Event-ID 补发错过的事件，
+    错过的事件超出缓冲区时发送 reset 事件，客户端应重新获取最新数据
+    """
+    devices = request.args.getlist('device')
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    try:
+        events = event_stream.subscribe(devices, last_event_id)
+    except StreamFull as e:
+        logger.warning(str(e))
+        response = jsonify({'error': str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(event_stream.retry // 1000)
+        return response
+
+    response = Response(events, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # 禁止 nginx 缓冲
+    return response
+
+def build_status() -> dict:
+    """生成系统状态数据"""
+    return {
         'is_connected': monitor.connector.is_connected if monitor.connector else False,
         'device_name': monitor.connector.current_device_name if monitor.connector else None,
         'device_address': monitor.connector.current_device_address if monitor.connector else None,
         'last_data_time': latest_data.timestamp.isoformat() if latest_data and latest_data.timestamp else None,
-        'online_users': online_users  # 添加在线用户数
-    })
+        'online_users': presence.count,  # 在线用户数
+        'db_pool': monitor.storage.get_pool_stats(),  # 只读连接池统计
+        'offload': offload.stats(),  # CPU任务进程池统计
+        'ingestion': monitor.ingestion.stats() if monitor.ingestion else None,  # 读数保存/丢弃统计
+        'writer': monitor.async_storage.stats() if monitor.async_storage else None,  # 待写入数据库的读数（落盘缓冲区）
+        'stream': event_stream.stats(),  # SSE连接数
+        'federation': monitor.federation.stats() if monitor.federation else None  # 向汇聚端同步的进度
+    }
+
+@app.route('/api/status')
+def get_status():
+    """获取系统状态API - 包含连接状态和在线用户数，短时间内的请求共用同一份快照"""
+    return app.response_class(status_snapshot.get(), mimetype='application/json')
 
 @app.route('/api/data-range')
-def get_data_range():
-    """获取数据库中数据的时间范围API"""
+@app.route('/api/devices/<device_address>/data-range')
+def get_data_range(device_address=None):
+    """获取数据库中数据的时间范围API，可通过 device 参数或路径指定设备"""
+    device_address = device_address or request.args.get('device', None)
     try:
-        time_range = monitor.storage.get_data_time_range()
+        time_range = monitor.storage.get_data_time_range(device_address)
         return jsonify(time_range)
     except Exception as e:
         logger.error(f"获取数据时间范围失败: {e}")
         return jsonify({'error': f'获取数据时间范围失败: {str(e)}'}), 500
 
+@app.route('/api/coverage')
+@app.route('/api/devices/<device_address>/coverage')
+def get_coverage(device_address=None):
+    """获取数据覆盖区间与缺口API，可通过 device 参数或路径指定设备"""
+    hours = request.args.get('hours', 24, type=int)
+    device_address = device_address or request.args.get('device', None)
+    end_time = datetime.now()
+    start_time = end_time - timedelta(hours=hours)
+
+    coverage = monitor.storage.get_coverage(start_time, end_time, device_address)
+    return jsonify({
+        'start': start_time.isoformat(),
+        'end': end_time.isoformat(),
+        'gap_threshold': monitor.storage.gap_threshold,
+        'devices': coverage
+    })
+
+@app.route('/api/heatmap')
+@app.route('/api/devices/<device_address>/heatmap')
+def get_heatmap(device_address=None):
+    """
+    获取 星期 × 小时 热力图API（7×24平均值矩阵），可通过 device 参数或路径指定设备
+
+    metric 参数为 temperature（默认）或 humidity；weeks 参数只统计最近若干周，默认统计全部历史
+    """
+    device_address = device_address or request.args.get('device', None)
+    metric = request.args.get('metric', 'temperature')
+    if metric not in monitor.storage.PROFILE_METRICS:
+        return jsonify({'error': f'不支持的指标: {metric}'}), 400
+    weeks = request.args.get('weeks', type=int)
+    if weeks is not None and weeks < 1:
+        return jsonify({'error': 'weeks 参数必须为正整数'}), 400
+
+    return jsonify(monitor.storage.get_heatmap(metric, device_address, weeks))
+
+@app.route('/api/week-compare')
+@app.route('/api/devices/<device_address>/week-compare')
+def get_week_compare(device_address=None):
+    """
+    获取周对比API（最近一周与前几周的逐小时平均值），可通过 device 参数或路径指定设备
+
+    metric 参数为 temperature（默认）或 humidity；weeks 参数为对比的周数（默认2，即本周与上周，最多8）；
+    week 参数（ISO时间）指定最近一周所在的时间，默认为本周
+    """
+    device_address = device_address or request.args.get('device', None)
+    metric = request.args.get('metric', 'temperature')
+    if metric not in monitor.storage.PROFILE_METRICS:
+        return jsonify({'error': f'不支持的指标: {metric}'}), 400
+    weeks = min(max(request.args.get('weeks', 2, type=int), 1), 8)
+    try:
+        reference = parse_time_param(request.args.get('week'), datetime.now())
+    except ValueError:
+        return jsonify({'error': 'week 参数格式错误'}), 400
+
+    return jsonify(monitor.storage.get_week_comparison(metric, device_address, reference, weeks))
+
+def parse_time_param(value, default: datetime) -> datetime:
+    """
+    解析ISO格式的时间参数，支持以Z结尾的UTC时间
+
+    带时区的时间换算为本地时间并去掉时区信息，与默认值及数据库中的本地时间保持一致，
+    避免带时区与不带时区的时间混合比较
+    """
+    if not value:
+        return default
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
 @app.route('/api/export-excel')
 def export_excel():
-    """导出Excel数据API"""
+    """
+    导出Excel数据API（保留的旧接口，参数为 device、start_time、end_time）
+
+    与 /api/export-jobs 相同，导出在后台任务中执行，不占用请求线程：返回202和任务状态，
+    Location 指向任务状态接口，完成后从 download_url 下载；命中导出缓存时直接重定向到下载地址
+    """
     try:
-        start_time_str = request.args.get('start_time', None)
-        end_time_str = request.args.get('end_time', None)
-        
-        # 解析时间参数
-        if start_time_str:
-            start_time = datetime.fromisoformat(start_time_str.replace('Z', '+00:00'))
-        else:
-            start_time = datetime.now() - timedelta(days=1)  # 默认导出过去一天数据
-            
-        if end_time_str:
-            end_time = datetime.fromisoformat(end_time_str.replace('Z', '+00:00'))
-        else:
-            end_time = datetime.now()
-            
-        # 获取数据
-        data = monitor.storage.get_data_by_time_range(start_time, end_time)
-        
-        if not data:
-            return jsonify({'error': '指定时间范围内无数据'}), 404
-            
-        # 创建DataFrame
-        df = pd.DataFrame(data)
-        
-        # 创建一个内存文件作为Excel输出
-        output = io.BytesIO()
-        
-        # 创建Excel工作簿和工作表
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            # 写入数据
-            df.to_excel(writer, sheet_name='温湿度数据', index=False)
-            
-            # 获取工作簿和工作表对象
-            workbook = writer.book
-            worksheet = writer.sheets['温湿度数据']
-            
-            # 添加图表
-            chart = workbook.add_chart({'type': 'line'})
-            
-            # 配置图表数据范围
-            # 假设第一列是时间戳，第二列是温度，第三列是湿度
-            # 添加温度数据系列
-            chart.add_series({
-                'name': '温度',
-                'categories': ['温湿度数据', 1, 0, len(data), 0],  # 时间列
-                'values': ['温湿度数据', 1, 1, len(data), 1],      # 温度列
-                'line': {'color': '#ff6b6b'},
-            })
-            
-            # 添加湿度数据系列
-            chart.add_series({
-                'name': '湿度',
-                'categories': ['温湿度数据', 1, 0, len(data), 0],  # 时间列
-                'values': ['温湿度数据', 1, 2, len(data), 2],      # 湿度列
-                'line': {'color': '#74b9ff'},
-            })
-            
-            # 设置图表标题和坐标轴
-            chart.set_title({'name': 'DUT宿舍温湿度变化图'})
-            chart.set_x_axis({'name': '时间'})
-            chart.set_y_axis({'name': '数值', 'major_gridlines': {'visible': True}})
-            
-            # 插入图表到工作表
-            worksheet.insert_chart('E2', chart, {'x_scale': 2, 'y_scale': 1})
-            
-            # 设置列宽
-            worksheet.set_column('A:A', 20)  # 时间戳列宽
-            worksheet.set_column('B:C', 10)  # 温度湿度列宽
-            
-            # 添加格式
-            header_format = workbook.add_format({
-                'bold': True,
-                'text_wrap': True,
-                'valign': 'top',
-                'align': 'center',
-                'bg_color': '#D7E4BC',
-                'border': 1
-            })
-            
-            # 应用表头格式
-            for col_num, value in enumerate(df.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-        
-        # 准备文件下载
-        output.seek(0)
-        
-        # 生成文件名，格式为"CUST温湿度数据_起始时间_结束时间.xlsx"
-        filename = f"DUT温湿度数据_{start_time.strftime('%Y%m%d%H%M')}_{end_time.strftime('%Y%m%d%H%M')}.xlsx"
-        
-        return send_file(
-            output, 
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
-        
+        device_address = request.args.get('device', None)
+
+        # 解析时间参数，默认导出过去一天数据
+        start_time = parse_time_param(request.args.get('start_time'), datetime.now() - timedelta(days=1))
+        end_time = parse_time_param(request.args.get('end_time'), datetime.now())
+        if start_time > end_time:
+            return jsonify({'error': '开始时间不能晚于结束时间'}), 400
+
+        job = export_jobs.submit(start_time, end_time, devices=[device_address] if device_address else [],
+                                 export_format='xlsx')
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"导出Excel失败: {e}")
         return jsonify({'error': f'导出Excel失败: {str(e)}'}), 500
 
+    if job.status == 'done':
+        return redirect(f"/api/export-jobs/{job.id}/download", code=303)
+    response = jsonify(job.to_dict())
+    response.status_code = 202
+    response.headers['Location'] = f"/api/export-jobs/{job.id}"
+    return response
+
+@app.route('/api/export-jobs', methods=['POST'])
+def create_export_job():
+    """
+    创建后台导出任务API
+
+    请求体: {start_time, end_time, devices: [设备地址], format: xlsx/csv, sid: Socket.IO会话ID}
+    进度通过 Socket.IO 的 export_progress 事件推送给 sid 对应的客户端
+    """
+    try:
+        params = request.get_json(silent=True) or {}
+        start_time = parse_time_param(params.get('start_time'), datetime.now() - timedelta(days=1))
+        end_time = parse_time_param(params.get('end_time'), datetime.now())
+        if start_time > end_time:
+            return jsonify({'error': '开始时间不能晚于结束时间'}), 400
+
+        job = export_jobs.submit(
+            start_time,
+            end_time,
+            devices=params.get('devices') or [],
+            export_format=params.get('format', 'xlsx'),
+            owner=params.get('sid')
+        )
+        return jsonify(job.to_dict()), 202
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"创建导出任务失败: {e}")
+        return jsonify({'error': f'创建导出任务失败: {str(e)}'}), 500
+
+@app.route('/api/export-jobs/<job_id>')
+def get_export_job(job_id):
+    """查询导出任务状态API"""
+    job = export_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': '导出任务不存在或已过期'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/export-jobs/<job_id>/download')
+def download_export_job(job_id):
+    """下载导出文件API，支持Range请求断点续传"""
+    job = export_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': '导出任务不存在或已过期'}), 404
+    if job.status != 'done':
+        return jsonify({'error': '导出任务尚未完成', 'job': job.to_dict()}), 409
+    if not job.path or not job.path.exists():
+        return jsonify({'error': '导出文件已被清理，请重新导出'}), 410
+
+    return send_file(
+        job.path,
+        mimetype=EXPORT_FORMATS[job.export_format],
+        as_attachment=True,
+        download_name=job.filename,
+        conditional=True
+    )
+
 # 设备控制API已移除 - Web页面仅用于数据展示
 
 @socketio.on('connect')
 def handle_connect():
     """WebSocket连接处理"""
-    global online_users
-    online_users += 1
-    logger.info(f'客户端已连接，当前在线人数: {online_users}')
+    count = presence.connect(request.sid)
+    logger.info(f'客户端已连接，当前在线人数: {count}')
+
+    # 默认接收所有设备的数据，客户端可通过 subscribe 事件改为只接收指定设备
+    join_room(ALL_DEVICES_ROOM)
 
     # 发送系统状态
     emit('status', {
@@ -268,25 +612,43 @@ def handle_connect():
         'device_name': monitor.connector.current_device_name if monitor.connector else None
     })
 
-    # 广播在线人数更新给所有客户端
-    socketio.emit('online_users_update', {'online_users': online_users})
+    # 新客户端立即获得当前在线人数，其他客户端由 presence 合并推送
+    emit('online_users_update', {'online_users': count})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """WebSocket断开处理"""
-    global online_users
-    online_users = max(0, online_users - 1)  # 确保不会小于0
-    logger.info(f'客户端已断开，当前在线人数: {online_users}')
+    count = presence.disconnect(request.sid)
+    logger.info(f'客户端已断开，当前在线人数: {count}')
+
+@socketio.on('subscribe')
+def handle_subscribe(data=None):
+    """
+    订阅指定设备的实时数据
+
+    data: {'devices': [设备地址, ...]}，列表为空时恢复接收所有设备的数据
+    """
+    devices = (data or {}).get('devices') or []
+
+    for room in rooms():
+        if room == ALL_DEVICES_ROOM or room.startswith('device:'):
+            leave_room(room)
+
+    if devices:
+        for device_address in devices:
+            join_room(device_room(device_address))
+    else:
+        join_room(ALL_DEVICES_ROOM)
 
-    # 广播在线人数更新给所有客户端
-    socketio.emit('online_users_update', {'online_users': online_users})
+    emit('subscribed', {'devices': devices})
 
 @socketio.on('request_latest')
-def handle_request_latest():
-    """处理获取最新数据请求"""
-    global latest_data
-    if latest_data:
-        emit('temperature_update', latest_data.to_dict())
+def handle_request_latest(data=None):
+    """处理获取最新数据请求，可通过 {'device': 设备地址} 指定设备"""
+    device_address = (data or {}).get('device')
+    latest = latest_by_device.get(device_address) if device_address else latest_data
+    if latest:
+        emit('temperature_update', latest.json_payload())
 
 if __name__ == '__main__':
     try: